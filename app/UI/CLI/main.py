@@ -1,11 +1,8 @@
 import os
 import sys
+import argparse
 import inquirer
 import json
-import pyodbc
-import questionary
-from questionary import Choice
-import sqlparse
 
 # Add the project root directory to sys.path to allow importing from app
 # Get the project root directory (3 levels up from this file)
@@ -15,54 +12,79 @@ project_root = os.path.abspath(
 sys.path.insert(0, project_root)
 
 # Now import from app package
-from app.shared.get_stored_procedures import extract_stored_procedures
-from app.shared.scaffold_database import scaffold_database
-from app.shared.discover_dependencies import discover_dependencies
-from app.shared.run_sql_tests import run_sql_tests
-from app.shared.scaffold_templates.create_ef_analysis import (
-    analyze_csharp_dependencies,
-    run_csharp_dependency_analysis,
+from app.shared.llm_cache import set_cache_bypass
+from app.shared.artifact_manifest import set_force
+from app.shared.pipeline import STAGE_NAMES, lazy_function
+from app.shared.procedure_profiler import run_procedure_profiler
+from app.shared.procedure_fingerprint import run_procedure_clustering
+
+# Stage functions import their module (agents, LiteLLM, pyodbc) on first use,
+# so the project picker comes up without loading any of them
+extract_stored_procedures = lazy_function(
+    "app.shared.get_stored_procedures", "extract_stored_procedures"
 )
-from app.shared.python_scripts.generate_bf_markdown import (
-    run_generate_bf_markdown,
+scaffold_database = lazy_function("app.shared.scaffold_database", "scaffold_database")
+discover_dependencies = lazy_function(
+    "app.shared.discover_dependencies", "discover_dependencies"
 )
-from app.shared.python_scripts.generate_report import (
-    run_generate_report,
+run_sql_tests = lazy_function("app.shared.run_sql_tests", "run_sql_tests")
+analyze_csharp_dependencies = lazy_function(
+    "app.shared.scaffold_templates.create_ef_analysis", "analyze_csharp_dependencies"
 )
-from app.agents.business_analysis_agent.main import (
-    run_business_analysis,
-    business_analysis,
+run_csharp_dependency_analysis = lazy_function(
+    "app.shared.scaffold_templates.create_ef_analysis",
+    "run_csharp_dependency_analysis",
 )
-from app.agents.implementation_planner_agent.main import (
-    implementation_planner,
-    run_implementation_planner,
+run_generate_bf_markdown = lazy_function(
+    "app.shared.python_scripts.generate_bf_markdown", "run_generate_bf_markdown"
 )
-from app.agents.implementation_executor_agent.main import (
-    implementation_executor,
-    run_implementation_executor,
+run_generate_report = lazy_function(
+    "app.shared.python_scripts.generate_report", "run_generate_report"
 )
-from app.agents.integration_test_spec_agent.main import (
-    create_integration_test_spec,
-    run_integration_test_spec,
+run_business_analysis = lazy_function(
+    "app.agents.business_analysis_agent.main", "run_business_analysis"
 )
-from app.agents.sql_test_generation_agent.main import (
-    generate_sql_test,
-    run_sql_test_generation,
+business_analysis = lazy_function(
+    "app.agents.business_analysis_agent.main", "business_analysis"
 )
-from app.agents.csharp_test_generation_agent.main import (
-    generate_csharp_test,
-    run_csharp_test_generation,
-    generate_csharp_tests_cli,
+implementation_planner = lazy_function(
+    "app.agents.implementation_planner_agent.main", "implementation_planner"
 )
-from app.agents.mcp_implementation_executor_agent.main import (
-    run_mcp_implementation_executor,
+run_implementation_planner = lazy_function(
+    "app.agents.implementation_planner_agent.main", "run_implementation_planner"
 )
-from app.agents.faq_builder_agent.main import (
-    run_faq_builder,
+implementation_executor = lazy_function(
+    "app.agents.implementation_executor_agent.main", "implementation_executor"
 )
-from app.agents.testable_unit_scenario_agent.main import (
-    run_testable_unit_scenarios,
+run_implementation_executor = lazy_function(
+    "app.agents.implementation_executor_agent.main", "run_implementation_executor"
 )
+create_integration_test_spec = lazy_function(
+    "app.agents.integration_test_spec_agent.main", "create_integration_test_spec"
+)
+run_integration_test_spec = lazy_function(
+    "app.agents.integration_test_spec_agent.main", "run_integration_test_spec"
+)
+generate_sql_test = lazy_function(
+    "app.agents.sql_test_generation_agent.main", "generate_sql_test"
+)
+run_sql_test_generation = lazy_function(
+    "app.agents.sql_test_generation_agent.main", "run_sql_test_generation"
+)
+generate_csharp_tests_cli = lazy_function(
+    "app.agents.csharp_test_generation_agent.main", "generate_csharp_tests_cli"
+)
+implement_with_mcp = lazy_function(
+    "app.agents.mcp_implementation_executor_agent.main", "implement_with_mcp"
+)
+implement_all_with_mcp = lazy_function(
+    "app.agents.mcp_implementation_executor_agent.main", "implement_all_with_mcp"
+)
+run_faq_builder = lazy_function("app.agents.faq_builder_agent.main", "run_faq_builder")
+run_testable_unit_scenarios = lazy_function(
+    "app.agents.testable_unit_scenario_agent.main", "run_testable_unit_scenarios"
+)
+run_pipeline = lazy_function("app.shared.pipeline", "run_pipeline")
 
 
 def create_project_directory(project_name):
@@ -85,6 +107,15 @@ def create_project_directory(project_name):
     return project_path, project_name
 
 
+def get_project_path(project_name):
+    """Get the path of a project in the output folder."""
+    output_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "output",
+    )
+    return os.path.join(output_dir, project_name)
+
+
 def get_existing_projects():
     """Get the list of existing projects in the output folder."""
     output_dir = os.path.join(
@@ -191,452 +222,646 @@ def get_existing_connection_string(project_path):
         return ""
 
 
-def prompt_for_next_action(project_path, connection_string, project_name):
-    """Ask the user what action they want to perform next."""
-    questions = [
-        inquirer.List(
-            "next_action",
-            message="What would you like to do next?",
-            choices=[
-                "Prepare Stored Procedures",
-                "Scaffold Database",
-                "Discover Dependencies",
-                "Business Analysis",
-                "FAQ Builder",
-                "Testable Unit Scenarios",
-                "Csharp Dependency Analysis",
-                "Generate Business Functions Markdown",
-                "Generate Analysis Report",
-                "Implementation Planner",
-                "Implementation Executor",
-                "MCP Implementation Executor",
-                "Integration Test Specification",
-                "Generate SQL Tests",
-                "Run SQL Tests",
-                "Create Csharp Tests",
-                "Exit",
-            ],
-        ),
-    ]
+def show_llm_usage_summary(project_path):
+    """Print the LLM usage of this run and save it to the project's metrics folder."""
+    # Telemetry is only loaded by the agents, without it there were no LLM calls
+    if "app.shared.llm_telemetry" not in sys.modules:
+        return
+    from app.shared.llm_telemetry import print_run_summary, write_run_summary
 
-    answers = inquirer.prompt(questions)
-    selected = answers["next_action"]
+    print_run_summary(project_path)
+    summary_path = write_run_summary(project_path)
+    if summary_path:
+        print(f"LLM usage summary saved to {summary_path}")
 
-    if selected == "Prepare Stored Procedures":
-        extract_stored_procedures(project_path, connection_string)
-        # After extraction, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "Scaffold Database":
-        scaffold_database("csharp-code", project_name)
-        # After scaffolding, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "Discover Dependencies":
-        discover_dependencies(connection_string, project_name)
-        # After discovery, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "Business Analysis":
-        # Get list of procedures to analyze
-        procedures = [
-            folder
-            for folder in os.listdir(os.path.join(project_path, "sql_raw"))
-            if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
-        ]
-
-        # Ask if user wants to run full menu or analyze a specific procedure
-        if procedures:
-            choices = ["Show full menu"] + procedures + ["Return to main menu"]
-            questions = [
-                inquirer.List(
-                    "analysis_choice",
-                    message="What would you like to analyze?",
-                    choices=choices,
-                ),
-            ]
-            analysis_answer = inquirer.prompt(questions)
-            selected_analysis = analysis_answer["analysis_choice"]
-
-            if selected_analysis == "Show full menu":
-                # Run business analysis using the full menu
-                run_business_analysis(project_path)
-            elif selected_analysis == "Return to main menu":
-                pass
-            else:
-                # Analyze the selected procedure directly
-                business_analysis(selected_analysis, project_path)
-        else:
-            print("No procedures found. Please run 'Prepare Stored Procedures' first.")
 
-        # After analysis, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "Testable Unit Scenarios":
-        # Get list of procedures to analyze
-        procedures = [
-            folder
-            for folder in os.listdir(os.path.join(project_path, "sql_raw"))
-            if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
+def prompt_for_next_action(project_path, connection_string, project_name):
+    """Ask the user what action they want to perform next, until they exit."""
+    while True:
+        questions = [
+            inquirer.List(
+                "next_action",
+                message="What would you like to do next?",
+                choices=[
+                    "Prepare Stored Procedures",
+                    "Scaffold Database",
+                    "Discover Dependencies",
+                    "Business Analysis",
+                    "FAQ Builder",
+                    "Testable Unit Scenarios",
+                    "Csharp Dependency Analysis",
+                    "Generate Business Functions Markdown",
+                    "Generate Analysis Report",
+                    "Implementation Planner",
+                    "Implementation Executor",
+                    "MCP Implementation Executor",
+                    "Integration Test Specification",
+                    "Generate SQL Tests",
+                    "Run SQL Tests",
+                    "Create Csharp Tests",
+                    "Run Full Pipeline",
+                    "Procedure Complexity Profile",
+                    "Near-Duplicate Procedures",
+                    "LLM Usage Summary",
+                    "Exit",
+                ],
+            ),
         ]
 
-        # Ask if user wants to run full menu or analyze a specific procedure
-        if procedures:
-            choices = ["Show full menu"] + procedures + ["Return to main menu"]
-            questions = [
-                inquirer.List(
-                    "testable_unit_scenarios_choice",
-                    message="What would you like to build?",
-                    choices=choices,
-                ),
-            ]
-            testable_unit_scenarios_answer = inquirer.prompt(questions)
-            selected_testable_unit_scenarios = testable_unit_scenarios_answer[
-                "testable_unit_scenarios_choice"
+        answers = inquirer.prompt(questions)
+        selected = answers["next_action"]
+
+        if selected == "Prepare Stored Procedures":
+            extract_stored_procedures(project_path, connection_string)
+        elif selected == "Scaffold Database":
+            scaffold_database("csharp-code", project_name)
+        elif selected == "Discover Dependencies":
+            discover_dependencies(connection_string, project_name)
+        elif selected == "Business Analysis":
+            # Get list of procedures to analyze
+            procedures = [
+                folder
+                for folder in os.listdir(os.path.join(project_path, "sql_raw"))
+                if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
             ]
 
-            if selected_testable_unit_scenarios == "Show full menu":
-                # Run testable unit scenarios using the full menu
-                run_testable_unit_scenarios(project_path)
-            elif selected_testable_unit_scenarios == "Return to main menu":
-                pass
+            # Ask if user wants to run full menu or analyze a specific procedure
+            if procedures:
+                choices = ["Show full menu"] + procedures + ["Return to main menu"]
+                questions = [
+                    inquirer.List(
+                        "analysis_choice",
+                        message="What would you like to analyze?",
+                        choices=choices,
+                    ),
+                ]
+                analysis_answer = inquirer.prompt(questions)
+                selected_analysis = analysis_answer["analysis_choice"]
+
+                if selected_analysis == "Show full menu":
+                    # Run business analysis using the full menu
+                    run_business_analysis(project_path)
+                elif selected_analysis == "Return to main menu":
+                    pass
+                else:
+                    # Analyze the selected procedure directly
+                    business_analysis(selected_analysis, project_path)
             else:
-                # Analyze the selected procedure directly
-                run_testable_unit_scenarios(
-                    selected_testable_unit_scenarios, project_path
+                print(
+                    "No procedures found. Please run 'Prepare Stored Procedures' first."
                 )
-        else:
-            print("No procedures found. Please run 'Prepare Stored Procedures' first.")
-
-        # After analysis, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "FAQ Builder":
-        # Get list of procedures to analyze
-        procedures = [
-            folder
-            for folder in os.listdir(os.path.join(project_path, "sql_raw"))
-            if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
-        ]
-
-        # Ask if user wants to run full menu or analyze a specific procedure
-        if procedures:
-            choices = ["Show full menu"] + procedures + ["Return to main menu"]
-            questions = [
-                inquirer.List(
-                    "faq_builder_choice",
-                    message="What would you like to build?",
-                    choices=choices,
-                ),
+        elif selected == "Testable Unit Scenarios":
+            # Get list of procedures to analyze
+            procedures = [
+                folder
+                for folder in os.listdir(os.path.join(project_path, "sql_raw"))
+                if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
             ]
-            faq_builder_answer = inquirer.prompt(questions)
-            selected_faq_builder = faq_builder_answer["faq_builder_choice"]
-
-            if selected_faq_builder == "Show full menu":
-                # Run FAQ builder using the full menu
-                run_faq_builder(project_path)
-            elif selected_faq_builder == "Return to main menu":
-                pass
-            else:
-                # Analyze the selected procedure directly
-                run_faq_builder(selected_faq_builder, project_path)
-        else:
-            print("No procedures found. Please run 'Prepare Stored Procedures' first.")
 
-        # After analysis, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-
-    elif selected == "Csharp Dependency Analysis":
-        # Get list of procedures for C# dependency analysis
-        procedures = [
-            folder
-            for folder in os.listdir(os.path.join(project_path, "sql_raw"))
-            if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
-        ]
-
-        # Ask if user wants to run full menu or analyze a specific procedure
-        if procedures:
-            choices = ["Show full menu"] + procedures + ["Return to main menu"]
-            questions = [
-                inquirer.List(
-                    "csharp_analysis_choice",
-                    message="Which procedure would you like to analyze?",
-                    choices=choices,
-                ),
-            ]
-            csharp_analysis_answer = inquirer.prompt(questions)
-            selected_csharp_analysis = csharp_analysis_answer["csharp_analysis_choice"]
-
-            if selected_csharp_analysis == "Show full menu":
-                # Run C# dependency analysis using the full menu
-                run_csharp_dependency_analysis(project_path)
-            elif selected_csharp_analysis == "Return to main menu":
-                pass
+            # Ask if user wants to run full menu or analyze a specific procedure
+            if procedures:
+                choices = ["Show full menu"] + procedures + ["Return to main menu"]
+                questions = [
+                    inquirer.List(
+                        "testable_unit_scenarios_choice",
+                        message="What would you like to build?",
+                        choices=choices,
+                    ),
+                ]
+                testable_unit_scenarios_answer = inquirer.prompt(questions)
+                selected_testable_unit_scenarios = testable_unit_scenarios_answer[
+                    "testable_unit_scenarios_choice"
+                ]
+
+                if selected_testable_unit_scenarios == "Show full menu":
+                    # Run testable unit scenarios using the full menu
+                    run_testable_unit_scenarios(project_path)
+                elif selected_testable_unit_scenarios == "Return to main menu":
+                    pass
+                else:
+                    # Analyze the selected procedure directly
+                    run_testable_unit_scenarios(
+                        selected_testable_unit_scenarios, project_path
+                    )
             else:
-                # Analyze the selected procedure directly
-                analyze_csharp_dependencies(selected_csharp_analysis, project_path)
-        else:
-            print("No procedures found. Please run 'Prepare Stored Procedures' first.")
-
-    elif selected == "Generate Business Functions Markdown":
-        # Get list of procedures for C# dependency analysis
-        procedures = [
-            folder
-            for folder in os.listdir(os.path.join(project_path, "sql_raw"))
-            if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
-        ]
-
-        # Ask if user wants to run full menu or analyze a specific procedure
-        if procedures:
-            choices = ["Show full menu"] + procedures + ["Return to main menu"]
-            questions = [
-                inquirer.List(
-                    "generate_bf_markdown_choice",
-                    message="Which procedure would you like to generate business functions markdown for?",
-                    choices=choices,
-                ),
-            ]
-            generate_bf_markdown_answer = inquirer.prompt(questions)
-            selected_generate_bf_markdown = generate_bf_markdown_answer[
-                "generate_bf_markdown_choice"
+                print(
+                    "No procedures found. Please run 'Prepare Stored Procedures' first."
+                )
+        elif selected == "FAQ Builder":
+            # Get list of procedures to analyze
+            procedures = [
+                folder
+                for folder in os.listdir(os.path.join(project_path, "sql_raw"))
+                if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
             ]
 
-            if selected_generate_bf_markdown == "Show full menu":
-                # Run BF markdown generation using the full menu
-                run_generate_bf_markdown("all", project_path)
-            elif selected_generate_bf_markdown == "Return to main menu":
-                pass
+            # Ask if user wants to run full menu or analyze a specific procedure
+            if procedures:
+                choices = ["Show full menu"] + procedures + ["Return to main menu"]
+                questions = [
+                    inquirer.List(
+                        "faq_builder_choice",
+                        message="What would you like to build?",
+                        choices=choices,
+                    ),
+                ]
+                faq_builder_answer = inquirer.prompt(questions)
+                selected_faq_builder = faq_builder_answer["faq_builder_choice"]
+
+                if selected_faq_builder == "Show full menu":
+                    # Run FAQ builder using the full menu
+                    run_faq_builder(project_path)
+                elif selected_faq_builder == "Return to main menu":
+                    pass
+                else:
+                    # Analyze the selected procedure directly
+                    run_faq_builder(selected_faq_builder, project_path)
             else:
-                # Generate BF markdown for the selected procedure directly
-                run_generate_bf_markdown(selected_generate_bf_markdown, project_path)
-        else:
-            print("No procedures found. Please run 'Prepare Stored Procedures' first.")
-
-        # After analysis, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "Generate Analysis Report":
-        # Get list of procedures to generate reports for
-        procedures = [
-            folder
-            for folder in os.listdir(os.path.join(project_path, "sql_raw"))
-            if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
-        ]
+                print(
+                    "No procedures found. Please run 'Prepare Stored Procedures' first."
+                )
 
-        # Ask which procedure to generate a report for
-        if procedures:
-            choices = procedures + ["Return to main menu"]
-            questions = [
-                inquirer.List(
-                    "report_choice",
-                    message="Which procedure would you like to generate an analysis report for?",
-                    choices=choices,
-                ),
+        elif selected == "Csharp Dependency Analysis":
+            # Get list of procedures for C# dependency analysis
+            procedures = [
+                folder
+                for folder in os.listdir(os.path.join(project_path, "sql_raw"))
+                if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
             ]
-            report_answer = inquirer.prompt(questions)
-            selected_procedure = report_answer["report_choice"]
 
-            if selected_procedure == "Return to main menu":
-                pass
-            else:
-                # Generate report for the selected procedure
-                print(f"Generating analysis report for {selected_procedure}...")
-                report_path = run_generate_report(selected_procedure, project_path)
-                if report_path:
-                    print(f"Report generated successfully at {report_path}")
+            # Ask if user wants to run full menu or analyze a specific procedure
+            if procedures:
+                choices = ["Show full menu"] + procedures + ["Return to main menu"]
+                questions = [
+                    inquirer.List(
+                        "csharp_analysis_choice",
+                        message="Which procedure would you like to analyze?",
+                        choices=choices,
+                    ),
+                ]
+                csharp_analysis_answer = inquirer.prompt(questions)
+                selected_csharp_analysis = csharp_analysis_answer[
+                    "csharp_analysis_choice"
+                ]
+
+                if selected_csharp_analysis == "Show full menu":
+                    # Run C# dependency analysis using the full menu
+                    run_csharp_dependency_analysis(project_path)
+                elif selected_csharp_analysis == "Return to main menu":
+                    pass
                 else:
-                    print("Failed to generate report. Check the logs for details.")
-        else:
-            print("No procedures found. Please run 'Prepare Stored Procedures' first.")
-
-        # After report generation, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "Implementation Planner":
-        # Get list of procedures to plan implementation for
-        procedures = [
-            folder
-            for folder in os.listdir(os.path.join(project_path, "sql_raw"))
-            if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
-        ]
+                    # Analyze the selected procedure directly
+                    analyze_csharp_dependencies(selected_csharp_analysis, project_path)
+            else:
+                print(
+                    "No procedures found. Please run 'Prepare Stored Procedures' first."
+                )
 
-        # Ask if user wants to run full menu or plan a specific procedure
-        if procedures:
-            choices = ["Show full menu"] + procedures + ["Return to main menu"]
-            questions = [
-                inquirer.List(
-                    "planner_choice",
-                    message="What would you like to plan implementation for?",
-                    choices=choices,
-                ),
+        elif selected == "Generate Business Functions Markdown":
+            # Get list of procedures for C# dependency analysis
+            procedures = [
+                folder
+                for folder in os.listdir(os.path.join(project_path, "sql_raw"))
+                if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
             ]
-            planner_answer = inquirer.prompt(questions)
-            selected_procedure = planner_answer["planner_choice"]
-
-            if selected_procedure == "Show full menu":
-                # Run implementation planner using the full menu
-                run_implementation_planner(project_path)
-            elif selected_procedure == "Return to main menu":
-                pass
-            else:
-                # Plan implementation for the selected procedure directly
-                implementation_planner(selected_procedure, project_path)
-        else:
-            print("No procedures found. Please run 'Prepare Stored Procedures' first.")
 
-        # After planning, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "Implementation Executor":
-        # Get list of procedures to execute implementation for
-        procedures = [
-            folder
-            for folder in os.listdir(os.path.join(project_path, "sql_raw"))
-            if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
-        ]
+            # Ask if user wants to run full menu or analyze a specific procedure
+            if procedures:
+                choices = ["Show full menu"] + procedures + ["Return to main menu"]
+                questions = [
+                    inquirer.List(
+                        "generate_bf_markdown_choice",
+                        message="Which procedure would you like to generate business functions markdown for?",
+                        choices=choices,
+                    ),
+                ]
+                generate_bf_markdown_answer = inquirer.prompt(questions)
+                selected_generate_bf_markdown = generate_bf_markdown_answer[
+                    "generate_bf_markdown_choice"
+                ]
+
+                if selected_generate_bf_markdown == "Show full menu":
+                    # Run BF markdown generation using the full menu
+                    run_generate_bf_markdown("all", project_path)
+                elif selected_generate_bf_markdown == "Return to main menu":
+                    pass
+                else:
+                    # Generate BF markdown for the selected procedure directly
+                    run_generate_bf_markdown(
+                        selected_generate_bf_markdown, project_path
+                    )
+            else:
+                print(
+                    "No procedures found. Please run 'Prepare Stored Procedures' first."
+                )
+        elif selected == "Generate Analysis Report":
+            # Get list of procedures to generate reports for
+            procedures = [
+                folder
+                for folder in os.listdir(os.path.join(project_path, "sql_raw"))
+                if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
+            ]
 
-        # Ask if user wants to run full menu or execute implementation for a specific procedure
-        if procedures:
-            choices = ["Show full menu"] + procedures + ["Return to main menu"]
-            questions = [
-                inquirer.List(
-                    "executor_choice",
-                    message="What would you like to execute implementation for?",
-                    choices=choices,
-                ),
+            # Ask which procedure to generate a report for
+            if procedures:
+                choices = procedures + ["Return to main menu"]
+                questions = [
+                    inquirer.List(
+                        "report_choice",
+                        message="Which procedure would you like to generate an analysis report for?",
+                        choices=choices,
+                    ),
+                ]
+                report_answer = inquirer.prompt(questions)
+                selected_procedure = report_answer["report_choice"]
+
+                if selected_procedure == "Return to main menu":
+                    pass
+                else:
+                    # Generate report for the selected procedure
+                    print(f"Generating analysis report for {selected_procedure}...")
+                    report_path = run_generate_report(selected_procedure, project_path)
+                    if report_path:
+                        print(f"Report generated successfully at {report_path}")
+                    else:
+                        print("Failed to generate report. Check the logs for details.")
+            else:
+                print(
+                    "No procedures found. Please run 'Prepare Stored Procedures' first."
+                )
+        elif selected == "Implementation Planner":
+            # Get list of procedures to plan implementation for
+            procedures = [
+                folder
+                for folder in os.listdir(os.path.join(project_path, "sql_raw"))
+                if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
             ]
-            executor_answer = inquirer.prompt(questions)
-            selected_procedure = executor_answer["executor_choice"]
-
-            if selected_procedure == "Show full menu":
-                # Run implementation executor using the full menu
-                run_implementation_executor(project_path)
-            elif selected_procedure == "Return to main menu":
-                pass
+
+            # Ask if user wants to run full menu or plan a specific procedure
+            if procedures:
+                choices = ["Show full menu"] + procedures + ["Return to main menu"]
+                questions = [
+                    inquirer.List(
+                        "planner_choice",
+                        message="What would you like to plan implementation for?",
+                        choices=choices,
+                    ),
+                ]
+                planner_answer = inquirer.prompt(questions)
+                selected_procedure = planner_answer["planner_choice"]
+
+                if selected_procedure == "Show full menu":
+                    # Run implementation planner using the full menu
+                    run_implementation_planner(project_path)
+                elif selected_procedure == "Return to main menu":
+                    pass
+                else:
+                    # Plan implementation for the selected procedure directly
+                    implementation_planner(selected_procedure, project_path)
             else:
-                # Execute implementation for the selected procedure directly
-                implementation_executor(selected_procedure, project_path)
-        else:
-            print("No procedures found. Please run 'Prepare Stored Procedures' first.")
+                print(
+                    "No procedures found. Please run 'Prepare Stored Procedures' first."
+                )
+        elif selected == "Implementation Executor":
+            # Get list of procedures to execute implementation for
+            procedures = [
+                folder
+                for folder in os.listdir(os.path.join(project_path, "sql_raw"))
+                if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
+            ]
 
-        # After execution, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "MCP Implementation Executor":
-        # Get list of procedures to execute implementation for
-        procedures = [
-            folder
-            for folder in os.listdir(os.path.join(project_path, "sql_raw"))
-            if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
-        ]
+            # Ask if user wants to run full menu or execute implementation for a specific procedure
+            if procedures:
+                choices = ["Show full menu"] + procedures + ["Return to main menu"]
+                questions = [
+                    inquirer.List(
+                        "executor_choice",
+                        message="What would you like to execute implementation for?",
+                        choices=choices,
+                    ),
+                ]
+                executor_answer = inquirer.prompt(questions)
+                selected_procedure = executor_answer["executor_choice"]
+
+                if selected_procedure == "Show full menu":
+                    # Run implementation executor using the full menu
+                    run_implementation_executor(project_path)
+                elif selected_procedure == "Return to main menu":
+                    pass
+                else:
+                    # Execute implementation for the selected procedure directly
+                    implementation_executor(selected_procedure, project_path)
+            else:
+                print(
+                    "No procedures found. Please run 'Prepare Stored Procedures' first."
+                )
+        elif selected == "MCP Implementation Executor":
+            # Get list of procedures to execute implementation for
+            procedures = [
+                folder
+                for folder in os.listdir(os.path.join(project_path, "sql_raw"))
+                if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
+            ]
 
-        # Ask if user wants to run full menu or execute implementation for a specific procedure
-        if procedures:
-            choices = procedures + ["Return to main menu"]
-            questions = [
-                inquirer.List(
-                    "mcp_executor_choice",
-                    message="Which procedure would you like to implement with MCP?",
-                    choices=choices,
-                ),
+            # Ask if user wants to run full menu or execute implementation for a specific procedure
+            if procedures:
+                choices = (
+                    ["Implement all procedures"] + procedures + ["Return to main menu"]
+                )
+                questions = [
+                    inquirer.List(
+                        "mcp_executor_choice",
+                        message="Which procedure would you like to implement with MCP?",
+                        choices=choices,
+                    ),
+                ]
+                mcp_executor_answer = inquirer.prompt(questions)
+                selected_procedure = mcp_executor_answer["mcp_executor_choice"]
+
+                if selected_procedure == "Return to main menu":
+                    pass
+                elif selected_procedure == "Implement all procedures":
+                    # Concurrent runs on isolated working copies, merged afterwards
+                    implement_all_with_mcp(procedures, project_path)
+                else:
+                    # Execute implementation for the selected procedure using MCP agent
+                    print(
+                        f"Running MCP Implementation Executor for {selected_procedure}..."
+                    )
+                    implement_with_mcp(selected_procedure, project_path)
+            else:
+                print(
+                    "No procedures found. Please run 'Prepare Stored Procedures' first."
+                )
+        elif selected == "Integration Test Specification":
+            # Get list of procedures for integration test specification
+            procedures = [
+                folder
+                for folder in os.listdir(os.path.join(project_path, "sql_raw"))
+                if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
             ]
-            mcp_executor_answer = inquirer.prompt(questions)
-            selected_procedure = mcp_executor_answer["mcp_executor_choice"]
 
-            if selected_procedure == "Return to main menu":
-                pass
+            # Ask if user wants to run full menu or generate test specs for a specific procedure
+            if procedures:
+                choices = ["Show full menu"] + procedures + ["Return to main menu"]
+                questions = [
+                    inquirer.List(
+                        "test_spec_choice",
+                        message="Which procedure would you like to generate test specifications for?",
+                        choices=choices,
+                    ),
+                ]
+                test_spec_answer = inquirer.prompt(questions)
+                selected_procedure = test_spec_answer["test_spec_choice"]
+
+                if selected_procedure == "Show full menu":
+                    # Run integration test specification using the full menu
+                    run_integration_test_spec(project_path)
+                elif selected_procedure == "Return to main menu":
+                    pass
+                else:
+                    # Generate test specifications for the selected procedure directly
+                    create_integration_test_spec(selected_procedure, project_path)
             else:
-                # Execute implementation for the selected procedure using MCP agent
                 print(
-                    f"Running MCP Implementation Executor for {selected_procedure}..."
+                    "No procedures found. Please run 'Prepare Stored Procedures' first."
                 )
-                import asyncio
+        elif selected == "Generate SQL Tests":
+            # Get list of procedures for SQL test generation
+            procedures = [
+                folder
+                for folder in os.listdir(os.path.join(project_path, "sql_raw"))
+                if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
+            ]
 
-                asyncio.run(
-                    run_mcp_implementation_executor(selected_procedure, project_path)
+            # Ask if user wants to run full menu or generate tests for a specific procedure
+            if procedures:
+                choices = ["Show full menu"] + procedures + ["Return to main menu"]
+                questions = [
+                    inquirer.List(
+                        "sql_test_choice",
+                        message="Which procedure would you like to generate SQL tests for?",
+                        choices=choices,
+                    ),
+                ]
+                sql_test_answer = inquirer.prompt(questions)
+                selected_procedure = sql_test_answer["sql_test_choice"]
+
+                if selected_procedure == "Show full menu":
+                    # Run SQL test generation using the full menu
+                    run_sql_test_generation(project_path)
+                elif selected_procedure == "Return to main menu":
+                    pass
+                else:
+                    # Generate SQL tests for the selected procedure directly
+                    generate_sql_test(selected_procedure, project_path)
+            else:
+                print(
+                    "No procedures found. Please run 'Prepare Stored Procedures' first."
                 )
-        else:
-            print("No procedures found. Please run 'Prepare Stored Procedures' first.")
+        elif selected == "Run SQL Tests":
+            # Implementation of running SQL tests
+            print("Running SQL tests...")
+            run_sql_tests(project_path, connection_string)
+        elif selected == "Create Csharp Tests":
+            # Use the simplified CLI function
+            generate_csharp_tests_cli(project_path)
+        elif selected == "Run Full Pipeline":
+            # Run every stage for every procedure, independent stages overlap
+            run_pipeline(project_path, project_name, connection_string)
+        elif selected == "Procedure Complexity Profile":
+            run_procedure_profiler(project_path)
+        elif selected == "Near-Duplicate Procedures":
+            run_procedure_clustering(project_path)
+        elif selected == "LLM Usage Summary":
+            show_llm_usage_summary(project_path)
+        elif selected == "Exit":
+            show_llm_usage_summary(project_path)
+            print("Exiting. Goodbye!")
+            sys.exit(0)
+
+
+def parse_arguments(argv):
+    """Parse the command line arguments of the non-interactive mode."""
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Run without arguments for the interactive menu.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rerun every procedure, also the ones the artifact manifest has up to date",
+    )
+    subparsers = parser.add_subparsers(dest="command")
 
-        # After execution, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "Integration Test Specification":
-        # Get list of procedures for integration test specification
-        procedures = [
-            folder
-            for folder in os.listdir(os.path.join(project_path, "sql_raw"))
-            if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
-        ]
+    run_parser = subparsers.add_parser(
+        "run", help="Run pipeline stages without prompts (for cron and CI)"
+    )
+    run_parser.add_argument("--project", required=True, help="Project name")
+    run_parser.add_argument(
+        "--stage",
+        action="append",
+        dest="stages",
+        metavar="STAGE",
+        help="Stage to run, repeat or comma-separate for several, 'all' for "
+        f"every stage. Available: {', '.join(STAGE_NAMES)}",
+    )
+    run_parser.add_argument(
+        "--procedures",
+        action="append",
+        metavar="PATTERN",
+        help="Procedure name pattern, e.g. 'dbo.*' (repeatable, default: all)",
+    )
+    run_parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Maximum number of procedures processed by the LLM at the same time",
+    )
+    run_parser.add_argument(
+        "--connection-string",
+        help="Database connection string (default: the one saved in the project)",
+    )
+    run_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached LLM responses (fresh responses are still cached)",
+    )
 
-        # Ask if user wants to run full menu or generate test specs for a specific procedure
-        if procedures:
-            choices = ["Show full menu"] + procedures + ["Return to main menu"]
-            questions = [
-                inquirer.List(
-                    "test_spec_choice",
-                    message="Which procedure would you like to generate test specifications for?",
-                    choices=choices,
-                ),
-            ]
-            test_spec_answer = inquirer.prompt(questions)
-            selected_procedure = test_spec_answer["test_spec_choice"]
-
-            if selected_procedure == "Show full menu":
-                # Run integration test specification using the full menu
-                run_integration_test_spec(project_path)
-            elif selected_procedure == "Return to main menu":
-                pass
-            else:
-                # Generate test specifications for the selected procedure directly
-                create_integration_test_spec(selected_procedure, project_path)
-        else:
-            print("No procedures found. Please run 'Prepare Stored Procedures' first.")
+    run_parser.add_argument(
+        "--force",
+        "--no-resume",
+        action="store_true",
+        dest="force",
+        default=argparse.SUPPRESS,
+        help="Rerun every procedure, also the ones the artifact manifest has up to date",
+    )
 
-        # After test specification, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "Generate SQL Tests":
-        # Get list of procedures for SQL test generation
-        procedures = [
-            folder
-            for folder in os.listdir(os.path.join(project_path, "sql_raw"))
-            if os.path.isdir(os.path.join(project_path, "sql_raw", folder))
-        ]
+    subparsers.add_parser("stages", help="List the available stages")
 
-        # Ask if user wants to run full menu or generate tests for a specific procedure
-        if procedures:
-            choices = ["Show full menu"] + procedures + ["Return to main menu"]
-            questions = [
-                inquirer.List(
-                    "sql_test_choice",
-                    message="Which procedure would you like to generate SQL tests for?",
-                    choices=choices,
-                ),
-            ]
-            sql_test_answer = inquirer.prompt(questions)
-            selected_procedure = sql_test_answer["sql_test_choice"]
-
-            if selected_procedure == "Show full menu":
-                # Run SQL test generation using the full menu
-                run_sql_test_generation(project_path)
-            elif selected_procedure == "Return to main menu":
-                pass
-            else:
-                # Generate SQL tests for the selected procedure directly
-                generate_sql_test(selected_procedure, project_path)
-        else:
-            print("No procedures found. Please run 'Prepare Stored Procedures' first.")
+    profile_parser = subparsers.add_parser(
+        "profile", help="Write the static complexity profile of the procedures"
+    )
+    profile_parser.add_argument("--project", required=True, help="Project name")
+    profile_parser.add_argument(
+        "--top", type=int, default=20, help="Number of procedures to print"
+    )
 
-        # After SQL test generation, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "Run SQL Tests":
-        # Implementation of running SQL tests
-        print("Running SQL tests...")
-        run_sql_tests(project_path, connection_string)
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "Create Csharp Tests":
-        # Use the simplified CLI function
-        generate_csharp_tests_cli(project_path)
+    cluster_parser = subparsers.add_parser(
+        "cluster", help="Cluster near-duplicate procedures by their fingerprints"
+    )
+    cluster_parser.add_argument("--project", required=True, help="Project name")
+    cluster_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="Similarity from which procedures are near-duplicates (default: CLUSTER_SIMILARITY_THRESHOLD)",
+    )
 
-        # After C# test generation, ask again what to do next
-        prompt_for_next_action(project_path, connection_string, project_name)
-    elif selected == "Exit":
-        print("Exiting. Goodbye!")
-        sys.exit(0)
+    return parser.parse_args(argv)
+
+
+def get_selected_stages(stage_arguments):
+    """Flatten repeated and comma-separated --stage values."""
+    if not stage_arguments:
+        return None
+
+    stages = []
+    for argument in stage_arguments:
+        for stage in argument.split(","):
+            stage = stage.strip()
+            if stage == "all":
+                return list(STAGE_NAMES)
+            if stage and stage not in stages:
+                stages.append(stage)
+
+    unknown = [stage for stage in stages if stage not in STAGE_NAMES]
+    if unknown:
+        print(f"Unknown stage(s): {', '.join(unknown)}")
+        print(f"Available stages: {', '.join(STAGE_NAMES)}")
+        return []
+    return stages
+
+
+def run_batch(args):
+    """
+    Run pipeline stages without any prompts.
+
+    Returns:
+        int: Process exit code (0 when every scheduled stage succeeded)
+    """
+    stages = get_selected_stages(args.stages)
+    if stages == []:
+        return 2
+    if stages is None:
+        print("No stage given, use --stage (or --stage all)")
+        return 2
+
+    project_name = args.project
+    project_path = get_project_path(project_name)
+    if not os.path.exists(project_path):
+        project_path, project_name = create_project_directory(project_name)
+
+    connection_string = args.connection_string
+    if connection_string:
+        save_connection_string(project_path, connection_string)
+    else:
+        connection_string = get_existing_connection_string(project_path)
+
+    needs_database = {
+        "extract-procedures",
+        "discover-dependencies",
+        "scaffold-database",
+        "run-sql-tests",
+    }
+    if not connection_string and needs_database.intersection(stages):
+        print(
+            f"No connection string saved for project '{project_name}', pass --connection-string"
+        )
+        return 2
+
+    if args.no_cache:
+        set_cache_bypass(True)
+
+    nodes = run_pipeline(
+        project_path,
+        project_name,
+        connection_string,
+        stages=stages,
+        procedure_patterns=args.procedures,
+        llm_concurrency=args.jobs,
+        resume=not args.force,
+    )
+    show_llm_usage_summary(project_path)
+
+    if not nodes:
+        print("Nothing to run")
+        return 1
+    if any(node.status not in ("done", "skipped") for node in nodes):
+        return 1
+    return 0
 
 
 def main():
     """Main function to run the CLI."""
+    if len(sys.argv) > 1:
+        args = parse_arguments(sys.argv[1:])
+        if args.force:
+            set_force(True)
+        if args.command == "stages":
+            for stage in STAGE_NAMES:
+                print(stage)
+            sys.exit(0)
+        if args.command == "run":
+            sys.exit(run_batch(args))
+        if args.command == "profile":
+            project_path = get_project_path(args.project)
+            report = run_procedure_profiler(project_path, args.top)
+            sys.exit(0 if report else 1)
+        if args.command == "cluster":
+            project_path = get_project_path(args.project)
+            report = run_procedure_clustering(project_path, args.threshold)
+            sys.exit(0 if report else 1)
+
     print("Welcome to the Project Management CLI!")
 
     project_path, project_name = select_or_create_project()
@@ -2,15 +2,39 @@ import os
 import sys
 import json
 import uuid
-import re
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 from app.agents.business_analysis_agent.prompt import (
     get_prompt,
     get_returnable_objects_prompt,
+    get_repair_prompt,
+    get_batch_prompt,
+    get_batch_returnable_objects_prompt,
+    business_logic_files,
+    returnable_objects_files,
 )
 from app.agents.business_analysis_agent.agent import root_agent
+from app.shared.file_block_stream import (
+    FILE_REPAIR_ATTEMPTS,
+    FileBlockStream,
+    get_run_config,
+    match_file_name,
+)
+from app.shared.procedure_batching import (
+    BATCH_PROMPTING,
+    create_batch_file_stream,
+    get_batch_file_names,
+    plan_batches,
+    save_batch_file,
+)
+from app.shared.stage_journal import (
+    get_pending_procedures,
+    record_written,
+    run_journaled,
+    run_journaled_batch,
+)
 from app.shared.get_dependencies import get_dependencies
+from app.shared.prompt_context import prune_dependencies
 
 # Add parent directory to path to ensure imports work
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -45,26 +69,82 @@ def save_json_file(file_path, content):
     # Save the file content
     with open(file_path, "w") as f:
         f.write(content)
+    record_written(file_path)
+
+
+def save_analysis_file(analysis_dir, file_path, file_content):
+    """Save a FILE block to the analysis directory, returns the saved file name"""
+    # Get just the filename without any path
+    filename = os.path.basename(file_path)
+
+    # Save the file content
+    full_path = os.path.join(analysis_dir, filename)
+    save_json_file(full_path, file_content)
+    return filename
+
+
+def create_file_stream(analysis_dir):
+    """Create a parser that saves each FILE block as soon as it is complete"""
+
+    def save_file(file_path, file_content):
+        return save_analysis_file(analysis_dir, file_path, file_content)
+
+    return FileBlockStream(save_file)
+
+
+def extract_files_from_response(result, analysis_dir, file_stream=None):
+    """Extract JSON files from the model response and save the ones not streamed yet"""
+    if file_stream is None:
+        file_stream = create_file_stream(analysis_dir)
+    return file_stream.finish(result)
 
 
-def extract_files_from_response(result, analysis_dir):
-    """Extract JSON files from the model response and save them"""
-    file_paths = []
+def repair_files(runner, user_id, session_id, broken_files, save_file):
+    """
+    Ask the agent for only the missing or invalid files on the same session,
+    so fixing one file costs one small call instead of the full analysis.
 
-    # Extract file paths and contents
-    for match in re.finditer(r"FILE: (.*?)\n```json\n(.*?)```", result, re.DOTALL):
-        file_path = match.group(1).strip()
-        file_content = match.group(2).strip()
+    Args:
+        broken_files: File name to the reason it is requested again
+        save_file: Called as save_file(file_path, file_content) for a requested
+                   file, returns the saved name
 
-        # Get just the filename without any path
-        filename = os.path.basename(file_path)
+    Returns:
+        dict: Files that are still missing or invalid (empty when all were fixed)
+    """
+    for attempt in range(1, FILE_REPAIR_ATTEMPTS + 1):
+        if not broken_files:
+            break
+        print(
+            f"🔧 Requesting {', '.join(broken_files)} again ({attempt}/{FILE_REPAIR_ATTEMPTS})"
+        )
+        requested = set(broken_files)
 
-        # Save the file content
-        full_path = os.path.join(analysis_dir, filename)
-        save_json_file(full_path, file_content)
-        file_paths.append(filename)
+        def save_requested_file(file_path, file_content):
+            # Files that were already fine are kept as they are
+            if not any(match_file_name(file_path, name) for name in requested):
+                return None
+            return save_file(file_path, file_content)
 
-    return file_paths
+        repair_stream = FileBlockStream(save_requested_file)
+        final_response = ""
+        for event in runner.run(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=get_repair_prompt(broken_files),
+            run_config=get_run_config(),
+        ):
+            repair_stream.feed_event(event)
+            if event.is_final_response():
+                if event.content and event.content.parts:
+                    final_response = event.content.parts[0].text
+
+        repair_stream.finish(final_response)
+        broken_files = repair_stream.get_broken_files(broken_files)
+
+    if broken_files:
+        print(f"⚠️ Still missing or invalid: {', '.join(broken_files)}")
+    return broken_files
 
 
 def analyze_procedure_business_logic(procedure, project_path):
@@ -78,7 +158,10 @@ def analyze_procedure_business_logic(procedure, project_path):
     USER_ID = "project_owner"
     SESSION_ID = str(uuid.uuid4())
     session = session_service.create_session(
-        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        session_id=SESSION_ID,
+        state={"procedure": procedure, "project_path": project_path},
     )
 
     print("Created new session")
@@ -104,8 +187,11 @@ def analyze_procedure_business_logic(procedure, project_path):
         except (json.JSONDecodeError, FileNotFoundError):
             print("Warning: Could not load connection string from project file.")
 
-    # Get dependencies
-    dependencies = get_dependencies(procedure, project_path, connection_string)
+    # Get dependencies, trimmed to what the procedure references
+    dependencies = prune_dependencies(
+        get_dependencies(procedure, project_path, connection_string),
+        procedure_definition,
+    )
 
     # Create analysis directory
     analysis_dir = create_analysis_directory(procedure, project_path)
@@ -120,22 +206,39 @@ def analyze_procedure_business_logic(procedure, project_path):
     # Collect the final response
     final_response = ""
 
-    # Run the agent to generate business files
+    # Run the agent to generate business files, each file is saved as soon as it is complete
     print("Generating business logic files...")
+    file_stream = create_file_stream(analysis_dir)
     for event in runner.run(
         user_id=USER_ID,
         session_id=SESSION_ID,
-        new_message=get_prompt(procedure, procedure_definition, str(dependencies)),
+        new_message=get_prompt(
+            procedure, procedure_definition, str(dependencies), project_path
+        ),
+        run_config=get_run_config(),
     ):
+        file_stream.feed_event(event)
         if event.is_final_response():
             if event.content and event.content.parts:
                 final_response = event.content.parts[0].text
                 print(f"Received response from the agent")
 
-    # Extract and save files
-    saved_files = extract_files_from_response(final_response, analysis_dir)
+    # Extract and save the files that were not streamed
+    saved_files = extract_files_from_response(final_response, analysis_dir, file_stream)
     print(f"Created {len(saved_files)} business logic files in {analysis_dir}")
 
+    # Request only the files that are missing or invalid again
+    broken_files = repair_files(
+        runner,
+        USER_ID,
+        SESSION_ID,
+        file_stream.get_broken_files(business_logic_files),
+        lambda file_path, content: save_analysis_file(analysis_dir, file_path, content),
+    )
+    if broken_files:
+        print(f"Business logic files are still missing or invalid for {procedure}")
+        return None
+
     # Return the session for further use
     return session_service, APP_NAME, USER_ID, SESSION_ID
 
@@ -185,20 +288,36 @@ def analyze_procedure_returnable_objects(
 
         # Run the agent to generate returnable objects files
         print("Generating returnable objects files...")
+        file_stream = create_file_stream(analysis_dir)
         for event in runner.run(
             user_id=user_id,
             session_id=session_id,
             new_message=content,
+            run_config=get_run_config(),
         ):
+            file_stream.feed_event(event)
             if event.is_final_response():
                 if event.content and event.content.parts:
                     final_response = event.content.parts[0].text
                     print(f"Received response from the agent")
 
-        # Extract and save files
-        saved_files = extract_files_from_response(final_response, analysis_dir)
+        # Extract and save the files that were not streamed
+        saved_files = extract_files_from_response(
+            final_response, analysis_dir, file_stream
+        )
         print(f"Created {len(saved_files)} returnable objects files in {analysis_dir}")
-        return True
+
+        # Request only the files that are missing or invalid again
+        broken_files = repair_files(
+            runner,
+            user_id,
+            session_id,
+            file_stream.get_broken_files(returnable_objects_files),
+            lambda file_path, content: save_analysis_file(
+                analysis_dir, file_path, content
+            ),
+        )
+        return not broken_files
 
     except Exception as e:
         print(f"Error during returnable objects analysis: {str(e)}")
@@ -235,8 +354,11 @@ def business_analysis(procedure, project_path):
         except (json.JSONDecodeError, FileNotFoundError):
             print("Warning: Could not load connection string from project file.")
 
-    # Get procedure dependencies
-    dependencies = get_dependencies(procedure, project_path, connection_string)
+    # Get procedure dependencies, trimmed to what the procedure references
+    dependencies = prune_dependencies(
+        get_dependencies(procedure, project_path, connection_string),
+        procedure_definition,
+    )
 
     # Then immediately run returnable objects analysis
     session_service, app_name, user_id, session_id = session_info
@@ -261,6 +383,161 @@ def business_analysis(procedure, project_path):
         return False
 
 
+def run_batch_phase(
+    runner, user_id, session_id, prompt, project_path, procedure_names, files
+):
+    """
+    Run one analysis phase for a batch and split the response into the
+    procedure analysis folders.
+
+    Returns:
+        dict: Namespaced files that are still missing or invalid
+    """
+    final_response = ""
+    file_stream = create_batch_file_stream(project_path, procedure_names)
+    for event in runner.run(
+        user_id=user_id,
+        session_id=session_id,
+        new_message=prompt,
+        run_config=get_run_config(),
+    ):
+        file_stream.feed_event(event)
+        if event.is_final_response():
+            if event.content and event.content.parts:
+                final_response = event.content.parts[0].text
+                print("Received response from the agent")
+
+    saved_files = file_stream.finish(final_response)
+    print(f"Created {len(saved_files)} files for {len(procedure_names)} procedures")
+
+    # Request only the files that are missing or invalid again
+    return repair_files(
+        runner,
+        user_id,
+        session_id,
+        file_stream.get_broken_files(get_batch_file_names(procedure_names, files)),
+        lambda file_path, content: save_batch_file(
+            project_path, procedure_names, file_path, content
+        ),
+    )
+
+
+def business_analysis_batch(procedures, project_path):
+    """
+    Analyze several small procedures with one request per phase, the files of
+    every procedure are split back into its own analysis folder.
+
+    Returns:
+        dict: Procedure name to True when all its analysis files were created
+    """
+    print(f"\nStarting batched business analysis for {', '.join(procedures)}")
+
+    # Create a new session
+    session_service = InMemorySessionService()
+
+    APP_NAME = "Stored Procedure Modernization Analysis"
+    USER_ID = "project_owner"
+    SESSION_ID = str(uuid.uuid4())
+    session_service.create_session(
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        session_id=SESSION_ID,
+        state={"procedures": procedures, "project_path": project_path},
+    )
+
+    # Get connection string from project path if available
+    connection_string = None
+    conn_file_path = os.path.join(project_path, "connection_string.json")
+    if os.path.exists(conn_file_path):
+        try:
+            with open(conn_file_path, "r") as f:
+                conn_data = json.load(f)
+                connection_string = conn_data.get("connection_string")
+        except (json.JSONDecodeError, FileNotFoundError):
+            print("Warning: Could not load connection string from project file.")
+
+    results = {procedure: False for procedure in procedures}
+    batch = []
+    for procedure in procedures:
+        sql_file_path = os.path.join(
+            project_path, "sql_raw", procedure, f"{procedure}.sql"
+        )
+        try:
+            with open(sql_file_path, "r") as f:
+                procedure_definition = f.read()
+        except FileNotFoundError:
+            print(f"Error: SQL file not found at {sql_file_path}")
+            continue
+
+        # Get dependencies, trimmed to what the procedure references
+        dependencies = prune_dependencies(
+            get_dependencies(procedure, project_path, connection_string),
+            procedure_definition,
+        )
+        create_analysis_directory(procedure, project_path)
+        batch.append(
+            {
+                "name": procedure,
+                "definition": procedure_definition,
+                "dependencies": str(dependencies),
+            }
+        )
+
+    if not batch:
+        return results
+
+    runner = Runner(
+        agent=root_agent,
+        app_name=APP_NAME,
+        session_service=session_service,
+    )
+
+    try:
+        print("Generating business logic files...")
+        procedure_names = [procedure["name"] for procedure in batch]
+        broken_files = run_batch_phase(
+            runner,
+            USER_ID,
+            SESSION_ID,
+            get_batch_prompt(batch),
+            project_path,
+            procedure_names,
+            business_logic_files,
+        )
+
+        print("Generating returnable objects files...")
+        prompt, procedure_names = get_batch_returnable_objects_prompt(
+            batch, project_path
+        )
+        if prompt is not None:
+            broken_files.update(
+                run_batch_phase(
+                    runner,
+                    USER_ID,
+                    SESSION_ID,
+                    prompt,
+                    project_path,
+                    procedure_names,
+                    returnable_objects_files,
+                )
+            )
+    except Exception as e:
+        print(f"Error during batched business analysis: {str(e)}")
+        import traceback
+
+        traceback.print_exc()
+        return results
+
+    for procedure in procedure_names:
+        results[procedure] = not any(
+            name.startswith(f"{procedure}/") for name in broken_files
+        )
+    for procedure, succeeded in results.items():
+        icon = "✅" if succeeded else "❌"
+        print(f"{icon} Business analysis for {procedure}")
+    return results
+
+
 def run_business_analysis(project_path):
     """CLI menu function to select and analyze procedures"""
     print("=== Stored Procedure Business Analysis ===")
@@ -290,13 +567,33 @@ def run_business_analysis(project_path):
             return
 
         elif choice == len(procedures) + 1:
-            # Analyze all procedures
+            # Analyze all procedures that are not up to date
             completed = 0
-            total = len(procedures)
-
-            for procedure in procedures:
+            pending = get_pending_procedures(
+                project_path, "business-analysis", procedures
+            )
+            total = len(pending)
+
+            # Tiny procedures share one request per phase when batching is enabled
+            if BATCH_PROMPTING:
+                batches, pending = plan_batches(pending, project_path)
+                for batch in batches:
+                    print(
+                        f"\nProcessing {len(batch)} procedures in one batch ({completed+1}-{completed+len(batch)}/{total})..."
+                    )
+                    run_journaled_batch(
+                        "business-analysis",
+                        batch,
+                        project_path,
+                        business_analysis_batch,
+                    )
+                    completed += len(batch)
+
+            for procedure in pending:
                 print(f"\nProcessing {procedure} ({completed+1}/{total})...")
-                business_analysis(procedure, project_path)
+                run_journaled(
+                    "business-analysis", procedure, project_path, business_analysis
+                )
                 completed += 1
 
             print(f"\nBusiness analysis completed for all {completed} procedures.")
@@ -2,6 +2,8 @@ from google.genai import types
 import json
 import os
 import glob
+import difflib
+from app.shared.procedure_fingerprint import CLUSTER_TEMPLATES, load_procedure_cluster
 
 business_rules_json = """
 ```json
@@ -312,9 +314,8 @@ testable_units_json = """
 """
 
 
-def get_prompt(procedure_name, procedure_definition, dependencies):
-
-    prompt = f"""
+# Static analysis instructions, the procedure specific files follow them in the prompt
+business_logic_instructions = """
 ## Objective
 Analyze the provided SQL stored procedure using both the SQL code and static analysis data to decompose it into two main structures:
 1. Execution Flow: Steps, processes, and control flow
@@ -338,11 +339,6 @@ Consider the SQL procedure as containing two interrelated tracks:
    - Business functions represent logical capabilities that can be reused
    - Functions contain the actual implementation details
 
-## Provided Files
-1. The original SQL stored procedure code
-[{procedure_definition}]
-2. The stored procedure dependencies
-[{dependencies}]
 
 
 ## Control Flow Types:
@@ -353,9 +349,163 @@ Consider the SQL procedure as containing two interrelated tracks:
 
 Ensure that every aspect of the SQL code is covered by at least one testable unit, with no gaps in coverage.
 Take the time to review the outputs and make sure they truly reflect the content of the stored procedure.
+"""
+
+returnable_objects_instructions = """
+## Objective
+Analyze the provided SQL stored procedure using both the SQL code and static analysis data to decompose it into two main structures:
+1. Execution Flow: Steps, processes, and control flow
+2. Business Logic: Functions and testable units
+
+
+## Your Task
+1. Thoroughly analyze the SQL stored procedure and reference the static analysis data as a helpful guide
+2. For testable units: Create simplified skeletal structures focusing on identification and categorization
+3. For all other components (business functions, processes, objects, mappings): Create fully populated detailed structures
+4. Ensure every aspect of the SQL code is covered by at least one testable unit
+5. Use your own analysis and judgment to identify the structure, using static analysis data as a reference but not as the sole determinant
+
+## Conceptual Framework
+Consider the SQL procedure as containing two interrelated tracks:
+
+1. Execution Flow Track:
+   - Business processes represent end-to-end workflows
+   - Steps define the sequence of actions within a process
+   - Each step references a business function that implements its logic
+
+2. Business Logic Track:
+   - Business functions represent logical capabilities that can be reused
+   - Testable units are atomic, verifiable units of business logic within functions
+   - Functions contain the actual implementation details
+
+Object mappings create connections between both tracks by linking steps, functions, and data objects.
+
+## Static Analysis as Reference Only
+The static analysis data (analysis.json) is provided as a helpful reference, but you should make your own determinations about:
+- What constitutes a testable unit
+- How business functions should be organized
+- What processes are present in the code
+- What objects are returned and under what conditions
+
+Use the static analysis to inform your work, but critically evaluate its suggestions and make independent judgments about the code's structure and meaning.
+
+## Focus for Testable Units
+For testable units, focus on:
+1. IDENTIFICATION: Unique ID and descriptive name
+2. CATEGORIZATION: Functional category
+3. PARENT RELATIONSHIP: Link to parent business function
+4. CODE BOUNDARIES: Line numbers where the unit begins and ends
+
+
+
+
+## Control Flow Types:
+- "decision": Use for IF/ELSE blocks, CASE statements, or loop constructs
+- "standard": Use for sequential statements without branching or looping
+- "terminal": Use for final steps that return data or end execution
+- "merge": Use when multiple flow paths converge
+
+Ensure that every aspect of the SQL code is covered by at least one testable unit, with no gaps in coverage.
+Take the time to review the outputs and make sure they truly reflect the content of the stored procedure.
+
+"""
+
+# Files each phase of the analysis must return
+business_logic_files = [
+    "business_rules.json",
+    "business_functions.json",
+    "business_processes.json",
+]
+returnable_objects_files = [
+    "returnable_objects.json",
+    "process_object_mapping.json",
+    "testable_units.json",
+]
+
+# Structure of every file, used when a single file is requested again
+file_templates = {
+    "business_rules.json": business_rules_json,
+    "business_functions.json": business_functions_json,
+    "business_processes.json": business_processes_json,
+    "returnable_objects.json": returnable_objects_json,
+    "process_object_mapping.json": process_object_mapping_json,
+    "testable_units.json": testable_units_json,
+}
+
+
+def get_template_section(procedure_name, project_path, procedure_definition, file_names):
+    """
+    Offer the finished analysis of a near-duplicate procedure as a worked
+    example, together with the code differences.
+
+    Returns:
+        str: Prompt section ("" when there is no analyzed near-duplicate)
+    """
+    if not CLUSTER_TEMPLATES or not project_path:
+        return ""
+    cluster = load_procedure_cluster(procedure_name, project_path)
+    if not cluster:
+        return ""
+
+    template = cluster["template"]
+    template_files = []
+    for filename in file_names:
+        path = os.path.join(project_path, "analysis", template, filename)
+        try:
+            with open(path, "r") as f:
+                template_files.append((filename, json.dumps(json.load(f), indent=2)))
+        except (FileNotFoundError, json.JSONDecodeError):
+            # Only complete analyses are used as an example
+            return ""
+
+    sql_file = os.path.join(project_path, "sql_raw", template, f"{template}.sql")
+    try:
+        with open(sql_file, "r") as f:
+            template_definition = f.read()
+    except FileNotFoundError:
+        return ""
+
+    diff = "\n".join(
+        difflib.unified_diff(
+            template_definition.splitlines(),
+            procedure_definition.splitlines(),
+            fromfile=template,
+            tofile=procedure_name,
+            lineterm="",
+            n=1,
+        )
+    )
+    examples = "\n\n".join(
+        f"### {filename} of {template}\n```json\n{content}\n```"
+        for filename, content in template_files
+    )
+    print(f"Using the analysis of near-duplicate {template} as a template")
+    return f"""
+## Near-Duplicate Procedure
+{template} is {cluster['similarity']:.0%} similar to this procedure and was already analyzed. Use its files below as a worked example: keep their structure and level of detail, and adapt every name, literal, line number and rule to the differences. Only this procedure's own code is the source of truth.
+
+Differences between {template} and this procedure:
+```diff
+{diff}
 ```
+
+{examples}
 """
 
+
+def get_prompt(procedure_name, procedure_definition, dependencies, project_path=None):
+    template_section = get_template_section(
+        procedure_name, project_path, procedure_definition, business_logic_files
+    )
+
+    prompt = f"""{business_logic_instructions}
+## Provided Files
+1. The original SQL stored procedure code
+[{procedure_definition}]
+2. The stored procedure dependencies
+[{dependencies}]
+{template_section}"""
+
     task = types.Content(
         role="user",
         parts=[
@@ -452,73 +602,22 @@ def get_returnable_objects_prompt(
         with open(business_processes_path, "r") as f:
             business_processes = json.load(f)
 
-        prompt = f"""
-## Objective
-Analyze the provided SQL stored procedure using both the SQL code and static analysis data to decompose it into two main structures:
-1. Execution Flow: Steps, processes, and control flow
-2. Business Logic: Functions and testable units
-
-
-## Your Task
-1. Thoroughly analyze the SQL stored procedure and reference the static analysis data as a helpful guide
-2. For testable units: Create simplified skeletal structures focusing on identification and categorization
-3. For all other components (business functions, processes, objects, mappings): Create fully populated detailed structures
-4. Ensure every aspect of the SQL code is covered by at least one testable unit
-5. Use your own analysis and judgment to identify the structure, using static analysis data as a reference but not as the sole determinant
-
-## Conceptual Framework
-Consider the SQL procedure as containing two interrelated tracks:
-
-1. Execution Flow Track:
-   - Business processes represent end-to-end workflows
-   - Steps define the sequence of actions within a process
-   - Each step references a business function that implements its logic
-
-2. Business Logic Track:
-   - Business functions represent logical capabilities that can be reused
-   - Testable units are atomic, verifiable units of business logic within functions
-   - Functions contain the actual implementation details
-
-Object mappings create connections between both tracks by linking steps, functions, and data objects.
-
-## Static Analysis as Reference Only
-The static analysis data (analysis.json) is provided as a helpful reference, but you should make your own determinations about:
-- What constitutes a testable unit
-- How business functions should be organized
-- What processes are present in the code
-- What objects are returned and under what conditions
-
-Use the static analysis to inform your work, but critically evaluate its suggestions and make independent judgments about the code's structure and meaning.
-
-## Focus for Testable Units
-For testable units, focus on:
-1. IDENTIFICATION: Unique ID and descriptive name
-2. CATEGORIZATION: Functional category
-3. PARENT RELATIONSHIP: Link to parent business function
-4. CODE BOUNDARIES: Line numbers where the unit begins and ends
-
+        template_section = get_template_section(
+            procedure_name, project_path, procedure_definition, returnable_objects_files
+        )
 
+        prompt = f"""{returnable_objects_instructions}
 ## Provided Files
 1. The original SQL stored procedure code
 [{procedure_definition}]
 2. The stored procedure dependencies
 [{dependencies}]
 
-
-## Control Flow Types:
-- "decision": Use for IF/ELSE blocks, CASE statements, or loop constructs
-- "standard": Use for sequential statements without branching or looping
-- "terminal": Use for final steps that return data or end execution
-- "merge": Use when multiple flow paths converge
-
-Ensure that every aspect of the SQL code is covered by at least one testable unit, with no gaps in coverage.
-Take the time to review the outputs and make sure they truly reflect the content of the stored procedure.
-
 ## Business Analysis Files:
 1. {business_rules}
 2. {business_functions}
 3. {business_processes}
-
+{template_section}
 ## Deliverables
 Produce exactly 2 JSON files:
 1. returnable_objects.json  
@@ -551,3 +650,168 @@ FILE: testable_units.json
 
         traceback.print_exc()
         return None
+
+
+def load_business_logic_files(procedure_name, project_path):
+    """
+    Read the business logic files of a procedure.
+
+    Returns:
+        list: Parsed files in business_logic_files order, None when one is missing or invalid
+    """
+    analysis_dir = os.path.join(project_path, "analysis", procedure_name)
+    files = []
+    for filename in business_logic_files:
+        try:
+            with open(os.path.join(analysis_dir, filename), "r") as f:
+                files.append(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            print(f"Error: No valid {filename} found in {analysis_dir}")
+            return None
+    return files
+
+
+def get_batch_output_format(procedure_names, file_names):
+    """FILE block instructions for a response with a folder per procedure"""
+    expected = "\n".join(
+        f"FILE: {procedure_name}/{filename}"
+        for procedure_name in procedure_names
+        for filename in file_names
+    )
+    templates = "\n\n".join(
+        f"FILE: <procedure>/{filename}\n{file_templates[filename]}"
+        for filename in file_names
+    )
+    return f"""
+ALWAYS RESPOND WITH: 
+FILE: <procedure>/<file_name>
+```json
+<code>
+```
+
+The response should have {len(procedure_names) * len(file_names)} files, {len(file_names)} for every procedure, each under the exact procedure name:
+
+{expected}
+
+Every file of a procedure only describes that procedure. The files have the following structure:
+
+{templates}
+"""
+
+
+def get_batch_prompt(procedures):
+    """
+    Generate the business logic prompt for several small procedures at once.
+
+    Args:
+        procedures: List of {"name", "definition", "dependencies"} dicts
+
+    Returns:
+        types.Content: Prompt with the instructions once and a section per procedure
+    """
+    sections = "\n\n".join(
+        f"""### Procedure: {procedure['name']}
+1. The original SQL stored procedure code
+[{procedure['definition']}]
+2. The stored procedure dependencies
+[{procedure['dependencies']}]"""
+        for procedure in procedures
+    )
+    procedure_names = [procedure["name"] for procedure in procedures]
+
+    text = f"""{business_logic_instructions}
+## Provided Procedures
+Analyze each of the following {len(procedures)} stored procedures separately.
+
+{sections}
+{get_batch_output_format(procedure_names, business_logic_files)}"""
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def get_batch_returnable_objects_prompt(procedures, project_path):
+    """
+    Generate the returnable objects prompt for several small procedures at once.
+
+    Args:
+        procedures: List of {"name", "definition", "dependencies"} dicts
+        project_path: Project path
+
+    Returns:
+        tuple: (types.Content or None, names of the procedures in the prompt),
+               procedures without business logic files are left out
+    """
+    sections = []
+    procedure_names = []
+    for procedure in procedures:
+        business_files = load_business_logic_files(procedure["name"], project_path)
+        if business_files is None:
+            continue
+        business_rules, business_functions, business_processes = business_files
+        procedure_names.append(procedure["name"])
+        sections.append(
+            f"""### Procedure: {procedure['name']}
+1. The original SQL stored procedure code
+[{procedure['definition']}]
+2. The stored procedure dependencies
+[{procedure['dependencies']}]
+3. Business Analysis Files:
+   1. {business_rules}
+   2. {business_functions}
+   3. {business_processes}"""
+        )
+
+    if not procedure_names:
+        return None, []
+
+    sections = "\n\n".join(sections)
+    text = f"""{returnable_objects_instructions}
+## Provided Procedures
+Analyze each of the following {len(procedure_names)} stored procedures separately.
+
+{sections}
+
+## Deliverables
+Produce exactly 3 JSON files for every procedure:
+1. returnable_objects.json
+2. process_object_mapping.json
+3. testable_units.json
+{get_batch_output_format(procedure_names, returnable_objects_files)}"""
+    return types.Content(role="user", parts=[types.Part(text=text)]), procedure_names
+
+
+def get_repair_prompt(broken_files):
+    """
+    Ask for only the files of the previous response that were missing or invalid.
+
+    Args:
+        broken_files: File name to the reason it is requested again
+
+    Returns:
+        types.Content: Follow-up message for the same session
+    """
+    problems = "\n".join(f"- {name}: {reason}" for name, reason in broken_files.items())
+    templates = "\n\n".join(
+        f"FILE: {name}\n{file_templates.get(os.path.basename(name), '')}".rstrip()
+        for name in broken_files
+    )
+    return types.Content(
+        role="user",
+        parts=[
+            types.Part(
+                text=f"""
+These files of your previous response could not be used:
+{problems}
+
+Respond again with ONLY these files, complete and valid JSON (no comments, no trailing commas). Do not repeat the other files, they are already saved.
+
+ALWAYS RESPOND WITH: 
+FILE: <file_name>
+```json
+<code>
+```
+
+{templates}
+"""
+            )
+        ],
+    )
@@ -1,15 +1,27 @@
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
+from app.shared.rate_limiter import RateLimitedLiteLLMClient
 from app.agents.model_configuration import llm
+from app.agents.model_callbacks import before_model_callback, after_model_callback
+from app.agents.csharp_test_generation_agent.prompt import test_instructions
+from app.shared.prompt_caching import get_prompt_cache_args
 
 # Set the agent
 root_agent = Agent(
     name="csharp_test_generation_agent",
-    model=LiteLlm(model=llm),
+    model=LiteLlm(
+        model=llm,
+        llm_client=RateLimitedLiteLLMClient(),
+        **get_prompt_cache_args(llm),
+    ),
     description="""
 Generate a xUnit test for a C# implementation
 """,
-    instruction="""
+    instruction=f"""
 You are an experienced C# developer with strong C# skills analyzing test specification and providing C# unit test code testing the C# API endpoints and repository.
+
+{test_instructions}
 """,
+    before_model_callback=before_model_callback,
+    after_model_callback=after_model_callback,
 )
@@ -13,8 +13,14 @@ sys.path.append(
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 from google.genai import types
-from app.agents.csharp_test_generation_agent.prompt import get_prompt
+from app.agents.csharp_test_generation_agent.prompt import get_prompt, get_prompt_context
 from app.agents.csharp_test_generation_agent.agent import root_agent
+from app.shared.concurrency import map_concurrently
+from app.shared.stage_journal import (
+    get_pending_procedures,
+    record_written,
+    run_journaled,
+)
 
 
 def get_procedures(project_path):
@@ -45,6 +51,7 @@ def save_test_file(project_path, procedure, scenario_id, code):
         # Save the file
         with open(file_path, "w") as f:
             f.write(code)
+        record_written(file_path)
         print(f"  ✅ Created test file: {file_name}")
         return True
     except Exception as e:
@@ -103,8 +110,75 @@ def extract_csharp_code(response_text):
     return response_text
 
 
-def generate_csharp_test(procedure, project_path):
-    """Generate C# tests for a procedure"""
+def generate_scenario_test(
+    runner, procedure, project_path, scenario, index, total_count, prompt_context
+):
+    """
+    Generate the C# test of a single scenario and write it as soon as it is ready
+
+    Returns:
+        bool: True if the test file was created
+    """
+    # Extract scenario ID and description
+    scenario_id = scenario.get("testId", scenario.get("id", f"test{index+1}"))
+    description = scenario.get("description", "No description")
+
+    print(
+        f"  Generating test for scenario {scenario_id}: {description} ({index+1}/{total_count})"
+    )
+
+    try:
+        # Create session
+        session_id = f"csharp_test_{procedure}_{scenario_id}_{uuid.uuid4().hex[:8]}"
+        runner.session_service.create_session(
+            app_name="csharp_test_generation_agent",
+            user_id="user",
+            session_id=session_id,
+            state={"procedure": procedure, "project_path": project_path},
+        )
+
+        # Create prompt and run the agent (the prompt is already a Content object)
+        prompt_text = get_prompt(procedure, project_path, scenario, prompt_context)
+
+        # Get the response
+        response_text = None
+        for event in runner.run(
+            user_id="user",
+            session_id=session_id,
+            new_message=prompt_text,
+        ):
+            if hasattr(event, "is_final_response") and event.is_final_response():
+                if event.content and event.content.parts:
+                    response_text = event.content.parts[0].text
+                    print(f"  Received response for scenario {scenario_id}")
+
+        if not response_text:
+            print(f"  ❌ No response received for scenario {scenario_id}")
+            return False
+
+        # Extract C# code from the response and save the file
+        code = extract_csharp_code(response_text)
+        return save_test_file(project_path, procedure, scenario_id, code)
+
+    except Exception as e:
+        print(f"  ❌ Error generating test for scenario {scenario_id}: {str(e)}")
+        traceback.print_exc()
+        return False
+
+
+def generate_csharp_test(procedure, project_path, max_workers=None):
+    """
+    Generate C# tests for a procedure
+
+    Args:
+        procedure: Procedure name
+        project_path: Project path
+        max_workers: Number of scenarios generated at the same time
+                     (defaults to LLM_MAX_CONCURRENCY, 1 generates them one by one)
+
+    Returns:
+        bool: True if at least one test file was created
+    """
     print(f"\nGenerating C# tests for {procedure}...")
 
     # Get integration test spec
@@ -124,6 +198,13 @@ def generate_csharp_test(procedure, project_path):
         print(f"No test scenarios found in specifications for {procedure}")
         return False
 
+    # Service, DbContext, DTO and model sources are read once for all scenarios
+    try:
+        prompt_context = get_prompt_context(procedure, project_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Could not load the C# context for {procedure}: {str(e)}")
+        return False
+
     # Create the session service
     session_service = InMemorySessionService()
 
@@ -135,59 +216,18 @@ def generate_csharp_test(procedure, project_path):
     )
 
     total_count = len(test_scenarios)
-    success_count = 0
 
-    # Process each test scenario
-    for i, scenario in enumerate(test_scenarios):
-        # Extract scenario ID and description
-        scenario_id = scenario.get("testId", scenario.get("id", f"test{i+1}"))
-        description = scenario.get("description", "No description")
-
-        print(
-            f"  Generating test for scenario {scenario_id}: {description} ({i+1}/{total_count})"
+    # The shared rate limiter of the model client paces the requests
+    def generate(indexed_scenario):
+        index, scenario = indexed_scenario
+        return generate_scenario_test(
+            runner, procedure, project_path, scenario, index, total_count, prompt_context
         )
 
-        try:
-            # Create session
-            session_id = f"csharp_test_{procedure}_{scenario_id}"
-            session_service.create_session(
-                app_name="csharp_test_generation_agent",
-                user_id="user",
-                session_id=session_id,
-            )
-
-            # Create prompt and run the agent
-            prompt_text = get_prompt(procedure, project_path, scenario)
-
-            # The prompt_text is already a Content object, so use it directly
-            # instead of creating a new one
-
-            # Get the response
-            response_text = None
-            for event in runner.run(
-                user_id="user",
-                session_id=session_id,
-                new_message=prompt_text,
-            ):
-                if hasattr(event, "is_final_response") and event.is_final_response():
-                    if event.content and event.content.parts:
-                        response_text = event.content.parts[0].text
-                        print(f"  Received response for scenario {scenario_id}")
-
-            # If we got a response, process it
-            if response_text:
-                # Extract C# code from the response
-                code = extract_csharp_code(response_text)
-
-                # Save the file
-                if save_test_file(project_path, procedure, scenario_id, code):
-                    success_count += 1
-            else:
-                print(f"  ❌ No response received for scenario {scenario_id}")
-
-        except Exception as e:
-            print(f"  ❌ Error generating test for scenario {scenario_id}: {str(e)}")
-            traceback.print_exc()
+    results = map_concurrently(
+        generate, list(enumerate(test_scenarios)), max_workers=max_workers
+    )
+    success_count = sum(1 for result in results if result)
 
     # Show summary
     print(
@@ -226,15 +266,18 @@ def run_csharp_test_generation(project_path):
             return generate_csharp_test(procedure, project_path)
 
         elif choice == len(procedures) + 1:
-            # Generate tests for all procedures
+            # Generate tests for all procedures that are not up to date
             success_count = 0
-            for i, procedure in enumerate(procedures):
-                print(f"\nProcessing {procedure} ({i+1}/{len(procedures)})...")
-                if generate_csharp_test(procedure, project_path):
+            pending = get_pending_procedures(project_path, "csharp-tests", procedures)
+            for i, procedure in enumerate(pending):
+                print(f"\nProcessing {procedure} ({i+1}/{len(pending)})...")
+                if run_journaled(
+                    "csharp-tests", procedure, project_path, generate_csharp_test
+                ):
                     success_count += 1
 
             print(
-                f"\nC# test generation completed for {success_count} of {len(procedures)} procedures."
+                f"\nC# test generation completed for {success_count} of {len(pending)} procedures."
             )
             return success_count > 0
 
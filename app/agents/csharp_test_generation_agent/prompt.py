@@ -30,27 +30,51 @@ ALL THE TESTS NEEDS TO BE SUCCESSFUL.
 """
 
 
-def get_prompt(procedure_name, project_path, scenario):
+test_instructions = f"""
+### Instructions
+
+* Populate the `SeedScenarioData()` method explicitly from the provided JSON scenario (`testDataSetup`). Ensure data types and relationships exactly match as defined.
+* Execute the service method `SERVICE_METHOD_NAME` using parameters explicitly from the provided `testParameters`.
+* Assert the results strictly based on the provided `validationCriteria.expectedResult`.
+
+### Critical Rules
+
+* **NO MOCKS**: Do NOT use Moq or any mocks for DbContext or repositories. Directly interact with the provided minimal DbContext using EF Core's InMemoryDatabase.
+* Ensure the test is immediately compilable and runnable without further modification.
+* The assertions must exactly match the fields defined in `validationCriteria.expectedResult`.
+
+**Project packages:**
+   Top-level Package                               Requested   Resolved
+   > Microsoft.AspNetCore.OpenApi                  7.0.0       7.0.0
+   > Microsoft.Data.SqlClient                      6.0.1       6.0.1
+   > Microsoft.EntityFrameworkCore                 9.0.3       9.0.3
+   > Microsoft.EntityFrameworkCore.Design          9.0.3       9.0.3
+   > Microsoft.EntityFrameworkCore.InMemory        9.0.3       9.0.3
+   > Microsoft.EntityFrameworkCore.Relational      9.0.3       9.0.3
+   > Microsoft.EntityFrameworkCore.SqlServer       9.0.3       9.0.3
+   > Microsoft.NET.Test.Sdk                        17.12.0     17.12.0
+   > Moq                                           4.20.72     4.20.72
+   > Moq.EntityFrameworkCore                       7.0.0.2     7.0.0.2
+   > Newtonsoft.Json                               13.0.3      13.0.3
+   > Swashbuckle.AspNetCore                        6.5.0       6.5.0
+   > xUnit                                         2.9.3       2.9.3
+   > xunit.runner.visualstudio                     3.0.2       3.0.2
+
+{important_rules}
+"""
+
+
+def get_prompt_context(procedure_name, project_path):
     """
-    Generate prompt for test generation
+    Load the C# context shared by all scenario prompts of a procedure
 
     Args:
         procedure_name: Name of the procedure
-        procedure_definition: SQL code of the procedure
         project_path: Project path
 
     Returns:
-        Prompt for the agent
+        dict: service, DbContext, DTO and model sources used in the prompt
     """
-
-    # Get scenario ID from either 'id' or 'testId' field
-    scenario_id = scenario.get("testId", scenario.get("id", "unknown"))
-
-    # If the scenario ID is part of a test name like "BR-001-positive", extract it
-    if "-" in scenario_id:
-        # Extract just the ID part (e.g., "BR-001" from "BR-001-positive")
-        scenario_id = scenario_id.split("-")[0] + "-" + scenario_id.split("-")[1]
-
     procedure_name_only = procedure_name.split(".")[-1]
 
     # EF analysis
@@ -250,6 +274,45 @@ def get_prompt(procedure_name, project_path, scenario):
         with open(mapper_file, "r") as f:
             mapper_files_content.append(f.read())
 
+    return {
+        "service_content": service_content,
+        "relevant_dbcontext_content": relevant_dbcontext_content,
+        "dto_files_content": dto_files_content,
+        "model_files_content": model_files_content,
+    }
+
+
+def get_prompt(procedure_name, project_path, scenario, context=None):
+    """
+    Generate prompt for test generation
+
+    Args:
+        procedure_name: Name of the procedure
+        project_path: Project path
+        scenario: Integration test scenario
+        context: Output of get_prompt_context, loaded when not provided
+
+    Returns:
+        Prompt for the agent
+    """
+
+    # Get scenario ID from either 'id' or 'testId' field
+    scenario_id = scenario.get("testId", scenario.get("id", "unknown"))
+
+    # If the scenario ID is part of a test name like "BR-001-positive", extract it
+    if "-" in scenario_id:
+        # Extract just the ID part (e.g., "BR-001" from "BR-001-positive")
+        scenario_id = scenario_id.split("-")[0] + "-" + scenario_id.split("-")[1]
+
+    procedure_name_only = procedure_name.split(".")[-1]
+
+    if context is None:
+        context = get_prompt_context(procedure_name, project_path)
+    service_content = context["service_content"]
+    relevant_dbcontext_content = context["relevant_dbcontext_content"]
+    dto_files_content = context["dto_files_content"]
+    model_files_content = context["model_files_content"]
+
     csharp_template = f"""
 using System;
 using System.Linq;
@@ -338,24 +401,14 @@ namespace sql2code.Tests.{procedure_name_only}_{scenario_id}
 }}
 """
 
-    # Format the prompt
+    # Static instructions and rules live in the agent instruction. The
+    # procedure files come before the scenario so every scenario of a
+    # procedure shares the same cacheable prompt prefix.
     prompt = f"""
-Generate a concise xUnit integration test for using EF Core's InMemoryDatabase.
-
-### Instructions
-
-* Populate the `SeedScenarioData()` method explicitly from the provided JSON scenario (`testDataSetup`). Ensure data types and relationships exactly match as defined.
-* Execute the service method `SERVICE_METHOD_NAME` using parameters explicitly from the provided `testParameters`.
-* Assert the results strictly based on the provided `validationCriteria.expectedResult`.
+Generate a concise xUnit integration test for using EF Core's InMemoryDatabase, following the instructions and rules from your instructions.
 
 ### Provided Files
 
-* **Scenario Data:**
-
-```json
-{scenario}
-```
-
 * **Service Implementation:**
 
 ```csharp
@@ -380,30 +433,13 @@ Generate a concise xUnit integration test for using EF Core's InMemoryDatabase.
 {model_files_content}
 ```
 
-### Critical Rules
+### Test Scenario
 
-* **NO MOCKS**: Do NOT use Moq or any mocks for DbContext or repositories. Directly interact with the provided minimal DbContext using EF Core's InMemoryDatabase.
-* Ensure the test is immediately compilable and runnable without further modification.
-* The assertions must exactly match the fields defined in `validationCriteria.expectedResult`.
-
-**Project packages:**
-   Top-level Package                               Requested   Resolved
-   > Microsoft.AspNetCore.OpenApi                  7.0.0       7.0.0
-   > Microsoft.Data.SqlClient                      6.0.1       6.0.1
-   > Microsoft.EntityFrameworkCore                 9.0.3       9.0.3
-   > Microsoft.EntityFrameworkCore.Design          9.0.3       9.0.3
-   > Microsoft.EntityFrameworkCore.InMemory        9.0.3       9.0.3
-   > Microsoft.EntityFrameworkCore.Relational      9.0.3       9.0.3
-   > Microsoft.EntityFrameworkCore.SqlServer       9.0.3       9.0.3
-   > Microsoft.NET.Test.Sdk                        17.12.0     17.12.0
-   > Moq                                           4.20.72     4.20.72
-   > Moq.EntityFrameworkCore                       7.0.0.2     7.0.0.2
-   > Newtonsoft.Json                               13.0.3      13.0.3
-   > Swashbuckle.AspNetCore                        6.5.0       6.5.0
-   > xUnit                                         2.9.3       2.9.3
-   > xunit.runner.visualstudio                     3.0.2       3.0.2
+* **Scenario Data:**
 
-{important_rules}
+```json
+{scenario}
+```
 """
 
     task = types.Content(
@@ -2,13 +2,15 @@ import os
 import sys
 import json
 import uuid
-import re
 import glob
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 from app.agents.faq_builder_agent.prompt import get_prompt
 from app.agents.faq_builder_agent.agent import root_agent
+from app.shared.file_block_stream import FileBlockStream, get_run_config
+from app.shared.stage_journal import record_written
 from app.shared.get_dependencies import get_dependencies
+from app.shared.prompt_context import prune_dependencies
 
 # Add parent directory to path to ensure imports work
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -43,26 +45,29 @@ def save_json_file(file_path, content):
     # Save the file content
     with open(file_path, "w") as f:
         f.write(content)
+    record_written(file_path)
 
 
-def extract_files_from_response(result, analysis_dir):
-    """Extract JSON files from the model response and save them"""
-    file_paths = []
-
-    # Extract file paths and contents
-    for match in re.finditer(r"FILE: (.*?)\n```json\n(.*?)```", result, re.DOTALL):
-        file_path = match.group(1).strip()
-        file_content = match.group(2).strip()
+def create_file_stream(analysis_dir):
+    """Create a parser that saves each FILE block as soon as it is complete"""
 
+    def save_file(file_path, file_content):
         # Get just the filename without any path
         filename = os.path.basename(file_path)
 
         # Save the file content
         full_path = os.path.join(analysis_dir, filename)
         save_json_file(full_path, file_content)
-        file_paths.append(filename)
+        return filename
+
+    return FileBlockStream(save_file)
+
 
-    return file_paths
+def extract_files_from_response(result, analysis_dir, file_stream=None):
+    """Extract JSON files from the model response and save the ones not streamed yet"""
+    if file_stream is None:
+        file_stream = create_file_stream(analysis_dir)
+    return file_stream.finish(result)
 
 
 def check_required_files(procedure, project_path):
@@ -117,7 +122,10 @@ def faq_builder(procedure, project_path):
     USER_ID = "project_owner"
     SESSION_ID = str(uuid.uuid4())
     session = session_service.create_session(
-        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        session_id=SESSION_ID,
+        state={"procedure": procedure, "project_path": project_path},
     )
 
     print("Created new session")
@@ -136,19 +144,24 @@ def faq_builder(procedure, project_path):
     # Collect the final response
     final_response = ""
 
-    # Get dependencies
-    dependencies = get_dependencies(procedure, project_path)
+    # Get dependencies, trimmed to what the procedure references
+    dependencies = prune_dependencies(
+        get_dependencies(procedure, project_path), procedure_definition
+    )
 
     # Run the agent to generate FAQ
     print("Generating FAQ...")
     try:
+        file_stream = create_file_stream(analysis_dir)
         for event in runner.run(
             user_id=USER_ID,
             session_id=SESSION_ID,
             new_message=get_prompt(
                 procedure, procedure_definition, dependencies, project_path
             ),
+            run_config=get_run_config(),
         ):
+            file_stream.feed_event(event)
             if event.is_final_response():
                 if event.content and event.content.parts:
                     final_response = event.content.parts[0].text
@@ -163,8 +176,10 @@ def faq_builder(procedure, project_path):
                         )
                         print("First 150 chars of response:", final_response[:150])
 
-        # Extract and save files
-        saved_files = extract_files_from_response(final_response, analysis_dir)
+        # Extract and save the files that were not streamed
+        saved_files = extract_files_from_response(
+            final_response, analysis_dir, file_stream
+        )
         print(f"Created {len(saved_files)} implementation plan files in {analysis_dir}")
         return True
 
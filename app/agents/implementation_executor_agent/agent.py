@@ -1,11 +1,13 @@
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
+from app.shared.rate_limiter import RateLimitedLiteLLMClient
 from app.agents.model_configuration import llm
+from app.agents.model_callbacks import before_model_callback, after_model_callback
 
 # Set the agent
 root_agent = Agent(
     name="implementation_executor_agent",
-    model=LiteLlm(model=llm),
+    model=LiteLlm(model=llm, llm_client=RateLimitedLiteLLMClient()),
     description="Execute implementation plan for stored procedures",
     instruction="""
 You are a highly experienced C# developer with expertise in:
@@ -32,4 +34,6 @@ FILE: [filename]
 
 Be thorough and meticulous in your implementation, ensuring all business rules are properly implemented.
 """,
+    before_model_callback=before_model_callback,
+    after_model_callback=after_model_callback,
 )
@@ -2,12 +2,17 @@ import os
 import sys
 import json
 import uuid
-import re
 import glob
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 from app.agents.implementation_executor_agent.prompt import get_prompt
 from app.agents.implementation_executor_agent.agent import root_agent
+from app.shared.file_block_stream import FileBlockStream, get_run_config
+from app.shared.stage_journal import (
+    get_pending_procedures,
+    record_written,
+    run_journaled,
+)
 from app.shared.get_dependencies import get_dependencies
 
 # Add parent directory to path to ensure imports work
@@ -28,70 +33,70 @@ def get_procedures(project_path):
     return procedures
 
 
-def extract_files_from_response(result, project_path):
-    """Extract C# files from the model response and save them to csharp-code directory"""
-    # Extract file names and codes
-    file_paths = []
-    file_contents = []
+# FILE: <path> followed by a ```csharp/json/xml fenced block
+CODE_FILE_BLOCK_PATTERN = r"FILE:\s*([\w./\\-]+)\s*```(?:csharp|json|xml)\s*(.*?)```"
 
-    # Extract file paths and contents - FIXED REGEX PATTERN
-    pattern = r"FILE:\s*([\w./\\-]+)\s*```(?:csharp|json|xml)\s*(.*?)```"
-    for match in re.finditer(pattern, result, re.DOTALL):
-        file_path = match.group(1).strip()
-        file_content = match.group(2).strip()
 
-        # Skip empty paths or contents
-        if not file_path or not file_content:
-            continue
-
-        file_paths.append(file_path)
-        file_contents.append(file_content)
-
-    # Create csharp-code directory
-    csharp_dir = os.path.join(project_path, "csharp-code")
-    os.makedirs(csharp_dir, exist_ok=True)
+def save_code_file(file_path, file_content, csharp_dir):
+    """Save a generated file below the csharp-code directory"""
+    try:
+        # Clean the file path (remove any unexpected characters)
+        clean_path = file_path.strip()
 
-    created_files = []
+        # Create the full directory path
+        full_dir = os.path.join(csharp_dir, os.path.dirname(clean_path))
+        os.makedirs(full_dir, exist_ok=True)
 
-    # Create each file in the appropriate directory
-    for file_path, file_content in zip(file_paths, file_contents):
-        try:
-            # Clean the file path (remove any unexpected characters)
-            clean_path = file_path.strip()
+        # Save the file content
+        full_path = os.path.join(csharp_dir, clean_path)
 
-            # Create the full directory path
-            full_dir = os.path.join(csharp_dir, os.path.dirname(clean_path))
-            os.makedirs(full_dir, exist_ok=True)
+        # Check if path is too long
+        if len(full_path) > 255:  # Maximum path length on most systems
+            print(f"⚠️ Path too long, truncating: {clean_path}")
+            # Truncate the filename if needed
+            base_dir = os.path.dirname(full_path)
+            filename = os.path.basename(clean_path)
+            if len(filename) > 50:
+                filename = filename[:45] + "..." + filename[-5:]
+            full_path = os.path.join(base_dir, filename)
 
-            # Save the file content
-            full_path = os.path.join(csharp_dir, clean_path)
+        with open(full_path, "w") as f:
+            f.write(file_content)
+        record_written(full_path)
 
-            # Check if path is too long
-            if len(full_path) > 255:  # Maximum path length on most systems
-                print(f"⚠️ Path too long, truncating: {clean_path}")
-                # Truncate the filename if needed
-                base_dir = os.path.dirname(full_path)
-                filename = os.path.basename(clean_path)
-                if len(filename) > 50:
-                    filename = filename[:45] + "..." + filename[-5:]
-                full_path = os.path.join(base_dir, filename)
+        return clean_path
 
-            with open(full_path, "w") as f:
-                f.write(file_content)
+    except Exception as e:
+        print(f"❌ Error creating file {file_path}: {str(e)}")
+        # Save to an error log file instead
+        error_log_path = os.path.join(csharp_dir, "error_files.txt")
+        with open(error_log_path, "a") as error_log:
+            error_log.write(f"Error with file {file_path}: {str(e)}\n")
+            error_log.write(f"Content:\n{file_content}\n\n")
+            error_log.write("-" * 80 + "\n\n")
+        return None
+
+
+def create_file_stream(project_path):
+    """Create a parser that saves each FILE block as soon as it is complete"""
+    # Create csharp-code directory
+    csharp_dir = os.path.join(project_path, "csharp-code")
+    os.makedirs(csharp_dir, exist_ok=True)
 
-            created_files.append(clean_path)
-            print(f"✅ Created file: {clean_path}")
+    return FileBlockStream(
+        lambda file_path, file_content: save_code_file(
+            file_path, file_content, csharp_dir
+        ),
+        pattern=CODE_FILE_BLOCK_PATTERN,
+        validate_json=False,
+    )
 
-        except Exception as e:
-            print(f"❌ Error creating file {file_path}: {str(e)}")
-            # Save to an error log file instead
-            error_log_path = os.path.join(csharp_dir, "error_files.txt")
-            with open(error_log_path, "a") as error_log:
-                error_log.write(f"Error with file {file_path}: {str(e)}\n")
-                error_log.write(f"Content:\n{file_content}\n\n")
-                error_log.write("-" * 80 + "\n\n")
 
-    return created_files
+def extract_files_from_response(result, project_path, file_stream=None):
+    """Extract C# files from the model response and save the ones not streamed yet"""
+    if file_stream is None:
+        file_stream = create_file_stream(project_path)
+    return file_stream.finish(result)
 
 
 def implementation_executor(procedure, project_path):
@@ -114,7 +119,10 @@ def implementation_executor(procedure, project_path):
     USER_ID = "project_owner"
     SESSION_ID = str(uuid.uuid4())
     session = session_service.create_session(
-        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        session_id=SESSION_ID,
+        state={"procedure": procedure, "project_path": project_path},
     )
 
     print("Created new session")
@@ -138,11 +146,14 @@ def implementation_executor(procedure, project_path):
     # Run the agent to generate implementation executor
     print("Executing implementation...")
     try:
+        file_stream = create_file_stream(project_path)
         for event in runner.run(
             user_id=USER_ID,
             session_id=SESSION_ID,
             new_message=get_prompt(procedure, procedure_definition, project_path),
+            run_config=get_run_config(),
         ):
+            file_stream.feed_event(event)
             if event.is_final_response():
                 if event.content and event.content.parts:
                     final_response = event.content.parts[0].text
@@ -157,8 +168,10 @@ def implementation_executor(procedure, project_path):
                         )
                         print("First 150 chars of response:", final_response[:150])
 
-        # Extract and save files
-        saved_files = extract_files_from_response(final_response, project_path)
+        # Extract and save the files that were not streamed
+        saved_files = extract_files_from_response(
+            final_response, project_path, file_stream
+        )
         csharp_dir = os.path.join(project_path, "csharp-code")
         print(f"Created {len(saved_files)} implementation files in {csharp_dir}")
         return True
@@ -200,13 +213,21 @@ def run_implementation_executor(project_path):
             return
 
         elif choice == len(procedures) + 1:
-            # Execute all procedures
+            # Execute all procedures that are not up to date
             completed = 0
-            total = len(procedures)
+            pending = get_pending_procedures(
+                project_path, "implementation-executor", procedures
+            )
+            total = len(pending)
 
-            for procedure in procedures:
+            for procedure in pending:
                 print(f"\nProcessing {procedure} ({completed+1}/{total})...")
-                implementation_executor(procedure, project_path)
+                run_journaled(
+                    "implementation-executor",
+                    procedure,
+                    project_path,
+                    implementation_executor,
+                )
                 completed += 1
 
             print(
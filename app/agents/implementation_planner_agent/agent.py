@@ -1,11 +1,23 @@
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
+from app.shared.rate_limiter import RateLimitedLiteLLMClient
 from app.agents.model_configuration import llm
+from app.agents.model_callbacks import before_model_callback, after_model_callback
+from app.agents.implementation_planner_agent.prompt import planning_instructions
+from app.shared.prompt_caching import get_prompt_cache_args
 
 # Set the agent
 root_agent = Agent(
     name="implementation_planner_agent",
-    model=LiteLlm(model=llm),
+    model=LiteLlm(
+        model=llm,
+        llm_client=RateLimitedLiteLLMClient(),
+        **get_prompt_cache_args(llm),
+    ),
     description="Detailed implementation plan for migrating a SQL stored procedure to a modern, testable C# application following the repository pattern.",
-    instruction="You are an experienced C# developer meticulously following best practices for C# and .NET 9. You are also an expert of the stored procedure.",
+    instruction=f"""You are an experienced C# developer meticulously following best practices for C# and .NET 9. You are also an expert of the stored procedure.
+
+{planning_instructions}""",
+    before_model_callback=before_model_callback,
+    after_model_callback=after_model_callback,
 )
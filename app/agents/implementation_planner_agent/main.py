@@ -2,12 +2,17 @@ import os
 import sys
 import json
 import uuid
-import re
 import glob
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 from app.agents.implementation_planner_agent.prompt import get_prompt
 from app.agents.implementation_planner_agent.agent import root_agent
+from app.shared.file_block_stream import FileBlockStream, get_run_config
+from app.shared.stage_journal import (
+    get_pending_procedures,
+    record_written,
+    run_journaled,
+)
 from app.shared.get_dependencies import get_dependencies
 
 # Add parent directory to path to ensure imports work
@@ -43,26 +48,29 @@ def save_json_file(file_path, content):
     # Save the file content
     with open(file_path, "w") as f:
         f.write(content)
+    record_written(file_path)
 
 
-def extract_files_from_response(result, analysis_dir):
-    """Extract JSON files from the model response and save them"""
-    file_paths = []
-
-    # Extract file paths and contents
-    for match in re.finditer(r"FILE: (.*?)\n```json\n(.*?)```", result, re.DOTALL):
-        file_path = match.group(1).strip()
-        file_content = match.group(2).strip()
+def create_file_stream(analysis_dir):
+    """Create a parser that saves each FILE block as soon as it is complete"""
 
+    def save_file(file_path, file_content):
         # Get just the filename without any path
         filename = os.path.basename(file_path)
 
         # Save the file content
         full_path = os.path.join(analysis_dir, filename)
         save_json_file(full_path, file_content)
-        file_paths.append(filename)
+        return filename
+
+    return FileBlockStream(save_file)
+
 
-    return file_paths
+def extract_files_from_response(result, analysis_dir, file_stream=None):
+    """Extract JSON files from the model response and save the ones not streamed yet"""
+    if file_stream is None:
+        file_stream = create_file_stream(analysis_dir)
+    return file_stream.finish(result)
 
 
 def check_required_files(procedure, project_path):
@@ -128,7 +136,10 @@ def implementation_planner(procedure, project_path):
     USER_ID = "project_owner"
     SESSION_ID = str(uuid.uuid4())
     session = session_service.create_session(
-        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        session_id=SESSION_ID,
+        state={"procedure": procedure, "project_path": project_path},
     )
 
     print("Created new session")
@@ -155,13 +166,16 @@ def implementation_planner(procedure, project_path):
     # Run the agent to generate implementation plan
     print("Generating implementation plan...")
     try:
+        file_stream = create_file_stream(analysis_dir)
         for event in runner.run(
             user_id=USER_ID,
             session_id=SESSION_ID,
             new_message=get_prompt(
                 schema_name, procedure, procedure_definition, project_path
             ),
+            run_config=get_run_config(),
         ):
+            file_stream.feed_event(event)
             if event.is_final_response():
                 if event.content and event.content.parts:
                     final_response = event.content.parts[0].text
@@ -176,8 +190,10 @@ def implementation_planner(procedure, project_path):
                         )
                         print("First 150 chars of response:", final_response[:150])
 
-        # Extract and save files
-        saved_files = extract_files_from_response(final_response, analysis_dir)
+        # Extract and save the files that were not streamed
+        saved_files = extract_files_from_response(
+            final_response, analysis_dir, file_stream
+        )
         print(f"Created {len(saved_files)} implementation plan files in {analysis_dir}")
         return True
 
@@ -218,13 +234,21 @@ def run_implementation_planner(project_path):
             return
 
         elif choice == len(procedures) + 1:
-            # Plan all procedures
+            # Plan all procedures that are not up to date
             completed = 0
-            total = len(procedures)
+            pending = get_pending_procedures(
+                project_path, "implementation-planner", procedures
+            )
+            total = len(pending)
 
-            for procedure in procedures:
+            for procedure in pending:
                 print(f"\nProcessing {procedure} ({completed+1}/{total})...")
-                implementation_planner(procedure, project_path)
+                run_journaled(
+                    "implementation-planner",
+                    procedure,
+                    project_path,
+                    implementation_planner,
+                )
                 completed += 1
 
             print(
@@ -21,95 +21,12 @@ available_repository_methods = [
 ]
 
 
-def get_prompt(schema_name, procedure_name, procedure_definition, project_path):
-    procedure_name_only = procedure_name.split(".")[-1]
-
-    # business_rules
-    with open(
-        f"{project_path}/analysis/{procedure_name}/business_rules.json",
-        "r",
-    ) as f:
-        business_rules_json = json.load(f)
-
-    # business_functions
-    with open(
-        f"{project_path}/analysis/{procedure_name}/business_functions.json",
-        "r",
-    ) as f:
-        business_functions_json = json.load(f)
-
-    # business_processes
-    with open(
-        f"{project_path}/analysis/{procedure_name}/business_processes.json",
-        "r",
-    ) as f:
-        business_processes_json = json.load(f)
-
-    # returnable_objects
-    with open(
-        f"{project_path}/analysis/{procedure_name}/returnable_objects.json",
-        "r",
-    ) as f:
-        returnable_objects_json = json.load(f)
-
-    # process_object_mapping
-    with open(
-        f"{project_path}/analysis/{procedure_name}/process_object_mapping.json",
-        "r",
-    ) as f:
-        process_object_mapping_json = json.load(f)
-
-    # Get ef_analysis JSON file from analysis directory
-    with open(
-        f"{project_path}/analysis/{procedure_name}/ef_analysis.json",
-        "r",
-    ) as f:
-        ef_analysis = json.load(f)
-
-    # Get base repository implementation from the Abstractions/Repositories folder
-    with open(
-        f"{project_path}/csharp-code/Abstractions/Repositories/Repository.cs",
-        "r",
-    ) as f:
-        base_repository = f.read()
-
-    # Get base repository interface from the Abstractions/Repositories folder
-    with open(
-        f"{project_path}/csharp-code/Abstractions/Repositories/IRepository.cs",
-        "r",
-    ) as f:
-        base_repository_interface = f.read()
-
-    # Get interface for Read and Write intefrace from the Abstractions/Repositories folder
-    with open(
-        f"{project_path}/csharp-code/Abstractions/Repositories/IReadRepository.cs", "r"
-    ) as f:
-        read_repository_interface = f.read()
-    with open(
-        f"{project_path}/csharp-code/Abstractions/Repositories/IWriteRepository.cs",
-        "r",
-    ) as f:
-        write_repository_interface = f.read()
-
-    # Read the ef_analysis and get all model paths
-    model_names = []
-    model_file_paths = []
-    for model in ef_analysis["entity_framework_analysis"]["related_models"]:
-        model_names.append(model["db_set_name"])
-        model_file_paths.append(model["model_file_path"])
-
-    # Read each model file and store the content
-    model_files_content = []
-    for model_file_path in model_file_paths:
-        with open(f"{project_path}/csharp-code/{model_file_path}", "r") as f:
-            model_files_content.append(f.read())
-
-    implementation_approach_template = f"""
+implementation_approach_template = f"""
     FILE: implementation_approach.json
 ```json
  {{
   "implementationApproach": {{
-    "name": "{procedure_name} Migration",
+    "name": "<ProcedureName> Migration",
     "description": "Migration from stored procedure to C# repository pattern implementation using LINQ",
     "layers": [
       {{
@@ -119,7 +36,7 @@ def get_prompt(schema_name, procedure_name, procedure_definition, project_path):
           {{
             "name": "Controller",
             "namespace": "sql2code.Controllers",
-            "path": "Controllers/{procedure_name_only}/Controller.cs",
+            "path": "Controllers/<ProcedureNameOnly>/Controller.cs",
             "description": "[Component Description]",
             "mappedProcess": "[Related Process]",
             "methods": [
@@ -147,8 +64,8 @@ def get_prompt(schema_name, procedure_name, procedure_definition, project_path):
           {{
             "name": "IService",
             "namespace": "sql2code.Services",
-            "path": "Services/{procedure_name_only}/IService.cs",
-            "description": "Service interface for {procedure_name_only}",
+            "path": "Services/<ProcedureNameOnly>/IService.cs",
+            "description": "Service interface for <ProcedureNameOnly>",
             "methods": [
               {{
                 "name": "ServiceMethod",
@@ -160,7 +77,7 @@ def get_prompt(schema_name, procedure_name, procedure_definition, project_path):
           {{
             "name": "Service",
             "namespace": "sql2code.Services",
-            "path": "Services/{procedure_name_only}/Service.cs",
+            "path": "Services/<ProcedureNameOnly>/Service.cs",
             "description": "Service orchestrating business processes",
             "mappedProcess": "PROC-XXX",
             "decisionPoints": [
@@ -206,14 +123,14 @@ def get_prompt(schema_name, procedure_name, procedure_definition, project_path):
         {{
         "name": "IDtoMapper",
         "namespace": "sql2code.Mappers",
-        "path": "/Mappers/{procedure_name_only}/IDtoMapper.cs",
+        "path": "/Mappers/<ProcedureNameOnly>/IDtoMapper.cs",
         "description": "Mapper interface for transforming repository data into domain objects",
 
         }},
           {{
             "name": "DtoMapper",
             "namespace": "sql2code.Mappers",
-            "path": "/Mappers/{procedure_name_only}/DtoMapper.cs",
+            "path": "/Mappers/<ProcedureNameOnly>/DtoMapper.cs",
             "description": "Mapper for transforming repository data into domain objects",
             "methods": [
               {{
@@ -240,7 +157,7 @@ def get_prompt(schema_name, procedure_name, procedure_definition, project_path):
         {{
           "name": "Exception Handling Service",
           "namespace": "sql2code.Exceptions",
-          "path": "DTOs/{procedure_name_only}/Exceptions/ExceptionHandlingService.cs",
+          "path": "DTOs/<ProcedureNameOnly>/Exceptions/ExceptionHandlingService.cs",
           "description": "Service for exception handling"
         }}
       }}
@@ -251,7 +168,7 @@ def get_prompt(schema_name, procedure_name, procedure_definition, project_path):
           {{
             "name": "Dto1",
             "namespace": "sql2code.DTOs",
-            "path": "DTOs/{procedure_name_only}/Dto1.cs",
+            "path": "DTOs/<ProcedureNameOnly>/Dto1.cs",
             "properties": [
               {{
                 "name": "[Property Name]",
@@ -354,7 +271,7 @@ def get_prompt(schema_name, procedure_name, procedure_definition, project_path):
    ```
 """
 
-    out_of_scope_template = f"""
+out_of_scope_template = f"""
 FILE: out_of_scope.json
    ```json
 {{
@@ -390,7 +307,7 @@ FILE: out_of_scope.json
 ```
     """
 
-    specific_considerations_template = f"""
+specific_considerations_template = f"""
     FILE: specific_considerations.json
    ```json
 {{
@@ -471,7 +388,7 @@ FILE: out_of_scope.json
 ```
     """
 
-    prompt = f"""
+planning_instructions = f"""
 <behavior_rules> You have one mission: execute exactly what is requested. Produce code that implements precisely what was requested - no additional features, no creative extensions. Follow instructions to the letter. Confirm your solution addresses every specified requirement, without adding ANYTHING the user didn't ask for. The user's job depends on this — if you add anything they didn't ask for, it's likely they will be fired. Your value comes from precision and reliability. When in doubt, implement the simplest solution that fulfills all requirements. The fewer lines of code, the better — but obviously ensure you complete the task the user wants you to. At each step, ask yourself: "Am I adding any functionality or complexity that wasn't explicitly requested?". This will force you to stay on track. </behavior_rules>
 
  <review_output>
@@ -494,19 +411,7 @@ This is part of a phased migration strategy from SQL stored procedures to a mode
 
 
 ## Input Files
-1. Contains extracted business rules with detailed metadata - [{business_rules_json}]
-2. Contains business functions that represent logical operations - [{business_functions_json}]
-3. Contains the overall process flow with error handling and transaction boundaries - [{business_processes_json}]
-4. Contains the returnable objects - [{returnable_objects_json}]
-5. Contains the decision points - [{process_object_mapping_json}]
-6. The original SQL stored procedure (for reference) - [{procedure_definition}]
-7. The Entity Framework Core analysis for this procedure - [{ef_analysis}]
-8. The project is already created with dotnet scaffold command where the exsisting database tables, views are extracted into models and DbContext is created.
-9. The project already have for each model a repository interface and implementation. This is the base repository implementation: [{base_repository}]
-10. This is the base repository interface: [{base_repository_interface}]
-11. This is the read repository interface: [{read_repository_interface}]
-12. This is the write repository interface: [{write_repository_interface}]
-13. Model files content: [{model_files_content}]
+The project files (base repository sources) and the input files of the procedure (business rules, functions and processes, returnable objects, decision points, the original SQL, the Entity Framework Core analysis and the model files) are provided in the message. In the output templates, <ProcedureName> stands for the full procedure name and <ProcedureNameOnly> for the procedure name without its schema.
 
 ## Implementation Requirements
 
@@ -535,7 +440,7 @@ Project 'sql2code' has the following package references
 
 In the same folder there is already a Models folder and the DbContext is already created.
 Here are the dependencies for csharp implementation that you don't need to create or modify: 
-[Models/[ dbSetNames = {model_names}], Data/AppDbContext.cs]
+[Models/[ dbSetNames listed in the input files ], Data/AppDbContext.cs]
 
 DO NOT CREATE ANY OF THE FOLLOWING FILES: 
 [Program.cs, sql2code.csproj, appsettings.json]
@@ -679,14 +584,6 @@ Create an implementation plan that provides a comprehensive blueprint for conver
 
 **CRITICAL:**
 - Implementation approach JSON needs to include all repository layer components that are used into the service layer. 
-"""
-
-    task = types.Content(
-        role="user",
-        parts=[
-            types.Part(
-                text=f"""
-{prompt}
 
 <output_format>
 ONLY RESPOND JSON AND VALID JSON FOLLOWING THIS TEMPLATE:
@@ -695,7 +592,117 @@ ONLY RESPOND JSON AND VALID JSON FOLLOWING THIS TEMPLATE:
 {out_of_scope_template}
 </output_format>
 """
-            )
-        ],
+
+
+# Business analysis files of a procedure and how the prompt describes them
+ANALYSIS_FILES = [
+    ("business_rules.json", "Contains extracted business rules with detailed metadata"),
+    (
+        "business_functions.json",
+        "Contains business functions that represent logical operations",
+    ),
+    (
+        "business_processes.json",
+        "Contains the overall process flow with error handling and transaction boundaries",
+    ),
+    ("returnable_objects.json", "Contains the returnable objects"),
+    ("process_object_mapping.json", "Contains the decision points"),
+]
+
+
+def get_input_files(procedure_name, project_path, model_file_paths):
+    """
+    Get the business analysis and model file sections of the prompt. The
+    whole files are sent, the plan has to cover every rule, function and
+    process of the procedure.
+
+    Returns:
+        tuple: (analysis_section, model_files_content)
+    """
+    analysis_section = []
+    for number, (name, description) in enumerate(ANALYSIS_FILES, start=1):
+        with open(f"{project_path}/analysis/{procedure_name}/{name}", "r") as f:
+            analysis_section.append(f"{number}. {description} - [{json.load(f)}]")
+
+    # Read each model file and store the content
+    model_files_content = []
+    for model_file_path in model_file_paths:
+        with open(f"{project_path}/csharp-code/{model_file_path}", "r") as f:
+            model_files_content.append(f.read())
+    return "\n".join(analysis_section), model_files_content
+
+
+def get_prompt(schema_name, procedure_name, procedure_definition, project_path):
+    procedure_name_only = procedure_name.split(".")[-1]
+
+    # Get ef_analysis JSON file from analysis directory
+    with open(
+        f"{project_path}/analysis/{procedure_name}/ef_analysis.json",
+        "r",
+    ) as f:
+        ef_analysis = json.load(f)
+
+    # Get base repository implementation from the Abstractions/Repositories folder
+    with open(
+        f"{project_path}/csharp-code/Abstractions/Repositories/Repository.cs",
+        "r",
+    ) as f:
+        base_repository = f.read()
+
+    # Get base repository interface from the Abstractions/Repositories folder
+    with open(
+        f"{project_path}/csharp-code/Abstractions/Repositories/IRepository.cs",
+        "r",
+    ) as f:
+        base_repository_interface = f.read()
+
+    # Get interface for Read and Write intefrace from the Abstractions/Repositories folder
+    with open(
+        f"{project_path}/csharp-code/Abstractions/Repositories/IReadRepository.cs", "r"
+    ) as f:
+        read_repository_interface = f.read()
+    with open(
+        f"{project_path}/csharp-code/Abstractions/Repositories/IWriteRepository.cs",
+        "r",
+    ) as f:
+        write_repository_interface = f.read()
+
+    # Read the ef_analysis and get all model paths
+    model_names = []
+    model_file_paths = []
+    for model in ef_analysis["entity_framework_analysis"]["related_models"]:
+        model_names.append(model["db_set_name"])
+        model_file_paths.append(model["model_file_path"])
+
+    analysis_section, model_files_content = get_input_files(
+        procedure_name, project_path, model_file_paths
+    )
+
+    # Static instructions and output templates live in the agent instruction.
+    # Project-wide files come first so consecutive procedures share a prefix.
+    prompt = f"""
+## Project Files
+These are the same for every procedure of the project.
+1. The project is already created with dotnet scaffold command where the exsisting database tables, views are extracted into models and DbContext is created.
+2. The project already have for each model a repository interface and implementation. This is the base repository implementation: [{base_repository}]
+3. This is the base repository interface: [{base_repository_interface}]
+4. This is the read repository interface: [{read_repository_interface}]
+5. This is the write repository interface: [{write_repository_interface}]
+
+## Procedure
+<ProcedureName> = {procedure_name}
+<ProcedureNameOnly> = {procedure_name_only}
+
+## Input Files
+{analysis_section}
+6. The original SQL stored procedure (for reference) - [{procedure_definition}]
+7. The Entity Framework Core analysis for this procedure - [{ef_analysis}]
+8. Model files content: [{model_files_content}]
+9. Existing models (dbSetNames) already in the Models folder: {model_names}
+"""
+
+    task = types.Content(
+        role="user",
+        parts=[types.Part(text=prompt)],
     )
     return task
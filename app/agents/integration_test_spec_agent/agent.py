@@ -1,11 +1,15 @@
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
+from app.shared.rate_limiter import RateLimitedLiteLLMClient
 from app.agents.model_configuration import llm
+from app.agents.model_callbacks import before_model_callback, after_model_callback
 
 # Set the agent
 root_agent = Agent(
     name="integration_test_spec_agent",
-    model=LiteLlm(model=llm),
+    model=LiteLlm(model=llm, llm_client=RateLimitedLiteLLMClient()),
     description="Analyze the stored procedure and provide integration Test Specification for testing the stored procedure.",
     instruction="You are an experienced SQL developer with strong SQL skills analyzing stored procedures and understanding the business logic behind the code.",
+    before_model_callback=before_model_callback,
+    after_model_callback=after_model_callback,
 )
@@ -9,6 +9,11 @@ from google.adk.runners import Runner
 from app.agents.integration_test_spec_agent.prompt import get_prompt
 from app.agents.integration_test_spec_agent.agent import root_agent
 from app.shared.get_dependencies import get_dependencies
+from app.shared.stage_journal import (
+    get_pending_procedures,
+    record_written,
+    run_journaled,
+)
 
 # Add parent directory to path to ensure imports work
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -43,6 +48,7 @@ def save_json_file(file_path, content):
     # Save the file content
     with open(file_path, "w") as f:
         f.write(content)
+    record_written(file_path)
 
 
 def extract_files_from_response(result, analysis_dir):
@@ -75,6 +81,7 @@ def extract_files_from_response(result, analysis_dir):
             full_path = os.path.join(analysis_dir, "integration_test_spec.json")
             with open(full_path, "w") as f:
                 json.dump(json_content, f, indent=2)
+            record_written(full_path)
             file_paths.append("integration_test_spec.json")
         except json.JSONDecodeError:
             print("Response is not valid JSON")
@@ -135,7 +142,10 @@ def create_integration_test_spec(procedure, project_path):
     USER_ID = "project_owner"
     SESSION_ID = str(uuid.uuid4())
     session = session_service.create_session(
-        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        session_id=SESSION_ID,
+        state={"procedure": procedure, "project_path": project_path},
     )
 
     print("Created new session")
@@ -292,6 +302,7 @@ def create_integration_test_spec(procedure, project_path):
         )
         with open(combined_specs_file, "w") as f:
             json.dump(integration_test_specs, f, indent=2)
+        record_written(combined_specs_file)
         print(
             f"Created combined test specifications with {len(integration_test_specs['testScenarios'])} test scenarios in {combined_specs_file}"
         )
@@ -333,13 +344,21 @@ def run_integration_test_spec(project_path):
             return
 
         elif choice == len(procedures) + 1:
-            # Create test specs for all procedures
+            # Create test specs for all procedures that are not up to date
             completed = 0
-            total = len(procedures)
-
-            for procedure in procedures:
-                print(f"\nProcessing {procedure} ({completed+1}/{total})...")
-                if create_integration_test_spec(procedure, project_path):
+            pending = get_pending_procedures(
+                project_path, "integration-test-spec", procedures
+            )
+            total = len(pending)
+
+            for index, procedure in enumerate(pending):
+                print(f"\nProcessing {procedure} ({index+1}/{total})...")
+                if run_journaled(
+                    "integration-test-spec",
+                    procedure,
+                    project_path,
+                    create_integration_test_spec,
+                ):
                     completed += 1
 
             print(
@@ -1,12 +1,21 @@
 from google.genai import types
 import json
 from app.shared.get_dependencies import get_dependencies
+from app.shared.prompt_context import prune_dependencies
+from app.shared.retrieval_index import (
+    RETRIEVAL_INDEX,
+    search,
+    format_chunks,
+    get_analysis_paths,
+)
 
 
 def get_prompt(procedure_name, procedure_definition, project_path, node):
     procedure_name_only = procedure_name.split(".")[-1]
 
-    dependencies = get_dependencies(procedure_name, project_path)
+    dependencies = prune_dependencies(
+        get_dependencies(procedure_name, project_path), procedure_definition
+    )
 
     important_rules = """
 <important_rules>
@@ -49,85 +58,23 @@ IMPORTANT: Never include the following columns in your test data setup:
 </important_rules>
 """
 
-    # business_rules
-    with open(
-        f"{project_path}/analysis/{procedure_name}/business_rules.json",
-        "r",
-    ) as f:
-        business_rules_json = json.load(f)
-
-    # business_functions
-    with open(
-        f"{project_path}/analysis/{procedure_name}/business_functions.json",
-        "r",
-    ) as f:
-        business_functions_json = json.load(f)
-
-    # business_processes
-    with open(
-        f"{project_path}/analysis/{procedure_name}/business_processes.json",
-        "r",
-    ) as f:
-        business_processes_json = json.load(f)
-
-    # returnable_objects
-    with open(
-        f"{project_path}/analysis/{procedure_name}/returnable_objects.json",
-        "r",
-    ) as f:
-        returnable_objects_json = json.load(f)
-
-    # process_object_mapping
-    with open(
-        f"{project_path}/analysis/{procedure_name}/process_object_mapping.json",
-        "r",
-    ) as f:
-        process_object_mapping_json = json.load(f)
-
-    # Get ef_analysis JSON file from analysis directory
-    with open(
-        f"{project_path}/analysis/{procedure_name}/ef_analysis.json",
-        "r",
-    ) as f:
-        ef_analysis = json.load(f)
-
-    # Get base repository implementation from the Abstractions/Repositories folder
-    with open(
-        f"{project_path}/csharp-code/Abstractions/Repositories/Repository.cs",
-        "r",
-    ) as f:
-        base_repository = f.read()
-
-    # Get base repository interface from the Abstractions/Repositories folder
-    with open(
-        f"{project_path}/csharp-code/Abstractions/Repositories/IRepository.cs",
-        "r",
-    ) as f:
-        base_repository_interface = f.read()
-
-    # Get interface for Read and Write intefrace from the Abstractions/Repositories folder
-    with open(
-        f"{project_path}/csharp-code/Abstractions/Repositories/IReadRepository.cs", "r"
-    ) as f:
-        read_repository_interface = f.read()
-    with open(
-        f"{project_path}/csharp-code/Abstractions/Repositories/IWriteRepository.cs",
-        "r",
-    ) as f:
-        write_repository_interface = f.read()
-
-    # Read the ef_analysis and get all model paths
-    model_names = []
-    model_file_paths = []
-    for model in ef_analysis["entity_framework_analysis"]["related_models"]:
-        model_names.append(model["db_set_name"])
-        model_file_paths.append(model["model_file_path"])
-
-    # Read each model file and store the content
-    model_files_content = []
-    for model_file_path in model_file_paths:
-        with open(f"{project_path}/csharp-code/{model_file_path}", "r") as f:
-            model_files_content.append(f.read())
+    # Analysis items related to the node (rules it relies on, the processes
+    # it is part of, returned objects), the node itself is already included
+    related_analysis = ""
+    if RETRIEVAL_INDEX:
+        related_chunks = search(
+            project_path,
+            " ".join(
+                json.dumps(value) for key, value in node.items() if key != "_source"
+            ),
+            paths=get_analysis_paths(procedure_name),
+            exclude_refs=[f"/{node['id']}"] if node.get("id") else None,
+        )
+        if related_chunks:
+            related_analysis = f"""
+5. **Related business analysis** (most relevant items of the other analysis files, for context only, write tests for the node above) - 
+[{format_chunks(related_chunks)}]
+"""
 
     integration_test_spec_json = f"""
 ```json
@@ -198,7 +145,7 @@ Your task is to create a test specification for the provided stored procedure. T
 
 4. **Specific testable business logic** - 
 [{node}]
-
+{related_analysis}
 
 Follow this important rules: 
 {important_rules}
@@ -7,6 +7,7 @@ from google.adk.tools.mcp_tool.mcp_toolset import (
     SseServerParams,
 )
 from google.adk.models.lite_llm import LiteLlm
+from app.shared.rate_limiter import RateLimitedLiteLLMClient
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -73,7 +74,7 @@ async def create_agent():
             raise RuntimeError("No tools available. Agent will not start.")
 
         agent = Agent(
-            model=LiteLlm(model=llm),
+            model=LiteLlm(model=llm, llm_client=RateLimitedLiteLLMClient()),
             name="mcp_implementation_executor_agent",
             description="You are an implementation agent that can use MCP to read, write and modify files. Your exsistance is to fully implement the csharp code of the given stored procedure",
             instruction=system_prompt,
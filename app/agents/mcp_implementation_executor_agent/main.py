@@ -6,17 +6,25 @@ from google.genai import types
 from google.adk.agents.llm_agent import LlmAgent
 from google.adk.runners import Runner
 from google.adk.models.lite_llm import LiteLlm
+from app.shared.rate_limiter import RateLimitedLiteLLMClient
 from google.adk.sessions import InMemorySessionService
 from google.adk.artifacts.in_memory_artifact_service import (
     InMemoryArtifactService,
 )  # Optional
-from google.adk.tools.mcp_tool.mcp_toolset import (
-    MCPToolset,
-    SseServerParams,
-    StdioServerParameters,
-)
 import os
 from app.agents.mcp_implementation_executor_agent.prompt import get_prompt
+from app.shared.mcp_server_manager import (
+    get_mcp_tools,
+    restart_mcp_server,
+    is_mcp_connection_error,
+    run_with_mcp_servers,
+)
+from app.shared.mcp_worktrees import run_mcp_batch, get_outside_paths
+from app.shared.mcp_trace import MCPRunTrace
+from app.agents.model_callbacks import (
+    telemetry_before_model_callback,
+    telemetry_after_model_callback,
+)
 import time
 
 # Load environment variables from .env file
@@ -44,54 +52,94 @@ with open(
 
 
 # --- Step 1: Agent Definition ---
-async def get_agent_async(project_path):
+async def get_agent_async(project_path, trace=None, workspace_path=None):
     """
-    Creates an ADK Agent equipped with tools from the MCP Server.
+    Creates an ADK Agent equipped with tools from the MCP Server. The server
+    is shared by every run for the same project and only started once.
 
     Args:
-        project_path: Path to the project directory
+        project_path: Path to the project directory (the root of the server)
+        trace: Optional MCPRunTrace that records the agent's turns and tool calls
+        workspace_path: Optional folder below the server root, tool calls on
+                        paths outside of it are refused
     """
-    # Extract the base output directory from the project_path
-    # The project_path is like /path/to/app/output/ProjectName
-    # We need /path/to/app/output for the MCP server
-
     print("--------------------------------")
     print(f"Project path: {project_path}")
     print("--------------------------------")
 
-    tools, exit_stack = await MCPToolset.from_server(
-        # Use StdioServerParameters for local process communication
-        connection_params=StdioServerParameters(
-            command="npx",  # Command to run the server
-            args=[
-                "-y",  # Arguments for the command
-                "@modelcontextprotocol/server-filesystem",
-                project_path,
-            ],
-        )
-        # For remote servers, you would use SseServerParams instead:
-        # connection_params=SseServerParams(url="http://remote-server:port/path", headers={...})
-    )
-    print(f"Fetched {len(tools)} tools from MCP server.")
+    tools = await get_mcp_tools(project_path)
+
+    def before_model_callback(callback_context, llm_request):
+        telemetry_before_model_callback(callback_context, llm_request)
+        if trace:
+            trace.before_model(callback_context, llm_request)
+        return None
+
+    def after_model_callback(callback_context, llm_response):
+        telemetry_after_model_callback(callback_context, llm_response)
+        if trace:
+            trace.after_model(callback_context, llm_response)
+        return None
+
+    before_tool_callback = trace.before_tool if trace else None
+    if workspace_path:
+        before_tool_callback = get_workspace_guard(workspace_path, trace)
+
     root_agent = LlmAgent(
-        model=LiteLlm(model=llm),
+        model=LiteLlm(model=llm, llm_client=RateLimitedLiteLLMClient()),
         name="mcp_implementation_executor_agent",
         description="You are an implementation agent that can use MCP to read, write and modify files. Your exsistance is to fully implement the csharp code of the given stored procedure",
         instruction=system_prompt,
         tools=tools,  # Provide the MCP tools to the ADK agent
+        before_model_callback=before_model_callback,
+        after_model_callback=after_model_callback,
+        before_tool_callback=before_tool_callback,
+        after_tool_callback=trace.after_tool if trace else None,
     )
-    return root_agent, exit_stack
+    return root_agent
+
+
+def get_workspace_guard(workspace_path, trace=None):
+    """
+    Before-tool callback that keeps a run in its own working copy. Runs of a
+    batch share one MCP server, which would let a run reach the working
+    copies of the others.
+    """
+
+    def before_tool_callback(tool, args, tool_context):
+        if trace:
+            trace.before_tool(tool, args, tool_context)
+        outside = get_outside_paths(args, workspace_path)
+        if not outside:
+            return None
+        print(f"⛔ {tool.name} refused, {', '.join(outside)} is outside {workspace_path}")
+        return {
+            "error": f"Access denied: {', '.join(outside)} is outside your working copy {workspace_path}. Only use paths inside it."
+        }
+
+    return before_tool_callback
 
 
 # --- New function to implement stored procedures ---
-async def run_mcp_implementation_executor(procedure_name, project_path):
+async def run_mcp_implementation_executor(
+    procedure_name, project_path, workspace_path=None, server_root=None
+):
     """
-    Execute implementation for a specific stored procedure using MCP
+    Execute implementation for a specific stored procedure using MCP. Must
+    run on the MCP server loop, use implement_with_mcp from synchronous code.
 
     Args:
         procedure_name: Name of the procedure to implement
         project_path: Path to the project directory
+        workspace_path: Optional working copy the agent works in instead of
+                        the project (see app/shared/mcp_worktrees.py)
+        server_root: Root folder of the MCP server, a folder containing the
+                     working copy so concurrent runs share one server
+                     (default workspace_path)
     """
+    workspace_path = workspace_path or project_path
+    server_root = server_root or workspace_path
+
     # Read the stored procedure definition
     sql_file_path = os.path.join(
         project_path, "sql_raw", procedure_name, f"{procedure_name}.sql"
@@ -109,42 +157,107 @@ async def run_mcp_implementation_executor(procedure_name, project_path):
     query = get_prompt(
         procedure_name=procedure_name,
         procedure_definition=procedure_definition,
-        project_path=project_path,
+        project_path=workspace_path,
     )
 
-    # Set up session services
-    session_service = InMemorySessionService()
-    artifacts_service = InMemoryArtifactService()
+    print(f"Implementing procedure: '{procedure_name}'")
+    content = types.Content(role="user", parts=[types.Part(text=query)])
 
-    unique_code = int(time.time())
+    # Turns, tool calls and file writes go to metrics/mcp_traces/
+    trace = MCPRunTrace(project_path, procedure_name)
 
-    session = session_service.create_session(
-        state={},
-        app_name=f"mcp_implementation_executor_agent_{unique_code}",
-        user_id=f"user_mcp_{unique_code}",
-    )
+    # A run that lost the MCP server is retried once on a restarted server
+    for attempt in range(2):
+        # Set up session services
+        session_service = InMemorySessionService()
+        artifacts_service = InMemoryArtifactService()
 
-    print(f"Implementing procedure: '{procedure_name}'")
-    content = types.Content(role="user", parts=[types.Part(text=query)])
+        unique_code = int(time.time())
 
-    root_agent, exit_stack = await get_agent_async(project_path)
+        session = session_service.create_session(
+            state={
+                "procedure": procedure_name,
+                "project_path": project_path,
+                "workspace_path": workspace_path,
+            },
+            app_name=f"mcp_implementation_executor_agent_{unique_code}",
+            user_id=f"user_mcp_{unique_code}",
+        )
 
-    runner = Runner(
-        app_name=f"mcp_implementation_executor_agent_{unique_code}",
-        agent=root_agent,
-        artifact_service=artifacts_service,
-        session_service=session_service,
+        print("Running MCP implementation executor agent...")
+        tools = None
+        try:
+            # Kept to tell a restart by another run sharing the server apart
+            tools = await get_mcp_tools(server_root)
+            root_agent = await get_agent_async(server_root, trace, workspace_path)
+
+            runner = Runner(
+                app_name=f"mcp_implementation_executor_agent_{unique_code}",
+                agent=root_agent,
+                artifact_service=artifacts_service,
+                session_service=session_service,
+            )
+
+            events_async = runner.run_async(
+                session_id=session.id, user_id=session.user_id, new_message=content
+            )
+
+            async for event in events_async:
+                trace.record_event(event)
+            break
+        except Exception as e:
+            if attempt or not is_mcp_connection_error(e):
+                trace.finish(error=e)
+                raise
+            print(f"⚠️ Lost the MCP server ({str(e)}), restarting it and retrying...")
+            trace.retry()
+            await restart_mcp_server(server_root, tools)
+
+    # Writes that got past the guard fail the run, they are never merged
+    outside = get_outside_paths(
+        {"paths": [write["path"] for write in trace.file_writes]}, workspace_path
     )
+    if outside:
+        error = RuntimeError(
+            f"{procedure_name} wrote outside its working copy: {', '.join(outside)}"
+        )
+        trace.finish(error=error)
+        raise error
+    trace.finish()
+
+    # The MCP server keeps running for the next procedure, it is closed on exit
+    print("Implementation complete.")
+
+
+def implement_with_mcp(procedure_name, project_path):
+    """
+    Implement a procedure with the MCP agent from synchronous code. Every
+    call reuses the project's running MCP server.
 
-    print("Running MCP implementation executor agent...")
-    events_async = runner.run_async(
-        session_id=session.id, user_id=session.user_id, new_message=content
+    Args:
+        procedure_name: Name of the procedure to implement
+        project_path: Path to the project directory
+    """
+    return run_with_mcp_servers(
+        run_mcp_implementation_executor(procedure_name, project_path)
     )
 
-    async for event in events_async:
-        print(f"Event received: {event}")
 
-    # Crucial Cleanup: Ensure the MCP server process connection is closed.
-    print("Closing MCP server connection...")
-    await exit_stack.aclose()
-    print("Implementation complete.")
+def implement_all_with_mcp(procedures, project_path, concurrency=None):
+    """
+    Implement several procedures with concurrent MCP agent runs on isolated
+    working copies and merge their output into the project.
+
+    Args:
+        procedures: Names of the procedures to implement
+        project_path: Path to the project directory
+        concurrency: Runs at the same time (default MCP_CONCURRENCY)
+
+    Returns:
+        dict: Merge report
+    """
+    return run_with_mcp_servers(
+        run_mcp_batch(
+            procedures, project_path, run_mcp_implementation_executor, concurrency
+        )
+    )
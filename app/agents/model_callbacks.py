@@ -0,0 +1,77 @@
+import threading
+from app.agents.model_configuration import llm
+from app.shared import llm_cache
+from app.shared import llm_telemetry
+from app.shared import model_routing
+
+# Token, cost and retry data is collected through LiteLLM's callback hooks
+llm_telemetry.register_litellm_callback()
+
+# Cache keys of the model calls currently in flight, by invocation
+_pending_cache_keys = {}
+_pending_lock = threading.Lock()
+
+
+def route_request(callback_context, llm_request):
+    """Point the request at the model matching the procedure's complexity"""
+    state = callback_context.state
+    routing = model_routing.route_model(
+        callback_context.agent_name,
+        state.get("procedure") or state.get("procedures"),
+        state.get("project_path"),
+        llm_request.model or llm,
+    )
+    if routing:
+        llm_request.model = routing["model"]
+    return routing
+
+
+def before_model_callback(callback_context, llm_request):
+    """Answer the request from the response cache when the same prompt was already sent"""
+    agent_name = callback_context.agent_name
+    routing = route_request(callback_context, llm_request)
+    model = llm_request.model or llm
+    cache_key = llm_cache.build_cache_key(agent_name, model, llm_request)
+
+    cached_response = llm_cache.get_cached_response(cache_key)
+    if cached_response is not None:
+        print(f"♻️  Using cached response for {agent_name}")
+        llm_telemetry.record_cached_call(callback_context, model, routing)
+        return cached_response
+
+    with _pending_lock:
+        _pending_cache_keys[callback_context.invocation_id] = (
+            cache_key,
+            agent_name,
+            model,
+        )
+    llm_telemetry.start_call(callback_context, model, routing)
+    return None
+
+
+def after_model_callback(callback_context, llm_response):
+    """Store the fresh model response in the response cache and record its metrics"""
+    if llm_response.partial:
+        return None
+
+    with _pending_lock:
+        pending = _pending_cache_keys.pop(callback_context.invocation_id, None)
+
+    if pending:
+        cache_key, agent_name, model = pending
+        llm_cache.store_response(cache_key, agent_name, model, llm_response)
+
+    llm_telemetry.finish_call(callback_context, llm_response)
+    return None
+
+
+def telemetry_before_model_callback(callback_context, llm_request):
+    """Record metrics only, for tool-using agents whose calls must never be cached"""
+    llm_telemetry.start_call(callback_context, llm_request.model or llm)
+    return None
+
+
+def telemetry_after_model_callback(callback_context, llm_response):
+    """Record metrics only, for tool-using agents whose calls must never be cached"""
+    llm_telemetry.finish_call(callback_context, llm_response)
+    return None
@@ -7,11 +7,48 @@ load_dotenv()
 llm_config = os.getenv("LLM_CONFIG")
 llm = None
 
+# Faster model for simple procedures and strongest model for complex ones
+llm_fast = None
+llm_strong = None
+
+# Provider rate limits shared by all agents of the process, by LiteLLM provider
+# prefix: (requests per minute, tokens per minute), 0 = unlimited.
+# LLM_RATE_LIMIT_RPM and LLM_RATE_LIMIT_TPM override them for every provider.
+provider_rate_limits = {
+    "openai": (500, 200000),
+    "google": (1000, 4000000),
+    "anthropic": (50, 40000),
+    "bedrock": (100, 300000),
+}
+
 if llm_config == "openai":
     llm = "openai/o3-mini"
+    llm_fast = "openai/gpt-4o-mini"
+    llm_strong = "openai/o3"
 elif llm_config == "gemini":
     llm = "google/gemini-1.5-flash"
+    llm_fast = "google/gemini-1.5-flash-8b"
+    llm_strong = "google/gemini-1.5-pro"
 elif llm_config == "anthropic":
     llm = "anthropic/claude-3-7-sonnet-latest"
+    llm_fast = "anthropic/claude-3-5-haiku-latest"
+    llm_strong = "anthropic/claude-3-7-sonnet-latest"
 elif llm_config == "bedrock":
     llm = "bedrock/us.meta.llama3-3-70b-instruct-v1:0"
+    llm_fast = "bedrock/us.meta.llama3-1-8b-instruct-v1:0"
+    llm_strong = "bedrock/us.meta.llama3-3-70b-instruct-v1:0"
+elif llm_config == "mock":
+    # Local stand-in for benchmarks: python -m app.shared.mock_llm_server
+    llm = "openai/mock-llm"
+    llm_fast = "openai/mock-llm-fast"
+    llm_strong = "openai/mock-llm-strong"
+    os.environ["OPENAI_BASE_URL"] = os.getenv(
+        "MOCK_LLM_URL", "http://127.0.0.1:8765/v1"
+    )
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    # The mock server has no limits to respect
+    provider_rate_limits["openai"] = (0, 0)
+
+# The tier models can be overridden, e.g. for deployments with other model names
+llm_fast = os.getenv("LLM_MODEL_FAST", llm_fast)
+llm_strong = os.getenv("LLM_MODEL_STRONG", llm_strong)
@@ -1,6 +1,9 @@
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
+from app.shared.rate_limiter import RateLimitedLiteLLMClient
 from app.agents.model_configuration import llm
+from app.agents.model_callbacks import before_model_callback, after_model_callback
+from app.shared.prompt_caching import get_prompt_cache_args
 
 
 tsqlt_user_guide = """
@@ -49,11 +52,48 @@ EXEC tSQLt.PrepareTableForFaking (tSQLt.PrepareTableForFaking '[schema_name]', '
 </tsqlt_user_guide>
 """
 
+test_steps = """
+CREATE PROCEDURE [test_procedure_name].[test_procedure_name_scenario_id]
+AS
+BEGIN
+
+    -- STEP 1: Declare test variables
+    
+    -- STEP 2: Setup test environment - All tables should be faked: tSQLt.FakeTable schema.TableNameWithoutSchema
+    -- STEP 3: Setup test environment - All constraints should be applied: tSQLt.ApplyConstraint schema.TableNameWithoutSchema, constraint
+    -- STEP 4: Setup test environment - All procedures should be spied: tSQLt.SpyProcedure schema.procedureName (if procedure is calling a stored procedure)
+    
+    -- STEP 5: Insert only the required test data as specified in the integration test spec, but DO NOT USE IDENTITY, OR ANY OTHER AUTO INCREMENTED COLUMNS
+    
+    -- STEP 6: Create a #resultSet temp table with the same columns as the result set from the stored procedure
+    
+    -- STEP 7: Use tSQLt.ResultSetFilter to execute the stored procedure and capture the results:  
+    INSERT INTO #resultSet
+    EXEC tSQLt.ResultSetFilter @indexOfResultSet (starting from 1, cannot be 0), '@procedure_name @parameter_name')
+    If there are expected exceptions, make sure to execute the stored procedure (EXEC @procedure_name @parameter_name) without tSQLt.ResultSetFilter
+    And then execute tSQLt.ExpectException with the expected exception
+
+    -- STEP 8: Get the validationCriteria expectedResult from the integration test spec and create the #expected and #actual temp tables with specified columns.
+    -- STEP 9: Insert the expectedResult into #expected
+    -- STEP 10: Capture the actual result INSERT INTO #actual (column1, column2) SELECT column1, column2 FROM #resultSet; using the same columns as in #expected
+    
+    -- STEP 11: Only validate the result columns that are specified in the validationCriteria using temp tables #expected and #actual.
+
+    -- STEP 12: Drop all the temp tables created in the test 
+
+END;
+GO
+"""
+
 
 # Set the agent
 root_agent = Agent(
     name="sql_test_generation_agent",
-    model=LiteLlm(model=llm),
+    model=LiteLlm(
+        model=llm,
+        llm_client=RateLimitedLiteLLMClient(),
+        **get_prompt_cache_args(llm),
+    ),
     description="Generate SQL test code for the tSQLt framework",
     instruction=f"""
 You are a highly experienced tSQLt test developer. 
@@ -84,6 +124,11 @@ MSSQL Server: SQL Server 2019
 {tsqlt_user_guide}
 </allowed_tsqlt_functions>
 
+<test_structure>
+Every test follows this structure and these steps:
+{test_steps}
+</test_structure>
+
 <format>
 Your response must contain only the SQL code for the test procedure.
 DO NOT include code block markers like ```sql or ```.
@@ -92,4 +137,6 @@ DO NOT include EXEC tSQLt.NewTestClass statements in your output.
 Return only the raw SQL code for the test procedure.
 </format>
 """,
+    before_model_callback=before_model_callback,
+    after_model_callback=after_model_callback,
 )
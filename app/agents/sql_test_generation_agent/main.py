@@ -2,6 +2,7 @@ import os
 import sys
 import json
 import re
+import uuid
 import traceback
 
 # Add parent directory to path to ensure imports work
@@ -12,9 +13,14 @@ sys.path.append(
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 from google.genai import types
-from app.agents.sql_test_generation_agent.prompt import get_prompt
+from app.agents.sql_test_generation_agent.prompt import get_prompt, get_prompt_context
 from app.agents.sql_test_generation_agent.agent import root_agent
-from app.shared.get_dependencies import get_dependencies
+from app.shared.concurrency import map_concurrently
+from app.shared.stage_journal import (
+    get_pending_procedures,
+    record_written,
+    run_journaled,
+)
 
 
 def get_procedures(project_path):
@@ -46,6 +52,7 @@ def save_sql_file(file_path, content):
     # Save the file content
     with open(file_path, "w") as f:
         f.write(content)
+    record_written(file_path)
 
 
 def generate_test_class_template(procedure):
@@ -81,6 +88,94 @@ def get_integration_test_spec(procedure, project_path):
     return None
 
 
+def generate_scenario_test(
+    runner,
+    session_service,
+    procedure,
+    procedure_definition,
+    project_path,
+    scenario,
+    prompt_context,
+):
+    """
+    Generate the tSQLt test of a single scenario
+
+    Returns:
+        str: Cleaned test case SQL, or None if no test was generated
+    """
+    scenario_id = scenario.get("testId", "unknown")
+    description = scenario.get("description", "")
+
+    print(f"  Generating test for scenario {scenario_id}: {description}")
+
+    try:
+        # Create session
+        session_id = f"sql_test_{procedure}_{scenario_id}_{uuid.uuid4().hex[:8]}"
+        session = session_service.create_session(
+            app_name="sql_test_generation_agent",
+            user_id="user",
+            session_id=session_id,
+            state={"procedure": procedure, "project_path": project_path},
+        )
+
+        # Create prompt and content object
+        prompt_text = get_prompt(
+            procedure, procedure_definition, project_path, scenario, prompt_context
+        )
+        content = types.Content(role="user", parts=[types.Part(text=prompt_text)])
+
+        # Run the agent
+        final_response = None
+        for event in runner.run(
+            user_id="user",
+            session_id=session_id,
+            new_message=content,
+        ):
+            if hasattr(event, "is_final_response") and event.is_final_response():
+                if event.content and event.content.parts:
+                    final_response = event.content.parts[0].text
+                    print(f"  Received response for scenario {scenario_id}")
+
+        if not final_response:
+            print(f"  ✗ No response received for scenario {scenario_id}")
+            return None
+
+        # Clean up any markdown formatting
+        test_case = final_response.replace("```sql", "").replace("```", "").strip()
+
+        # Remove any NewTestClass statements from the individual test cases
+        test_case = re.sub(
+            r'EXEC\s+tSQLt\.NewTestClass\s+[\'"]test_\w+[\'"]\s*;?\s*GO\s*',
+            "",
+            test_case,
+            flags=re.IGNORECASE | re.MULTILINE,
+        )
+
+        # Ensure test procedure name is correct
+        pattern = rf"\[test_{procedure}\]\.\[test_{procedure}_{scenario_id}\]"
+        if not re.search(pattern, test_case):
+            test_case = re.sub(
+                r"CREATE PROCEDURE\s+\[\w+\.\w+\]\.\[[^\]]+\]",
+                f"CREATE PROCEDURE [test_{procedure}].[test_{procedure}_{scenario_id}]",
+                test_case,
+            )
+
+        # Ensure proper GO statement at the end
+        if not test_case.endswith("GO"):
+            if test_case.endswith("END;"):
+                test_case += "\nGO"
+            else:
+                test_case += "\nEND;\nGO"
+
+        print(f"  ✓ Test generated for scenario {scenario_id}")
+        return test_case
+
+    except Exception as e:
+        print(f"  ✗ Error generating test for scenario {scenario_id}: {str(e)}")
+        traceback.print_exc()
+        return None
+
+
 def generate_sql_test(procedure, project_path):
     """Generate SQL tests for a procedure"""
     print(f"\nGenerating SQL tests for {procedure}...")
@@ -120,8 +215,8 @@ def generate_sql_test(procedure, project_path):
         print(f"No test scenarios found for {procedure}")
         return False
 
-    # Initialize test content with class template - only add the NewTestClass once at the top
-    test_content = generate_test_class_template(procedure)
+    # Dependencies and returnable objects are loaded once and shared by all scenarios
+    prompt_context = get_prompt_context(procedure, procedure_definition, project_path)
 
     # Setup session service and runner
     session_service = InMemorySessionService()
@@ -131,85 +226,35 @@ def generate_sql_test(procedure, project_path):
         session_service=session_service,
     )
 
-    # Process each test scenario
+    # Generate all scenarios concurrently, results come back in scenario order
+    print(f"  Generating {len(test_scenarios)} scenarios concurrently...")
+    test_cases = map_concurrently(
+        lambda scenario: generate_scenario_test(
+            runner,
+            session_service,
+            procedure,
+            procedure_definition,
+            project_path,
+            scenario,
+            prompt_context,
+        ),
+        test_scenarios,
+    )
+
+    # Initialize test content with class template - only add the NewTestClass once at the top
+    test_content = generate_test_class_template(procedure)
+
     processed_count = 0
-    for scenario in test_scenarios:
+    for scenario, test_case in zip(test_scenarios, test_cases):
+        if not test_case:
+            continue
         scenario_id = scenario.get("testId", "unknown")
         description = scenario.get("description", "")
 
-        print(f"  Generating test for scenario {scenario_id}: {description}")
-
-        try:
-            # Create session
-            session_id = f"sql_test_{procedure}_{scenario_id}"
-            session = session_service.create_session(
-                app_name="sql_test_generation_agent",
-                user_id="user",
-                session_id=session_id,
-            )
-
-            # Create prompt and content object
-            prompt_text = get_prompt(
-                procedure, procedure_definition, project_path, scenario
-            )
-            content = types.Content(role="user", parts=[types.Part(text=prompt_text)])
-
-            # Run the agent
-            final_response = None
-            for event in runner.run(
-                user_id="user",
-                session_id=session_id,
-                new_message=content,
-            ):
-                if hasattr(event, "is_final_response") and event.is_final_response():
-                    if event.content and event.content.parts:
-                        final_response = event.content.parts[0].text
-                        print(f"  Received response for scenario {scenario_id}")
-
-            # Process response
-            if final_response:
-                # Clean up any markdown formatting
-                test_case = (
-                    final_response.replace("```sql", "").replace("```", "").strip()
-                )
-
-                # Remove any NewTestClass statements from the individual test cases
-                test_case = re.sub(
-                    r'EXEC\s+tSQLt\.NewTestClass\s+[\'"]test_\w+[\'"]\s*;?\s*GO\s*',
-                    "",
-                    test_case,
-                    flags=re.IGNORECASE | re.MULTILINE,
-                )
-
-                # Ensure test procedure name is correct
-                pattern = rf"\[test_{procedure}\]\.\[test_{procedure}_{scenario_id}\]"
-                if not re.search(pattern, test_case):
-                    test_case = re.sub(
-                        r"CREATE PROCEDURE\s+\[\w+\.\w+\]\.\[[^\]]+\]",
-                        f"CREATE PROCEDURE [test_{procedure}].[test_{procedure}_{scenario_id}]",
-                        test_case,
-                    )
-
-                # Ensure proper GO statement at the end
-                if not test_case.endswith("GO"):
-                    if test_case.endswith("END;"):
-                        test_case += "\nGO"
-                    else:
-                        test_case += "\nEND;\nGO"
-
-                # Add test case to overall content
-                test_content += (
-                    f"\n\n-- Test scenario: {scenario_id} - {description}\n\n"
-                )
-                test_content += test_case
-                processed_count += 1
-                print(f"  ✓ Test generated for scenario {scenario_id}")
-            else:
-                print(f"  ✗ No response received for scenario {scenario_id}")
-
-        except Exception as e:
-            print(f"  ✗ Error generating test for scenario {scenario_id}: {str(e)}")
-            traceback.print_exc()
+        # Add test case to overall content
+        test_content += f"\n\n-- Test scenario: {scenario_id} - {description}\n\n"
+        test_content += test_case
+        processed_count += 1
 
     # Save the complete test file if any tests were generated
     if processed_count > 0:
@@ -254,10 +299,11 @@ def run_sql_test_generation(project_path):
             return True
 
         elif choice == len(procedures) + 1:
-            # Generate tests for all procedures
-            for i, procedure in enumerate(procedures):
-                print(f"\nProcessing {procedure} ({i+1}/{len(procedures)})...")
-                generate_sql_test(procedure, project_path)
+            # Generate tests for all procedures that are not up to date
+            pending = get_pending_procedures(project_path, "sql-tests", procedures)
+            for i, procedure in enumerate(pending):
+                print(f"\nProcessing {procedure} ({i+1}/{len(pending)})...")
+                run_journaled("sql-tests", procedure, project_path, generate_sql_test)
 
             print(
                 f"\nSQL test generation completed for all {len(procedures)} procedures."
@@ -4,11 +4,16 @@ import json
 import uuid
 import re
 import glob
+import shutil
+import hashlib
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 from app.agents.testable_unit_scenario_agent.prompt import get_prompt
 from app.agents.testable_unit_scenario_agent.agent import root_agent
 from app.shared.get_dependencies import get_dependencies
+from app.shared.prompt_context import prune_dependencies
+from app.shared.concurrency import map_concurrently
+from app.shared.stage_journal import record_written
 
 # Add parent directory to path to ensure imports work
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -64,6 +69,146 @@ def check_required_files(procedure, project_path):
     return True
 
 
+APP_NAME = "Testable Unit Scenarios Builder"
+USER_ID = "project_owner"
+
+
+def get_checkpoint_dir(procedure, project_path):
+    """Get the directory holding the per-unit results of an unfinished run"""
+    return os.path.join(
+        project_path, "analysis", procedure, ".checkpoints", "testable_unit_scenarios"
+    )
+
+
+def get_unit_hash(testable_unit):
+    """Hash a testable unit so a checkpoint is not reused after the unit changed"""
+    serialized = json.dumps(testable_unit, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def get_unit_checkpoint_path(checkpoint_dir, testable_unit):
+    unit_id = re.sub(r"[^\w.-]", "_", str(testable_unit.get("id", "unknown")))
+    return os.path.join(checkpoint_dir, f"{unit_id}.json")
+
+
+def load_unit_checkpoint(checkpoint_dir, testable_unit):
+    """Load the checkpointed scenario of a unit, or None if it has to be generated"""
+    checkpoint_path = get_unit_checkpoint_path(checkpoint_dir, testable_unit)
+    if not os.path.exists(checkpoint_path):
+        return None
+    try:
+        with open(checkpoint_path, "r") as f:
+            checkpoint = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+    if checkpoint.get("unitHash") != get_unit_hash(testable_unit):
+        return None
+    return checkpoint.get("scenario")
+
+
+def save_unit_checkpoint(checkpoint_dir, testable_unit, scenario):
+    """Save the scenario of a finished unit"""
+    checkpoint_path = get_unit_checkpoint_path(checkpoint_dir, testable_unit)
+    checkpoint = {"unitHash": get_unit_hash(testable_unit), "scenario": scenario}
+    save_json_file(checkpoint_path, json.dumps(checkpoint, indent=2))
+
+
+def is_failed_scenario(scenario):
+    """Return True for the error/placeholder scenarios of units that must be regenerated"""
+    if not isinstance(scenario, dict):
+        return scenario is None
+    return str(scenario.get("id", "")).startswith(("ERROR-", "PLACEHOLDER-"))
+
+
+def generate_unit_scenarios(
+    runner, procedure, procedure_definition, dependencies, project_path, testable_unit
+):
+    """
+    Generate the test scenarios of a single testable unit
+
+    Returns:
+        dict: Scenario object (ERROR-/PLACEHOLDER- ids when generation failed)
+    """
+    try:
+        session_id = str(uuid.uuid4())
+        runner.session_service.create_session(
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            session_id=session_id,
+            state={"procedure": procedure, "project_path": project_path},
+        )
+
+        # Run the agent to generate testable unit scenarios for this unit
+        final_response = ""
+        for event in runner.run(
+            user_id=USER_ID,
+            session_id=session_id,
+            new_message=get_prompt(
+                procedure,
+                procedure_definition,
+                prune_dependencies(
+                    dependencies,
+                    testable_unit.get("sqlSnippet") or procedure_definition,
+                ),
+                project_path,
+                testable_unit,
+            ),
+        ):
+            if event.is_final_response():
+                if event.content and event.content.parts:
+                    final_response = event.content.parts[0].text
+                    print(
+                        f"Received response from the agent for unit: {testable_unit['id']}"
+                    )
+
+        # Step 1: Try to parse the entire response as JSON
+        try:
+            return json.loads(final_response)
+
+        # Step 2: If that fails, try to find JSON code blocks
+        except json.JSONDecodeError:
+            print("Response is not valid JSON, looking for code blocks...")
+
+            # Look for code blocks
+            for match in re.finditer(
+                r"```(?:json)?\n(.*?)\n```", final_response, re.DOTALL
+            ):
+                json_content = match.group(1).strip()
+                try:
+                    parsed_json = json.loads(json_content)
+                except json.JSONDecodeError:
+                    continue
+                # Add the unit ID to the scenario
+                return {
+                    "id": f"SCENARIO-{testable_unit['id']}-block",
+                    "testableUnitId": testable_unit["id"],
+                    "unitName": testable_unit["name"],
+                    "name": testable_unit["name"],
+                    "description": parsed_json.get("description", ""),
+                    "data": parsed_json,
+                }
+
+            # Step 3: If no JSON found, add a placeholder
+            return {
+                "id": f"PLACEHOLDER-{testable_unit['id']}",
+                "testableUnitId": testable_unit["id"],
+                "unitName": testable_unit["name"],
+                "name": testable_unit["name"],
+                "description": "Could not parse response as JSON",
+            }
+
+    except Exception as e:
+        print(f"Error processing unit {testable_unit['id']}: {str(e)}")
+        # Add error scenario
+        return {
+            "id": f"ERROR-{testable_unit['id']}",
+            "testableUnitId": testable_unit["id"],
+            "unitName": testable_unit["name"],
+            "name": f"Error processing {testable_unit['name']}",
+            "description": f"Error: {str(e)}",
+        }
+
+
 def testable_unit_scenarios(procedure, project_path):
     """Main entry point - plan testable unit scenarios for a procedure based on its analysis"""
     print(f"\nStarting testable unit scenarios for {procedure}")
@@ -100,107 +245,46 @@ def testable_unit_scenarios(procedure, project_path):
         print(f"Error: Testable units file not found at {testable_units_path}")
         return False
 
-    # Variable to store all scenarios for all units
-    all_scenarios = {"testableUnitScenarios": []}
+    # One session service and runner shared by all units, each unit gets its own session
+    session_service = InMemorySessionService()
+    runner = Runner(
+        agent=root_agent,
+        app_name=APP_NAME,
+        session_service=session_service,
+    )
+
+    checkpoint_dir = get_checkpoint_dir(procedure, project_path)
+
+    def process_unit(indexed_unit):
+        unit_index, testable_unit = indexed_unit
+
+        # Units finished by an interrupted run are taken from their checkpoint
+        scenario = load_unit_checkpoint(checkpoint_dir, testable_unit)
+        if scenario is not None:
+            print(f"Using checkpoint for testable unit: {testable_unit['id']}")
+            return scenario
 
-    # Process each testable unit
-    for unit_index, testable_unit in enumerate(testable_units):
         print(
             f"Processing testable unit {unit_index + 1}/{len(testable_units)}: {testable_unit['name']}"
         )
-
-        # Create a new session for each unit
-        session_service = InMemorySessionService()
-        APP_NAME = "Testable Unit Scenarios Builder"
-        USER_ID = "project_owner"
-        SESSION_ID = str(uuid.uuid4())
-        session = session_service.create_session(
-            app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+        scenario = generate_unit_scenarios(
+            runner,
+            procedure,
+            procedure_definition,
+            dependencies,
+            project_path,
+            testable_unit,
         )
-
-        # Create and run the agent
-        runner = Runner(
-            agent=root_agent,
-            app_name=APP_NAME,
-            session_service=session_service,
+        if not is_failed_scenario(scenario):
+            save_unit_checkpoint(checkpoint_dir, testable_unit, scenario)
+        return scenario
+
+    # Units run concurrently, scenarios are kept in the order of the testable units
+    all_scenarios = {
+        "testableUnitScenarios": map_concurrently(
+            process_unit, list(enumerate(testable_units))
         )
-
-        # Run the agent to generate testable unit scenarios for this unit
-        try:
-            final_response = ""
-            for event in runner.run(
-                user_id=USER_ID,
-                session_id=SESSION_ID,
-                new_message=get_prompt(
-                    procedure,
-                    procedure_definition,
-                    dependencies,
-                    project_path,
-                    testable_unit,
-                ),
-            ):
-                if event.is_final_response():
-                    if event.content and event.content.parts:
-                        final_response = event.content.parts[0].text
-                        print(
-                            f"Received response from the agent for unit: {testable_unit['id']}"
-                        )
-
-            # Step 1: Try to parse the entire response as JSON
-            try:
-                parsed_json = json.loads(final_response)
-                # Add the unit ID to the scenario
-                all_scenarios["testableUnitScenarios"].append(parsed_json)
-
-            # Step 2: If that fails, try to find JSON code blocks
-            except json.JSONDecodeError:
-                print("Response is not valid JSON, looking for code blocks...")
-                json_blocks_found = False
-
-                # Look for code blocks
-                for match in re.finditer(
-                    r"```(?:json)?\n(.*?)\n```", final_response, re.DOTALL
-                ):
-                    json_content = match.group(1).strip()
-                    try:
-                        parsed_json = json.loads(json_content)
-                        # Add the unit ID to the scenario
-                        scenario = {
-                            "id": f"SCENARIO-{testable_unit['id']}-block",
-                            "testableUnitId": testable_unit["id"],
-                            "unitName": testable_unit["name"],
-                            "name": testable_unit["name"],
-                            "description": parsed_json.get("description", ""),
-                            "data": parsed_json,
-                        }
-                        all_scenarios["testableUnitScenarios"].append(scenario)
-                        json_blocks_found = True
-                        break
-                    except json.JSONDecodeError:
-                        continue
-
-                # Step 3: If no JSON found, add a placeholder
-                if not json_blocks_found:
-                    scenario = {
-                        "id": f"PLACEHOLDER-{testable_unit['id']}",
-                        "testableUnitId": testable_unit["id"],
-                        "unitName": testable_unit["name"],
-                        "name": testable_unit["name"],
-                        "description": "Could not parse response as JSON",
-                    }
-                    all_scenarios["testableUnitScenarios"].append(scenario)
-
-        except Exception as e:
-            print(f"Error processing unit {testable_unit['id']}: {str(e)}")
-            # Add error scenario
-            error_scenario = {
-                "id": f"ERROR-{testable_unit['id']}",
-                "testableUnitId": testable_unit["id"],
-                "unitName": testable_unit["name"],
-                "name": f"Error processing {testable_unit['name']}",
-                "description": f"Error: {str(e)}",
-            }
-            all_scenarios["testableUnitScenarios"].append(error_scenario)
+    }
 
     # Save all scenarios to file
     scenarios_file_path = os.path.join(
@@ -208,10 +292,27 @@ def testable_unit_scenarios(procedure, project_path):
     )
     with open(scenarios_file_path, "w") as f:
         json.dump(all_scenarios, f, indent=2)
+    record_written(scenarios_file_path)
 
     print(
         f"Created testable unit scenarios file with {len(all_scenarios['testableUnitScenarios'])} scenarios at {scenarios_file_path}"
     )
+
+    # A failed unit fails the stage, so the next run retries only the units
+    # without a checkpoint. Checkpoints are only needed until then
+    failed_units = [
+        testable_unit.get("id", "unknown")
+        for testable_unit, scenario in zip(
+            testable_units, all_scenarios["testableUnitScenarios"]
+        )
+        if is_failed_scenario(scenario)
+    ]
+    if failed_units:
+        print(
+            f"❌ {len(failed_units)} of {len(testable_units)} testable units failed for {procedure}: {', '.join(map(str, failed_units))} (rerun to retry them)"
+        )
+        return False
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
     return True
 
 
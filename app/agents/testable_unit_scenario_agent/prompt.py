@@ -1,5 +1,6 @@
 from google.genai import types
 import json
+from app.shared.prompt_context import prune_analysis_items
 
 
 def get_prompt(
@@ -19,14 +20,18 @@ def get_prompt(
         f"{project_path}/analysis/{procedure_name}/business_functions.json",
         "r",
     ) as f:
-        business_functions_json = json.load(f)
+        business_functions_json = prune_analysis_items(
+            json.load(f), "businessFunctions", testable_unit
+        )
 
     # business_processes
     with open(
         f"{project_path}/analysis/{procedure_name}/business_processes.json",
         "r",
     ) as f:
-        business_processes_json = json.load(f)
+        business_processes_json = prune_analysis_items(
+            json.load(f), "businessProcesses", business_functions_json
+        )
 
     # returnable_objects
     with open(
@@ -0,0 +1,202 @@
+import os
+import glob
+import json
+import hashlib
+import threading
+from datetime import datetime
+
+MANIFEST_DIR = "data"
+MANIFEST_FILE = "artifact_manifest.json"
+MANIFEST_VERSION = 1
+
+_force = False
+_lock = threading.Lock()
+_manifests = {}
+_file_hashes = {}
+
+
+def set_force(force):
+    """Rerun every procedure for the rest of this run, up to date or not"""
+    global _force
+    _force = bool(force)
+
+
+def is_forced():
+    """Return True when up-to-date procedures are rerun anyway"""
+    return _force
+
+
+def get_manifest_path(project_path):
+    """Get the path of the project's artifact manifest"""
+    return os.path.join(project_path, MANIFEST_DIR, MANIFEST_FILE)
+
+
+def get_file_hash(path):
+    """
+    SHA-256 of a file (None when it does not exist). Hashes are kept per
+    modification time and size, so unchanged files are only read once.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _file_hashes.get(key)
+    if digest is None:
+        try:
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+        _file_hashes[key] = digest
+    return digest
+
+
+def hash_stage_inputs(stage_name, procedure, project_path):
+    """
+    Hash the files a (stage, procedure) pair reads. A glob pattern gets one
+    hash over the paths and contents of every file it matches, the stage's
+    own outputs are never counted as its inputs.
+
+    Returns:
+        dict: Input path or pattern (relative to the project) to its hash
+    """
+    from app.shared.pipeline import get_stage
+    from app.shared.stage_journal import get_stage_inputs
+
+    own_outputs = {
+        output.format(procedure=procedure)
+        for output in get_stage(stage_name).get("outputs", [])
+    }
+    inputs = {}
+    for relative_path in get_stage_inputs(stage_name, procedure, project_path):
+        if relative_path in own_outputs:
+            continue
+        if not glob.has_magic(relative_path):
+            inputs[relative_path] = get_file_hash(
+                os.path.join(project_path, relative_path)
+            )
+            continue
+
+        digest = hashlib.sha256()
+        matches = glob.glob(os.path.join(project_path, relative_path), recursive=True)
+        for path in sorted(matches):
+            match = os.path.relpath(path, project_path).replace(os.sep, "/")
+            if match in own_outputs or not os.path.isfile(path):
+                continue
+            digest.update(f"{match}\0{get_file_hash(path)}\0".encode("utf-8"))
+        inputs[relative_path] = digest.hexdigest()
+    return inputs
+
+
+def combine_hashes(stage_name, inputs):
+    """Fold the input hashes of a stage into one hash (recorded in the journal)"""
+    digest = hashlib.sha256(stage_name.encode("utf-8"))
+    for relative_path in sorted(inputs):
+        digest.update(f"\0{relative_path}\0{inputs[relative_path]}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_manifest(project_path):
+    """
+    Read the project's artifact manifest: for every stage and procedure the
+    hashes of the inputs it ran with and the outputs it wrote.
+
+    Returns:
+        dict: {"version", "stages": {stage: {procedure: entry}}}
+    """
+    manifest_path = get_manifest_path(project_path)
+    try:
+        modified = os.stat(manifest_path).st_mtime_ns
+    except OSError:
+        return {"version": MANIFEST_VERSION, "stages": {}}
+
+    cached = _manifests.get(manifest_path)
+    if cached and cached[0] == modified:
+        return cached[1]
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        manifest = None
+    if not manifest or manifest.get("version") != MANIFEST_VERSION:
+        manifest = {"version": MANIFEST_VERSION, "stages": {}}
+    _manifests[manifest_path] = (modified, manifest)
+    return manifest
+
+
+def _save_manifest(project_path, manifest):
+    manifest_path = get_manifest_path(project_path)
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(temp_path, manifest_path)
+    _manifests[manifest_path] = (os.stat(manifest_path).st_mtime_ns, manifest)
+
+
+def _update_entry(project_path, stage_name, procedure, entry):
+    with _lock:
+        manifest = load_manifest(project_path)
+        entries = manifest["stages"].setdefault(stage_name, {})
+        if entry is None:
+            if entries.pop(procedure, None) is None:
+                return
+        else:
+            entries[procedure] = entry
+        try:
+            _save_manifest(project_path, manifest)
+        except Exception as e:
+            print(f"Warning: Could not write the artifact manifest: {str(e)}")
+
+
+def record_stage(project_path, stage_name, procedure, inputs, outputs):
+    """
+    Record a successful (stage, procedure) run in the manifest.
+
+    Args:
+        project_path: Project path
+        stage_name: Stage name
+        procedure: Procedure name
+        inputs: Input hashes taken before the run (see hash_stage_inputs)
+        outputs: Files the run wrote, relative to the project
+    """
+    _update_entry(
+        project_path,
+        stage_name,
+        procedure,
+        {
+            "recorded_at": datetime.now().isoformat(),
+            "inputs": inputs,
+            "outputs": {
+                output: get_file_hash(os.path.join(project_path, output))
+                for output in sorted(set(outputs))
+            },
+        },
+    )
+
+
+def forget_stage(project_path, stage_name, procedure):
+    """Drop a (stage, procedure) entry, e.g. after a failed run"""
+    _update_entry(project_path, stage_name, procedure, None)
+
+
+def is_up_to_date(project_path, stage_name, procedure, manifest=None):
+    """
+    Check if a (stage, procedure) pair can be skipped: it ran before with the
+    same input hashes and all of its outputs are still there. Never true when
+    the run is forced.
+    """
+    if _force:
+        return False
+    if manifest is None:
+        manifest = load_manifest(project_path)
+    entry = manifest["stages"].get(stage_name, {}).get(procedure)
+    if not entry:
+        return False
+    if not all(
+        os.path.exists(os.path.join(project_path, output))
+        for output in entry["outputs"]
+    ):
+        return False
+    return entry["inputs"] == hash_stage_inputs(stage_name, procedure, project_path)
@@ -0,0 +1,367 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REPO_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.insert(0, REPO_ROOT)
+
+from app.shared.synthetic_database import (
+    SCHEMA_NAME,
+    generate_schema,
+    create_synthetic_database,
+    write_project_fixtures,
+)
+
+BENCHMARK_STEPS = [
+    "extract-procedures",
+    "discover-dependencies",
+    "get-dependencies",
+    "ef-analysis",
+    "generate-report",
+    "run-sql-tests",
+]
+
+# A step this much slower than in the baseline is reported as a regression
+BENCHMARK_REGRESSION_THRESHOLD = float(
+    os.getenv("BENCHMARK_REGRESSION_THRESHOLD", "0.2")
+)
+
+
+def get_version():
+    """Commit of the working tree, so results can be compared between versions"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def get_procedures(project_path):
+    sql_raw_dir = os.path.join(project_path, "sql_raw")
+    if not os.path.exists(sql_raw_dir):
+        return []
+    return sorted(
+        folder
+        for folder in os.listdir(sql_raw_dir)
+        if os.path.isdir(os.path.join(sql_raw_dir, folder))
+    )
+
+
+def run_step(name, project_path, project_name, connection_string):
+    """
+    Run one benchmark step.
+
+    Returns:
+        int: Number of items (procedures) the step processed
+    """
+    if name == "extract-procedures":
+        from app.shared.get_stored_procedures import extract_stored_procedures
+
+        extract_stored_procedures(project_path, connection_string, [f"{SCHEMA_NAME}.*"])
+        return len(get_procedures(project_path))
+
+    if name == "discover-dependencies":
+        from app.shared.discover_dependencies import discover_dependencies
+
+        # The dependency files are written relative to the repository root
+        original_dir = os.getcwd()
+        os.chdir(REPO_ROOT)
+        try:
+            discover_dependencies(connection_string, project_name)
+        finally:
+            os.chdir(original_dir)
+        return len(get_procedures(project_path))
+
+    procedures = get_procedures(project_path)
+
+    if name == "get-dependencies":
+        from app.shared.get_dependencies import get_dependencies
+
+        for procedure in procedures:
+            get_dependencies(procedure, project_path, connection_string)
+        return len(procedures)
+
+    if name == "ef-analysis":
+        from app.shared.scaffold_templates.create_ef_analysis import (
+            analyze_csharp_dependencies,
+        )
+
+        for procedure in procedures:
+            analyze_csharp_dependencies(procedure, project_path)
+        return len(procedures)
+
+    if name == "generate-report":
+        from app.shared.python_scripts.generate_report import run_generate_report
+
+        for procedure in procedures:
+            run_generate_report(procedure, project_path)
+        return len(procedures)
+
+    if name == "run-sql-tests":
+        from app.shared.run_sql_tests import run_sql_tests
+
+        if not run_sql_tests(project_path, connection_string):
+            raise RuntimeError("run_sql_tests reported a failure")
+        return len(procedures)
+
+    raise ValueError(f"Unknown benchmark step: {name}")
+
+
+def time_step(name, project_path, project_name, connection_string, repeat=1):
+    """Time a step over several runs"""
+    result = {"name": name, "status": "ok", "runs": [], "items": 0, "error": None}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            result["items"] = run_step(
+                name, project_path, project_name, connection_string
+            )
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = str(e)
+            print(f"❌ Benchmark step {name} failed: {str(e)}")
+            break
+        finally:
+            result["runs"].append(round(time.perf_counter() - started, 4))
+
+    runs = result["runs"]
+    result["median"] = round(statistics.median(runs), 4) if runs else None
+    result["min"] = min(runs) if runs else None
+    result["max"] = max(runs) if runs else None
+    result["per_item"] = (
+        round(result["median"] / result["items"], 6)
+        if result["median"] is not None and result["items"]
+        else None
+    )
+    return result
+
+
+def find_baseline(results_dir, config, exclude=None):
+    """Latest earlier result file with the same schema size"""
+    if not os.path.exists(results_dir):
+        return None
+    for filename in sorted(os.listdir(results_dir), reverse=True):
+        path = os.path.join(results_dir, filename)
+        if not filename.startswith("benchmark_") or path == exclude:
+            continue
+        try:
+            with open(path, "r") as f:
+                result = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            continue
+        if result.get("config", {}).get("schema") == config["schema"]:
+            return result
+    return None
+
+
+def compare_results(result, baseline):
+    """
+    Compare the step medians with a baseline result.
+
+    Returns:
+        list: Steps that got slower than the regression threshold allows
+    """
+    baseline_steps = {step["name"]: step for step in baseline.get("steps", [])}
+    regressions = []
+    for step in result["steps"]:
+        previous = baseline_steps.get(step["name"])
+        if not previous or not previous.get("median") or step["median"] is None:
+            step["baseline_median"] = None
+            step["change"] = None
+            continue
+        change = (step["median"] - previous["median"]) / previous["median"]
+        step["baseline_median"] = previous["median"]
+        step["change"] = round(change, 4)
+        if change > BENCHMARK_REGRESSION_THRESHOLD:
+            regressions.append(step["name"])
+    return regressions
+
+
+def print_benchmark_results(result):
+    print(f"\n=== Benchmark results ({result['version'] or 'unknown version'}) ===")
+    header = f"{'Step':<24} {'Status':<8} {'Items':>6} {'Median s':>10} {'Per item s':>11} {'Change':>8}"
+    print(header)
+    print("-" * len(header))
+    for step in result["steps"]:
+        median = f"{step['median']:.3f}" if step["median"] is not None else "-"
+        per_item = f"{step['per_item']:.4f}" if step["per_item"] is not None else "-"
+        change = f"{step['change']:+.0%}" if step.get("change") is not None else "-"
+        print(
+            f"{step['name']:<24} {step['status']:<8} {step['items']:>6} "
+            f"{median:>10} {per_item:>11} {change:>8}"
+        )
+    if result.get("baseline_version"):
+        print(
+            f"Compared with {result['baseline_version']} ({result['baseline_timestamp']})"
+        )
+    if result.get("regressions"):
+        print(f"⚠️  Regressions: {', '.join(result['regressions'])}")
+
+
+def run_benchmark(
+    connection_string,
+    tables=20,
+    procedures=50,
+    views=5,
+    functions=5,
+    triggers=5,
+    seed=42,
+    database="ModernizationBenchmark",
+    project_name="benchmark",
+    steps=None,
+    repeat=1,
+    tests_per_procedure=2,
+    install_tsqlt=True,
+    output_dir=None,
+):
+    """
+    Generate a synthetic database, time the non-LLM stages against it and
+    write the results as JSON.
+
+    Returns:
+        dict: Benchmark result (also written to output_dir)
+    """
+    project_path = os.path.join(REPO_ROOT, "app", "output", project_name)
+    os.makedirs(project_path, exist_ok=True)
+    results_dir = output_dir or os.path.join(project_path, "metrics")
+
+    config = {
+        "schema": {
+            "tables": tables,
+            "procedures": procedures,
+            "views": views,
+            "functions": functions,
+            "triggers": triggers,
+            "seed": seed,
+            "tests_per_procedure": tests_per_procedure,
+        },
+        "repeat": repeat,
+        "database": database,
+    }
+
+    schema = generate_schema(tables, procedures, views, functions, triggers, seed)
+    started = time.perf_counter()
+    database_connection_string = create_synthetic_database(
+        connection_string, database, schema, install_tsqlt
+    )
+    generate_seconds = round(time.perf_counter() - started, 4)
+    write_project_fixtures(project_path, schema, tests_per_procedure)
+
+    step_results = [
+        time_step(name, project_path, project_name, database_connection_string, repeat)
+        for name in steps or BENCHMARK_STEPS
+    ]
+
+    result = {
+        "timestamp": datetime.now().isoformat(),
+        "version": get_version(),
+        "config": config,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "generate_seconds": generate_seconds,
+        "steps": step_results,
+    }
+
+    os.makedirs(results_dir, exist_ok=True)
+    result_path = os.path.join(
+        results_dir, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    baseline = find_baseline(results_dir, config, exclude=result_path)
+    result["regressions"] = []
+    if baseline:
+        result["baseline_version"] = baseline.get("version")
+        result["baseline_timestamp"] = baseline.get("timestamp")
+        result["regressions"] = compare_results(result, baseline)
+
+    with open(result_path, "w") as f:
+        json.dump(result, f, indent=4)
+
+    print_benchmark_results(result)
+    print(f"Benchmark results saved to {result_path}")
+    return result
+
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(
+        description="Time the non-LLM stages against a synthetic SQL Server database"
+    )
+    parser.add_argument(
+        "--connection-string",
+        default=os.getenv("CONNECTION_STRING"),
+        help="Connection string of the SQL Server (default: CONNECTION_STRING)",
+    )
+    parser.add_argument("--database", default="ModernizationBenchmark")
+    parser.add_argument("--project", default="benchmark", help="Output project name")
+    parser.add_argument("--tables", type=int, default=20)
+    parser.add_argument("--procedures", type=int, default=50)
+    parser.add_argument("--views", type=int, default=5)
+    parser.add_argument("--functions", type=int, default=5)
+    parser.add_argument("--triggers", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tests-per-procedure", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per step")
+    parser.add_argument(
+        "--step",
+        action="append",
+        dest="steps",
+        choices=BENCHMARK_STEPS,
+        help="Step to time (repeatable, default: all)",
+    )
+    parser.add_argument(
+        "--skip-tsqlt",
+        action="store_true",
+        help="Do not install tSQLt into the benchmark database",
+    )
+    parser.add_argument("--output-dir", help="Folder for the result JSON files")
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit with 1 when a step is slower than the baseline allows",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_arguments(sys.argv[1:])
+    if not args.connection_string:
+        print("No connection string, pass --connection-string or set CONNECTION_STRING")
+        sys.exit(2)
+
+    result = run_benchmark(
+        args.connection_string,
+        tables=args.tables,
+        procedures=args.procedures,
+        views=args.views,
+        functions=args.functions,
+        triggers=args.triggers,
+        seed=args.seed,
+        database=args.database,
+        project_name=args.project,
+        steps=args.steps,
+        repeat=args.repeat,
+        tests_per_procedure=args.tests_per_procedure,
+        install_tsqlt=not args.skip_tsqlt,
+        output_dir=args.output_dir,
+    )
+    failed = any(step["status"] != "ok" for step in result["steps"])
+    if failed or (args.fail_on_regression and result["regressions"]):
+        sys.exit(1)
@@ -0,0 +1,55 @@
+import os
+import traceback
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Maximum number of LLM calls an agent runs at the same time
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+
+
+def map_concurrently(function, items, max_workers=None, on_complete=None):
+    """
+    Run a function over items on a bounded thread pool.
+
+    ADK's Runner.run drives each agent call on its own event loop thread, so
+    blocking calls can safely be fanned out from worker threads. Each item
+    runs in a copy of the caller's context (e.g. the stage journal's list of
+    written files).
+
+    Args:
+        function: Called as function(item) for every item
+        items: Items to process
+        max_workers: Pool size (defaults to LLM_MAX_CONCURRENCY)
+        on_complete: Optional callback(index, item, result) run as each item finishes
+
+    Returns:
+        list: Results in the order of items (None for items that raised)
+    """
+    items = list(items)
+    results = [None] * len(items)
+    if not items:
+        return results
+
+    max_workers = max(1, min(max_workers or LLM_MAX_CONCURRENCY, len(items)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(contextvars.copy_context().run, function, item): index
+            for index, item in enumerate(items)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                print(f"Error processing item {index + 1}/{len(items)}: {str(e)}")
+                traceback.print_exc()
+                continue
+
+            if on_complete:
+                on_complete(index, items[index], results[index])
+
+    return results
@@ -2,15 +2,8 @@ import os
 import pyodbc
 import json
 
-# Get Each procedure dependencies
-procedure_dependencies = []
-
-# New list to store object creation scripts
-object_create_scripts = []
-
-
 # Add code to collect all database objects for object_create_scripts.json
-def get_object_definition(object_name, object_type):
+def get_object_definition(cursor, object_name, object_type):
     """Get the CREATE script for a database object"""
     try:
         cursor.execute(
@@ -23,7 +16,7 @@ def get_object_definition(object_name, object_type):
 
 
 # Helper function to check if a stored procedure exists
-def check_procedure_exists(procedure_name):
+def check_procedure_exists(cursor, procedure_name):
     try:
         cursor.execute(
             f"""
@@ -39,9 +32,9 @@ def check_procedure_exists(procedure_name):
 
 
 # Function to get complete table definition using sp_GetDDL if available
-def get_complete_table_definition(table_name):
+def get_complete_table_definition(cursor, table_name):
     # Check if sp_GetDDL exists (this is a common custom procedure in many environments)
-    if check_procedure_exists("sp_GetDDL"):
+    if check_procedure_exists(cursor, "sp_GetDDL"):
         try:
             cursor.execute(f"EXEC sp_GetDDL '{table_name}'")
             rows = cursor.fetchall()
@@ -281,7 +274,10 @@ def get_complete_table_definition(table_name):
 
 
 # Function to collect all database objects and their creation scripts
-def collect_object_create_scripts():
+def collect_object_create_scripts(cursor):
+    """Get the CREATE script of every table, view, function, procedure and trigger"""
+    object_create_scripts = []
+
     # Get tables
     cursor.execute(
         """
@@ -297,7 +293,7 @@ def collect_object_create_scripts():
 
     tables = cursor.fetchall()
     for table in tables:
-        table_def = get_complete_table_definition(table.table_name)
+        table_def = get_complete_table_definition(cursor, table.table_name)
         if table_def:
             object_create_scripts.append(
                 {
@@ -322,7 +318,7 @@ def collect_object_create_scripts():
 
     views = cursor.fetchall()
     for view in views:
-        view_def = get_object_definition(view.view_name, "VIEW")
+        view_def = get_object_definition(cursor, view.view_name, "VIEW")
         if view_def:
             object_create_scripts.append(
                 {"name": view.view_name, "type": "VIEW", "definition": view_def}
@@ -350,7 +346,7 @@ def collect_object_create_scripts():
 
     functions = cursor.fetchall()
     for func in functions:
-        func_def = get_object_definition(func.function_name, func.function_type)
+        func_def = get_object_definition(cursor, func.function_name, func.function_type)
         if func_def:
             object_create_scripts.append(
                 {
@@ -375,7 +371,7 @@ def collect_object_create_scripts():
 
     procs = cursor.fetchall()
     for proc in procs:
-        proc_def = get_object_definition(proc.proc_name, "PROCEDURE")
+        proc_def = get_object_definition(cursor, proc.proc_name, "PROCEDURE")
         if proc_def:
             object_create_scripts.append(
                 {"name": proc.proc_name, "type": "PROCEDURE", "definition": proc_def}
@@ -397,7 +393,7 @@ def collect_object_create_scripts():
 
     triggers = cursor.fetchall()
     for trigger in triggers:
-        trigger_def = get_object_definition(trigger.trigger_name, "TRIGGER")
+        trigger_def = get_object_definition(cursor, trigger.trigger_name, "TRIGGER")
         if trigger_def:
             object_create_scripts.append(
                 {
@@ -407,25 +403,7 @@ def collect_object_create_scripts():
                 }
             )
 
-
-connection_string = os.getenv("CONNECTION_STRING")
-
-connection = pyodbc.connect(connection_string)
-cursor = connection.cursor()
-
-# Get all stored procedures
-cursor.execute(
-    """
-SELECT 
-    s.name + '.' + p.name AS name
-FROM sys.procedures p
-JOIN sys.schemas s ON p.schema_id = s.schema_id
-WHERE s.name NOT LIKE '%tSQLt%' 
-  AND p.name NOT LIKE '%tSQLt%'
-ORDER BY s.name, p.name;
-"""
-)
-procedures = cursor.fetchall()
+    return object_create_scripts
 
 
 def discover_dependencies(connection_string, project_name):
@@ -447,6 +425,7 @@ def discover_dependencies(connection_string, project_name):
     )
     procedures = cursor.fetchall()
 
+    procedure_dependencies = []
     for procedure in procedures:
         procedure_name = (
             procedure.name.split(".")[1] if "." in procedure.name else procedure.name
@@ -604,7 +583,7 @@ def discover_dependencies(connection_string, project_name):
         )
 
     # Collect all object create scripts
-    collect_object_create_scripts()
+    object_create_scripts = collect_object_create_scripts(cursor)
 
     # Save procedures to JSON file
     os.makedirs(f"app/output/{project_name}/data", exist_ok=True)
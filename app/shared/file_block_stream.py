@@ -0,0 +1,170 @@
+import os
+import re
+import json
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Set LLM_STREAMING=false to only receive the final response of each agent call
+LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() in ("1", "true", "yes")
+
+# Follow-up requests for files that are missing or invalid in a response (0 disables)
+FILE_REPAIR_ATTEMPTS = int(os.getenv("FILE_REPAIR_ATTEMPTS", "1"))
+
+# FILE: <path> followed by a ```json fenced block (groups: path, content)
+JSON_FILE_BLOCK_PATTERN = r"FILE: (.*?)\n```json\n(.*?)```"
+
+
+def get_run_config():
+    """Run config that makes the runner yield partial (streamed) events"""
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+
+    if not LLM_STREAMING:
+        return RunConfig()
+    return RunConfig(streaming_mode=StreamingMode.SSE)
+
+
+class FileBlockStream:
+    """
+    Incremental parser for FILE blocks in agent responses.
+
+    Partial response text is fed as it streams in and every FILE block is
+    handed to save_file as soon as its closing fence arrived, so finished
+    artifacts are on disk before the whole response is complete. Blocks
+    that are not valid JSON are never saved, get_broken_files reports them.
+    """
+
+    def __init__(self, save_file, pattern=JSON_FILE_BLOCK_PATTERN, validate_json=True):
+        """
+        Args:
+            save_file: Called as save_file(file_path, file_content) for every
+                       complete block, returns the saved name (None on failure)
+            pattern: Regex with the path and the content as groups
+            validate_json: Skip and report blocks whose content is not valid JSON
+        """
+        self.save_file = save_file
+        self.pattern = re.compile(pattern, re.DOTALL)
+        self.validate_json = validate_json
+        self.buffer = ""
+        self.saved_files = []
+        self.invalid_files = []
+        self.errors = {}
+        self._consumed = 0
+        self._written = {}
+        self._lock = threading.Lock()
+
+    def feed(self, text):
+        """Add streamed text and save every block completed by it"""
+        if not text:
+            return []
+        with self._lock:
+            self.buffer += text
+            saved = []
+            for match in self.pattern.finditer(self.buffer, self._consumed):
+                self._consumed = match.end()
+                name = self._save_block(match.group(1), match.group(2))
+                if name:
+                    saved.append(name)
+            return saved
+
+    def feed_event(self, event):
+        """Feed the text of a partial runner event (final events are handled by finish)"""
+        if not getattr(event, "partial", False):
+            return []
+        if not event.content or not event.content.parts:
+            return []
+        return self.feed(
+            "".join(part.text for part in event.content.parts if part.text)
+        )
+
+    def finish(self, final_text=None):
+        """
+        Save the blocks of the final response that were not streamed, and
+        report a block that was opened but never closed.
+
+        Args:
+            final_text: Complete response text (may be None when nothing arrived)
+
+        Returns:
+            list: Names of all saved files, in completion order
+        """
+        with self._lock:
+            text = final_text if final_text else self.buffer
+            consumed = 0
+            for match in self.pattern.finditer(text):
+                consumed = match.end()
+                self._save_block(match.group(1), match.group(2))
+
+            unterminated = re.search(r"FILE:\s*(\S+)", text[consumed:])
+            if unterminated:
+                print(
+                    f"  ⚠️ Incomplete FILE block for {unterminated.group(1)} (no closing fence), not saved"
+                )
+            return list(self.saved_files)
+
+    def _save_block(self, file_path, file_content):
+        file_path = file_path.strip()
+        file_content = file_content.strip()
+        if not file_path or not file_content:
+            return None
+
+        # Blocks already written while streaming are not written twice
+        if self._written.get(file_path) == file_content:
+            return None
+
+        if self.validate_json:
+            try:
+                json.loads(file_content)
+            except json.JSONDecodeError as e:
+                # The file of an earlier run is kept instead of being overwritten
+                print(f"  ⚠️ {file_path} is not valid JSON ({str(e)}), not saved")
+                if file_path not in self.invalid_files:
+                    self.invalid_files.append(file_path)
+                self.errors[file_path] = str(e)
+                return None
+            else:
+                # A later valid block replaces an invalid one
+                if file_path in self.invalid_files:
+                    self.invalid_files.remove(file_path)
+                self.errors.pop(file_path, None)
+
+        try:
+            name = self.save_file(file_path, file_content)
+        except Exception as e:
+            print(f"  ❌ Error saving {file_path}: {str(e)}")
+            return None
+
+        self._written[file_path] = file_content
+        if name and name not in self.saved_files:
+            self.saved_files.append(name)
+            print(f"  ✅ [{len(self.saved_files)}] {name} written")
+        return name
+
+    def get_broken_files(self, expected_files):
+        """
+        Check the expected files against the saved blocks.
+
+        Args:
+            expected_files: File names the response should contain, either
+                            plain (business_rules.json) or namespaced
+                            (<procedure>/business_rules.json)
+
+        Returns:
+            dict: File name to the reason it has to be requested again
+        """
+        broken = {}
+        for name in expected_files:
+            invalid = [path for path in self.invalid_files if match_file_name(path, name)]
+            if invalid:
+                reason = self.errors.get(invalid[0], "invalid JSON")
+                broken[name] = f"not valid JSON ({reason})"
+            elif not any(match_file_name(saved, name) for saved in self.saved_files):
+                broken[name] = "missing from the response"
+        return broken
+
+
+def match_file_name(path, name):
+    """Check if a FILE block path is the expected file (leading folders are ignored)"""
+    path = path.strip().replace("\\", "/")
+    return path == name or path.endswith("/" + name)
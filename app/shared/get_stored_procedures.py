@@ -3,10 +3,19 @@ import questionary
 from questionary import Choice
 import sqlparse
 import os
+import fnmatch
 
 
-def extract_stored_procedures(project_path, connection_string):
-    """Extract stored procedures from the database."""
+def extract_stored_procedures(project_path, connection_string, procedure_patterns=None):
+    """
+    Extract stored procedures from the database.
+
+    Args:
+        project_path: Project path
+        connection_string: Database connection string
+        procedure_patterns: Optional list of name patterns (e.g. ["dbo.*"]). When
+                            given, matching procedures are extracted without prompting
+    """
     try:
         # Connect to the database
         connection = pyodbc.connect(connection_string)
@@ -34,6 +43,17 @@ def extract_stored_procedures(project_path, connection_string):
 
         stored_procedures = [procedure.name for procedure in procedures]
 
+        if procedure_patterns is not None:
+            selected = [
+                proc
+                for proc in stored_procedures
+                if any(
+                    fnmatch.fnmatch(proc.lower(), pattern.lower())
+                    for pattern in procedure_patterns
+                )
+            ]
+            return save_stored_procedures(connection, cursor, project_path, selected)
+
         # Create choices with SELECT ALL option at the top
         procedure_choices = [Choice(title="SELECT ALL", value="SELECT_ALL")] + [
             Choice(title=proc, value=proc) for proc in stored_procedures
@@ -56,6 +76,23 @@ def extract_stored_procedures(project_path, connection_string):
         else:
             selected_procedures = selected
 
+        return save_stored_procedures(
+            connection, cursor, project_path, selected_procedures
+        )
+
+    except Exception as e:
+        print(f"Error during stored procedure extraction: {str(e)}")
+        return
+
+
+def save_stored_procedures(connection, cursor, project_path, selected_procedures):
+    """Save the definitions of the selected procedures to the sql_raw folder."""
+    try:
+        if not selected_procedures:
+            print("No procedures selected. Exiting extraction process.")
+            connection.close()
+            return []
+
         print(f"Selected {len(selected_procedures)} procedures for extraction.")
 
         # Create directories for storing extracted procedures
@@ -108,6 +145,7 @@ def extract_stored_procedures(project_path, connection_string):
         print(
             f"Extraction completed for all {len(selected_procedures)} selected procedures."
         )
+        return selected_procedures
 
     except Exception as e:
         print(f"Error during stored procedure extraction: {str(e)}")
@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cache location and eviction limits (overridable from .env)
+CACHE_DIR = os.getenv(
+    "LLM_CACHE_DIR",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".llm_cache"
+    ),
+)
+MAX_AGE_DAYS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30"))
+MAX_SIZE_MB = float(os.getenv("LLM_CACHE_MAX_SIZE_MB", "500"))
+
+# Number of writes between two eviction passes
+PRUNE_INTERVAL = 50
+
+_bypass = os.getenv("LLM_CACHE_BYPASS", "false").lower() in ("1", "true", "yes")
+_lock = threading.Lock()
+_writes_since_prune = PRUNE_INTERVAL
+
+
+def set_cache_bypass(bypass):
+    """Skip cache lookups for the rest of this run (fresh responses are still stored)"""
+    global _bypass
+    _bypass = bool(bypass)
+
+
+def is_cache_bypassed():
+    """Return True when cache lookups are disabled for this run"""
+    return _bypass
+
+
+def _to_jsonable(value):
+    """Convert pydantic/genai objects into plain JSON-serialisable data"""
+    if value is None:
+        return None
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(item) for item in value]
+    return value
+
+
+def hash_prompt(llm_request):
+    """
+    Hash everything in the request that influences the model output.
+
+    Args:
+        llm_request: ADK LlmRequest about to be sent to the model
+
+    Returns:
+        str: SHA-256 hex digest of the system instruction, tools and contents
+    """
+    config = llm_request.config
+    payload = {
+        "system_instruction": _to_jsonable(
+            getattr(config, "system_instruction", None) if config else None
+        ),
+        "tools": sorted(getattr(llm_request, "tools_dict", {}).keys()),
+        "contents": _to_jsonable(llm_request.contents),
+    }
+    serialized = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def build_cache_key(agent_name, model, llm_request):
+    """Build the cache key from the agent name, the model id and the prompt hash"""
+    raw_key = f"{agent_name}|{model}|{hash_prompt(llm_request)}"
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def get_cached_response(key):
+    """
+    Load a cached model response.
+
+    Args:
+        key: Cache key built with build_cache_key
+
+    Returns:
+        LlmResponse or None when there is no fresh entry (or the cache is bypassed)
+    """
+    if _bypass:
+        return None
+
+    path = _entry_path(key)
+    try:
+        with open(path, "r") as f:
+            entry = json.load(f)
+        created_at = entry.get("created_at") or os.path.getmtime(path)
+    except (json.JSONDecodeError, OSError):
+        return None
+
+    # Expired entries are treated as misses and removed, however often they were hit
+    if time.time() - created_at > MAX_AGE_DAYS * 86400:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+    from google.adk.models.llm_response import LlmResponse
+
+    try:
+        response = LlmResponse.model_validate(entry["response"])
+    except Exception as e:
+        print(f"Warning: Ignoring unreadable cache entry {key}: {str(e)}")
+        return None
+
+    # Record the hit in the access time only, so size-based eviction drops least
+    # recently used entries first while the modification time keeps the write time
+    try:
+        os.utime(path, (time.time(), os.path.getmtime(path)))
+    except OSError:
+        pass
+
+    return response
+
+
+def is_cacheable(llm_response):
+    """Only complete, successful text responses are stored"""
+    if llm_response is None or llm_response.partial or llm_response.error_code:
+        return False
+    content = llm_response.content
+    if not content or not content.parts:
+        return False
+    # Tool calls have side effects and must always reach the model
+    if any(getattr(part, "function_call", None) for part in content.parts):
+        return False
+    return any(getattr(part, "text", None) for part in content.parts)
+
+
+def store_response(key, agent_name, model, llm_response):
+    """
+    Store a model response on disk.
+
+    Args:
+        key: Cache key built with build_cache_key
+        agent_name: Name of the agent that produced the response
+        model: Model id the response was generated with
+        llm_response: ADK LlmResponse returned by the model
+
+    Returns:
+        bool: True if the response was written to the cache
+    """
+    global _writes_since_prune
+
+    if not is_cacheable(llm_response):
+        return False
+
+    entry = {
+        "agent": agent_name,
+        "model": model,
+        "created_at": time.time(),
+        "response": _to_jsonable(llm_response),
+    }
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = _entry_path(key)
+        # Write to a temporary file first so concurrent readers never see partial JSON
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not write LLM cache entry: {str(e)}")
+        return False
+
+    with _lock:
+        _writes_since_prune += 1
+        should_prune = _writes_since_prune >= PRUNE_INTERVAL
+        if should_prune:
+            _writes_since_prune = 0
+
+    if should_prune:
+        prune_cache()
+
+    return True
+
+
+def prune_cache():
+    """
+    Evict expired entries (by write time), then the least recently used entries
+    (by access time) until the cache fits into MAX_SIZE_MB.
+
+    Returns:
+        int: Number of removed entries
+    """
+    if not os.path.exists(CACHE_DIR):
+        return 0
+
+    now = time.time()
+    max_age_seconds = MAX_AGE_DAYS * 86400
+    max_size_bytes = MAX_SIZE_MB * 1024 * 1024
+
+    entries = []
+    removed = 0
+    for filename in os.listdir(CACHE_DIR):
+        if not filename.endswith(".json"):
+            continue
+        path = os.path.join(CACHE_DIR, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+
+        if now - stat.st_mtime > max_age_seconds:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+            continue
+
+        entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_size_bytes:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+            total_size -= size
+        except OSError:
+            pass
+
+    return removed
+
+
+def clear_cache():
+    """Remove every cached response"""
+    if not os.path.exists(CACHE_DIR):
+        return 0
+
+    removed = 0
+    for filename in os.listdir(CACHE_DIR):
+        try:
+            os.remove(os.path.join(CACHE_DIR, filename))
+            removed += 1
+        except OSError:
+            pass
+    return removed
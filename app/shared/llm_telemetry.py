@@ -0,0 +1,442 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from datetime import datetime
+from litellm.integrations.custom_logger import CustomLogger
+
+# Identifier shared by every call made during this process
+RUN_ID = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+METRICS_DIR = "metrics"
+CALLS_FILE = "llm_calls.jsonl"
+
+# Call record of the model request running in the current task. LiteLLM runs
+# its async callbacks in tasks created from this context, so they see it too.
+_current_call = contextvars.ContextVar("llm_telemetry_current_call", default=None)
+
+_calls_in_flight = {}
+_run_records = []
+_lock = threading.Lock()
+_litellm_logger = None
+
+
+class LiteLlmTelemetryLogger(CustomLogger):
+    """LiteLLM callback that fills token, cost, TTFT and retry data into the current call record"""
+
+    async def async_log_success_event(self, kwargs, response_obj, start_time, end_time):
+        _apply_litellm_success(kwargs, response_obj, start_time, end_time)
+
+    async def async_log_failure_event(self, kwargs, response_obj, start_time, end_time):
+        _apply_litellm_failure(kwargs)
+
+    def log_success_event(self, kwargs, response_obj, start_time, end_time):
+        _apply_litellm_success(kwargs, response_obj, start_time, end_time)
+
+    def log_failure_event(self, kwargs, response_obj, start_time, end_time):
+        _apply_litellm_failure(kwargs)
+
+
+def register_litellm_callback():
+    """Register the telemetry logger with LiteLLM (only once per process)"""
+    global _litellm_logger
+    import litellm
+
+    with _lock:
+        if _litellm_logger is None:
+            _litellm_logger = LiteLlmTelemetryLogger()
+            litellm.callbacks.append(_litellm_logger)
+    return _litellm_logger
+
+
+def _new_record(callback_context, model, routing=None):
+    state = callback_context.state
+    routing = routing or {}
+    return {
+        "run_id": RUN_ID,
+        "call_id": str(uuid.uuid4()),
+        "timestamp": datetime.now().isoformat(),
+        "agent": callback_context.agent_name,
+        "procedure": state.get("procedure") or "unknown",
+        "model": model,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "prompt_cache_read_tokens": 0,
+        "prompt_cache_write_tokens": 0,
+        "time_to_first_token": None,
+        "latency": 0.0,
+        "retries": 0,
+        "cost": None,
+        "cached": False,
+        "complexity_tier": routing.get("complexity_tier"),
+        "complexity_score": routing.get("complexity_score"),
+        "routing_thresholds": routing.get("thresholds"),
+        "_project_path": state.get("project_path"),
+        "_procedures": state.get("procedures"),
+        "_started": time.perf_counter(),
+        "_failed_attempts": set(),
+    }
+
+
+def start_call(callback_context, model, routing=None):
+    """Open a call record before the request is sent to the model"""
+    record = _new_record(callback_context, model, routing)
+    _current_call.set(record)
+    with _lock:
+        _calls_in_flight[callback_context.invocation_id] = record
+    return record
+
+
+def finish_call(callback_context, llm_response):
+    """Close the call record once the model response arrived and persist it"""
+    if llm_response.partial:
+        return None
+
+    with _lock:
+        record = _calls_in_flight.pop(callback_context.invocation_id, None)
+    if record is None:
+        return None
+
+    record["latency"] = round(time.perf_counter() - record["_started"], 3)
+
+    # ADK copies LiteLLM's usage block into usage_metadata
+    usage = llm_response.usage_metadata
+    if usage:
+        record["prompt_tokens"] = (
+            record["prompt_tokens"] or usage.prompt_token_count or 0
+        )
+        record["completion_tokens"] = (
+            record["completion_tokens"] or usage.candidates_token_count or 0
+        )
+        record["prompt_cache_read_tokens"] = (
+            record["prompt_cache_read_tokens"]
+            or getattr(usage, "cached_content_token_count", None)
+            or 0
+        )
+
+    # Without streaming the first token arrives together with the full response
+    if record["time_to_first_token"] is None:
+        record["time_to_first_token"] = record["latency"]
+
+    if record["cost"] is None:
+        record["cost"] = estimate_cost(
+            record["model"], record["prompt_tokens"], record["completion_tokens"]
+        )
+
+    _current_call.set(None)
+    _save_record(record)
+    return record
+
+
+def record_cached_call(callback_context, model, routing=None):
+    """Record a call that was answered from the response cache"""
+    record = _new_record(callback_context, model, routing)
+    record["cached"] = True
+    record["cost"] = 0.0
+    record["time_to_first_token"] = 0.0
+    _save_record(record)
+    return record
+
+
+def _apply_litellm_success(kwargs, response_obj, start_time, end_time):
+    record = _current_call.get()
+    if record is None:
+        return
+
+    usage = getattr(response_obj, "usage", None)
+    if usage:
+        record["prompt_tokens"] = getattr(usage, "prompt_tokens", 0) or 0
+        record["completion_tokens"] = getattr(usage, "completion_tokens", 0) or 0
+        record["prompt_cache_read_tokens"], record["prompt_cache_write_tokens"] = (
+            get_prompt_cache_usage(usage)
+        )
+
+    completion_start_time = kwargs.get("completion_start_time")
+    if completion_start_time and start_time:
+        record["time_to_first_token"] = round(
+            (completion_start_time - start_time).total_seconds(), 3
+        )
+
+    response_cost = kwargs.get("response_cost")
+    if response_cost is not None:
+        record["cost"] = response_cost
+
+
+def get_prompt_cache_usage(usage):
+    """
+    Read the provider-side prompt cache usage from a LiteLLM usage block.
+
+    Returns:
+        tuple: (prompt tokens read from the cache, prompt tokens written to it)
+    """
+    # LiteLLM reports cache reads OpenAI-style for every provider
+    details = getattr(usage, "prompt_tokens_details", None)
+    read_tokens = getattr(details, "cached_tokens", None) if details else None
+    if not read_tokens:
+        read_tokens = getattr(usage, "cache_read_input_tokens", None)
+    write_tokens = getattr(usage, "cache_creation_input_tokens", None)
+    return read_tokens or 0, write_tokens or 0
+
+
+def _apply_litellm_failure(kwargs):
+    record = _current_call.get()
+    if record is None:
+        return
+
+    # LiteLLM may report the same failed attempt through several hooks
+    attempt_id = kwargs.get("litellm_call_id") or id(kwargs)
+    if attempt_id not in record["_failed_attempts"]:
+        record["_failed_attempts"].add(attempt_id)
+        record["retries"] = len(record["_failed_attempts"])
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """Estimate the USD cost of a call from LiteLLM's model price map"""
+    try:
+        import litellm
+
+        prompt_cost, completion_cost = litellm.cost_per_token(
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+        )
+        return round(prompt_cost + completion_cost, 6)
+    except Exception:
+        # Unknown models (e.g. custom deployments) have no price entry
+        return 0.0
+
+
+def get_metrics_file(project_path):
+    """Get the path of the project's append-only call metrics file"""
+    return os.path.join(project_path, METRICS_DIR, CALLS_FILE)
+
+
+def split_batch_record(record, procedures):
+    """
+    Split the record of a call made for a batch of procedures into one
+    record per procedure. Tokens, cost and latency are divided evenly, all
+    parts keep the call_id so the call is still counted once.
+
+    Returns:
+        list: One record per procedure
+    """
+    count = len(procedures)
+    records = []
+    for index, procedure in enumerate(procedures):
+        part = {**record, "procedure": procedure, "batch_size": count}
+        for field in (
+            "prompt_tokens",
+            "completion_tokens",
+            "prompt_cache_read_tokens",
+            "prompt_cache_write_tokens",
+        ):
+            total = record.get(field) or 0
+            # The first procedures take the remainder, so the parts add up
+            part[field] = total // count + (1 if index < total % count else 0)
+        for field in ("cost", "latency"):
+            if record.get(field) is not None:
+                part[field] = round(record[field] / count, 6)
+        records.append(part)
+    return records
+
+
+def _save_record(record):
+    project_path = record.get("_project_path")
+    procedures = record.get("_procedures")
+    clean_record = {k: v for k, v in record.items() if not k.startswith("_")}
+    clean_records = (
+        split_batch_record(clean_record, procedures) if procedures else [clean_record]
+    )
+
+    with _lock:
+        _run_records.extend(clean_records)
+
+        if project_path:
+            metrics_file = get_metrics_file(project_path)
+            try:
+                os.makedirs(os.path.dirname(metrics_file), exist_ok=True)
+                with open(metrics_file, "a") as f:
+                    for clean_record in clean_records:
+                        f.write(json.dumps(clean_record) + "\n")
+            except OSError as e:
+                print(f"Warning: Could not write LLM metrics: {str(e)}")
+
+
+def load_run_records(project_path=None, run_id=RUN_ID):
+    """
+    Load the call records of a run.
+
+    Args:
+        project_path: Project path. When None, only the calls made by this process are returned
+        run_id: Run identifier (defaults to the current run)
+
+    Returns:
+        list: Call records
+    """
+    if project_path is None:
+        with _lock:
+            return [r for r in _run_records if r["run_id"] == run_id]
+
+    records = []
+    metrics_file = get_metrics_file(project_path)
+    if os.path.exists(metrics_file):
+        with open(metrics_file, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("run_id") == run_id:
+                    records.append(record)
+    return records
+
+
+def summarize_records(records, group_by=("agent", "procedure")):
+    """
+    Aggregate call records. The per-procedure parts of a batched call are
+    counted as one call in every group they fall in.
+
+    Args:
+        records: Call records
+        group_by: Record fields to group on
+
+    Returns:
+        list: One summary row per group, sorted by cost then tokens
+    """
+    groups = {}
+    for record in records:
+        key = tuple(record.get(field) for field in group_by)
+        row = groups.setdefault(
+            key,
+            {
+                **dict(zip(group_by, key)),
+                "calls": 0,
+                "cached_calls": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "prompt_cache_read_tokens": 0,
+                "prompt_cache_write_tokens": 0,
+                "retries": 0,
+                "cost": 0.0,
+                "latency": 0.0,
+                "_ttft_total": 0.0,
+                "_call_ids": set(),
+            },
+        )
+        call_id = record.get("call_id")
+        first_part = call_id is None or call_id not in row["_call_ids"]
+        row["_call_ids"].add(call_id)
+        if first_part:
+            row["calls"] += 1
+            row["retries"] += record.get("retries") or 0
+            if not record.get("cached"):
+                row["_ttft_total"] += record.get("time_to_first_token") or 0.0
+        if record.get("cached"):
+            row["cached_calls"] += 1 if first_part else 0
+            continue
+        row["prompt_tokens"] += record.get("prompt_tokens") or 0
+        row["completion_tokens"] += record.get("completion_tokens") or 0
+        row["prompt_cache_read_tokens"] += record.get("prompt_cache_read_tokens") or 0
+        row["prompt_cache_write_tokens"] += (
+            record.get("prompt_cache_write_tokens") or 0
+        )
+        row["cost"] += record.get("cost") or 0.0
+        row["latency"] += record.get("latency") or 0.0
+
+    rows = []
+    for row in groups.values():
+        row.pop("_call_ids")
+        model_calls = row["calls"] - row["cached_calls"]
+        row["avg_time_to_first_token"] = (
+            round(row.pop("_ttft_total") / model_calls, 3) if model_calls else 0.0
+        )
+        # Share of the prompt tokens that the provider served from its prefix cache
+        row["prompt_cache_hit_rate"] = (
+            round(row["prompt_cache_read_tokens"] / row["prompt_tokens"], 3)
+            if row["prompt_tokens"]
+            else 0.0
+        )
+        row["latency"] = round(row["latency"], 3)
+        row["cost"] = round(row["cost"], 6)
+        rows.append(row)
+
+    return sorted(
+        rows, key=lambda r: (r["cost"], r["prompt_tokens"] + r["completion_tokens"])
+    )[::-1]
+
+
+def summarize_routing(records):
+    """List the model chosen for every agent/procedure with the complexity behind it"""
+    routing = {}
+    for record in records:
+        if record.get("complexity_tier") is None:
+            continue
+        key = (record.get("agent"), record.get("procedure"))
+        routing[key] = {
+            "agent": record.get("agent"),
+            "procedure": record.get("procedure"),
+            "model": record.get("model"),
+            "complexity_tier": record.get("complexity_tier"),
+            "complexity_score": record.get("complexity_score"),
+            "thresholds": record.get("routing_thresholds"),
+        }
+    return sorted(routing.values(), key=lambda r: (r["agent"], r["procedure"]))
+
+
+def write_run_summary(project_path, run_id=RUN_ID):
+    """Write the aggregated metrics of a run next to the call metrics file"""
+    records = load_run_records(project_path, run_id)
+    if not records:
+        return None
+
+    summary = {
+        "run_id": run_id,
+        "generated_at": datetime.now().isoformat(),
+        "by_agent_procedure": summarize_records(records, ("agent", "procedure")),
+        "by_agent": summarize_records(records, ("agent",)),
+        "totals": summarize_records(records, ("run_id",))[0],
+        "model_routing": summarize_routing(records),
+    }
+
+    summary_path = os.path.join(
+        project_path, METRICS_DIR, f"run_{run_id}_summary.json"
+    )
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=4)
+    return summary_path
+
+
+def print_run_summary(project_path=None, run_id=RUN_ID):
+    """Print a per agent/procedure usage table for the run"""
+    records = load_run_records(project_path, run_id)
+    if not records:
+        print("No LLM calls recorded in this run.")
+        return
+
+    rows = summarize_records(records, ("agent", "procedure"))
+    totals = summarize_records(records, ("run_id",))[0]
+
+    header = f"{'Agent':<32} {'Procedure':<40} {'Calls':>6} {'Cached':>6} {'Prompt':>9} {'Output':>9} {'Cache%':>6} {'Retry':>5} {'TTFT s':>7} {'Time s':>8} {'Cost $':>9}"
+    print(f"\n=== LLM usage for run {run_id} ===")
+    print(header)
+    print("-" * len(header))
+    for row in rows + [{**totals, "agent": "TOTAL", "procedure": ""}]:
+        if row["agent"] == "TOTAL":
+            print("-" * len(header))
+        print(
+            f"{str(row['agent'])[:32]:<32} {str(row['procedure'])[:40]:<40} "
+            f"{row['calls']:>6} {row['cached_calls']:>6} {row['prompt_tokens']:>9} "
+            f"{row['completion_tokens']:>9} {row['prompt_cache_hit_rate'] * 100:>6.1f} {row['retries']:>5} "
+            f"{row['avg_time_to_first_token']:>7.2f} {row['latency']:>8.1f} {row['cost']:>9.4f}"
+        )
+
+    routing_counts = {}
+    for row in summarize_routing(records):
+        key = (row["agent"], row["complexity_tier"], row["model"])
+        routing_counts[key] = routing_counts.get(key, 0) + 1
+    if routing_counts:
+        print("\nModel routing (procedures per complexity tier):")
+        for (agent, tier, model), count in sorted(routing_counts.items()):
+            print(f"  {str(agent)[:32]:<32} {tier:<9} {count:>5} -> {model}")
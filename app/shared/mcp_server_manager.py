@@ -0,0 +1,169 @@
+import atexit
+import asyncio
+import threading
+from contextlib import AsyncExitStack
+from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
+
+MCP_FILESYSTEM_SERVER = "@modelcontextprotocol/server-filesystem"
+
+# Seconds to wait for the servers to close when the process exits
+MCP_SHUTDOWN_TIMEOUT = 10
+
+_loop = None
+_loop_lock = threading.Lock()
+_servers = {}
+
+
+class MCPServer:
+    """
+    Long-lived MCP filesystem server for one root folder. The connection is
+    opened and closed by a single task on the manager's event loop, the
+    stdio transport does not allow closing it from another task.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.tools = None
+        self.starts = 0
+        self.lock = asyncio.Lock()
+        self._stop = None
+        self._task = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        ready = asyncio.get_running_loop().create_future()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._serve(ready))
+        self.tools = await ready
+        self.starts += 1
+
+    async def _serve(self, ready):
+        try:
+            async with AsyncExitStack() as exit_stack:
+                tools, _ = await MCPToolset.from_server(
+                    connection_params=StdioServerParameters(
+                        command="npx",
+                        args=["-y", MCP_FILESYSTEM_SERVER, self.root],
+                    ),
+                    async_exit_stack=exit_stack,
+                )
+                ready.set_result(tools)
+                await self._stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                print(f"⚠️ MCP server for {self.root} stopped: {str(e)}")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stop.set()
+        try:
+            await self._task
+        except Exception:
+            pass
+        self._task = None
+        self.tools = None
+
+
+def _get_loop():
+    """Get the event loop the MCP servers live on, started on first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="mcp-servers", daemon=True
+            ).start()
+            atexit.register(shutdown_mcp_servers)
+        return _loop
+
+
+async def get_mcp_tools(root):
+    """
+    Get the tools of the MCP filesystem server for a root folder. The server
+    is started on first use and again when it died, otherwise every caller
+    shares the running server. Must run on the manager's loop
+    (see run_with_mcp_servers).
+
+    Returns:
+        list: MCP tools for an ADK agent
+    """
+    server = _servers.get(root)
+    if server is None:
+        server = _servers[root] = MCPServer(root)
+    async with server.lock:
+        if not server.running:
+            action = "Restarting" if server.starts else "Starting"
+            print(f"🔧 {action} MCP filesystem server for {root}...")
+            await server.start()
+            print(f"Fetched {len(server.tools)} tools from MCP server.")
+        return server.tools
+
+
+async def restart_mcp_server(root, failed_tools=None):
+    """
+    Stop the server of a root folder (e.g. after a failure) and start it again.
+
+    Args:
+        root: Root folder of the server
+        failed_tools: Tools of the connection that failed, when another run
+                      sharing the server already replaced them it is kept
+    """
+    server = _servers.get(root)
+    if server is not None:
+        async with server.lock:
+            if failed_tools is None or server.tools is failed_tools:
+                await server.stop()
+    return await get_mcp_tools(root)
+
+
+def is_mcp_connection_error(error):
+    """Check if an error means the MCP server process or its pipes are gone"""
+    import anyio
+
+    if isinstance(
+        error,
+        (
+            anyio.ClosedResourceError,
+            anyio.BrokenResourceError,
+            anyio.EndOfStream,
+            ConnectionError,
+            EOFError,
+        ),
+    ):
+        return True
+    return "connection closed" in str(error).lower()
+
+
+def run_with_mcp_servers(coroutine):
+    """
+    Run a coroutine on the loop that owns the MCP servers, so the agents it
+    creates can use their tools, and wait for its result.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_loop()).result()
+
+
+def shutdown_mcp_servers():
+    """Close all MCP servers and stop their event loop (registered with atexit)"""
+    global _loop
+    if _loop is None:
+        return
+
+    async def stop_all():
+        for server in list(_servers.values()):
+            await server.stop()
+        _servers.clear()
+
+    try:
+        asyncio.run_coroutine_threadsafe(stop_all(), _loop).result(
+            timeout=MCP_SHUTDOWN_TIMEOUT
+        )
+    except Exception as e:
+        print(f"⚠️ Could not close the MCP servers: {str(e)}")
+    _loop.call_soon_threadsafe(_loop.stop)
+    _loop = None
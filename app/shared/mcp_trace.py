@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+TRACE_DIR = os.path.join("metrics", "mcp_traces")
+
+# Tools of the MCP filesystem server, their time counts as filesystem time
+FILESYSTEM_TOOLS = {
+    "read_file",
+    "read_text_file",
+    "read_media_file",
+    "read_multiple_files",
+    "write_file",
+    "edit_file",
+    "create_directory",
+    "list_directory",
+    "list_directory_with_sizes",
+    "directory_tree",
+    "move_file",
+    "search_files",
+    "get_file_info",
+    "list_allowed_directories",
+}
+
+# Tools that change files, with the argument holding the changed path
+WRITE_TOOLS = {
+    "write_file": "path",
+    "edit_file": "path",
+    "move_file": "destination",
+    "create_directory": "path",
+}
+
+# Longest argument value kept in the trace, the full size is recorded apart
+MAX_ARGUMENT_LENGTH = 200
+
+
+def _get_size(value):
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+
+def _shorten(value):
+    if isinstance(value, str) and len(value) > MAX_ARGUMENT_LENGTH:
+        return f"{value[:MAX_ARGUMENT_LENGTH]}... ({len(value)} chars)"
+    if isinstance(value, dict):
+        return {key: _shorten(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shorten(item) for item in value]
+    return value
+
+
+class MCPRunTrace:
+    """
+    Structured trace of one MCP executor run: model turns, tool calls with
+    arguments, sizes and durations, file writes and token usage, appended to
+    metrics/mcp_traces/<procedure>_<timestamp>.jsonl. Its callbacks are
+    passed to the agent.
+    """
+
+    def __init__(self, project_path, procedure):
+        self.procedure = procedure
+        self.path = os.path.join(
+            project_path,
+            TRACE_DIR,
+            f"{procedure}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl",
+        )
+        self.started = time.perf_counter()
+        self.attempt = 1
+        self.turns = 0
+        self.events = 0
+        self.model_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tools = {}
+        self.file_writes = []
+        self._model_started = None
+        self._tools_started = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._write({"type": "run_start", "procedure": procedure})
+
+    def _write(self, record):
+        record = {
+            "t": round(time.perf_counter() - self.started, 3),
+            "attempt": self.attempt,
+            **record,
+        }
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            try:
+                with open(self.path, "a") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                print(f"Warning: Could not write the MCP trace: {str(e)}")
+
+    def retry(self):
+        """Mark the start of another attempt (the same procedure run again)"""
+        self.attempt += 1
+        self._write({"type": "retry"})
+
+    def before_model(self, callback_context, llm_request):
+        self._model_started = time.perf_counter()
+        return None
+
+    def after_model(self, callback_context, llm_response):
+        if llm_response.partial or self._model_started is None:
+            return None
+        duration = time.perf_counter() - self._model_started
+        self._model_started = None
+        self.turns += 1
+        self.model_seconds += duration
+
+        prompt_tokens = completion_tokens = 0
+        usage = llm_response.usage_metadata
+        if usage:
+            prompt_tokens = usage.prompt_token_count or 0
+            completion_tokens = usage.candidates_token_count or 0
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+
+        parts = llm_response.content.parts if llm_response.content else None
+        tool_calls = [p.function_call.name for p in parts or [] if p.function_call]
+        text_chars = sum(len(p.text) for p in parts or [] if p.text)
+        self._write(
+            {
+                "type": "model_turn",
+                "turn": self.turns,
+                "duration": round(duration, 3),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "tool_calls": tool_calls,
+                "text_chars": text_chars,
+            }
+        )
+        print(
+            f"🤖 Turn {self.turns}: {duration:.1f}s, {prompt_tokens}+{completion_tokens} tokens"
+            + (f", calls {', '.join(tool_calls)}" if tool_calls else "")
+        )
+        return None
+
+    def _tool_key(self, tool, tool_context):
+        return getattr(tool_context, "function_call_id", None) or tool.name
+
+    def before_tool(self, tool, args, tool_context):
+        self._tools_started[self._tool_key(tool, tool_context)] = time.perf_counter()
+        return None
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        started = self._tools_started.pop(self._tool_key(tool, tool_context), None)
+        duration = time.perf_counter() - started if started else 0.0
+        result_bytes = _get_size(tool_response)
+        error = getattr(tool_response, "isError", None) or (
+            isinstance(tool_response, dict) and bool(tool_response.get("error"))
+        )
+
+        totals = self.tools.setdefault(
+            tool.name, {"calls": 0, "seconds": 0.0, "result_bytes": 0}
+        )
+        totals["calls"] += 1
+        totals["seconds"] += duration
+        totals["result_bytes"] += result_bytes
+
+        self._write(
+            {
+                "type": "tool_call",
+                "tool": tool.name,
+                "args": _shorten(args),
+                "args_bytes": _get_size(args),
+                "result_bytes": result_bytes,
+                "duration": round(duration, 3),
+                "error": bool(error),
+            }
+        )
+
+        write_argument = WRITE_TOOLS.get(tool.name)
+        if write_argument and not error and args.get(write_argument):
+            written = {
+                "path": args[write_argument],
+                # write_file sends the content, edit_file a list of edits
+                "bytes": (
+                    len(args["content"])
+                    if args.get("content")
+                    else _get_size(args["edits"]) if args.get("edits") else 0
+                ),
+                "tool": tool.name,
+            }
+            self.file_writes.append(written)
+            self._write({"type": "file_write", **written})
+            print(f"📝 {tool.name} {written['path']} ({duration:.2f}s)")
+        return None
+
+    def record_event(self, event):
+        """Count a runner event, the callbacks record the details"""
+        self.events += 1
+
+    def finish(self, error=None):
+        """
+        Write and print the summary: where the run's time went.
+
+        Returns:
+            dict: Summary record
+        """
+        wall = time.perf_counter() - self.started
+        filesystem_seconds = tool_seconds = 0.0
+        for name, totals in self.tools.items():
+            if name in FILESYSTEM_TOOLS:
+                filesystem_seconds += totals["seconds"]
+            else:
+                tool_seconds += totals["seconds"]
+        summary = {
+            "type": "summary",
+            "procedure": self.procedure,
+            "status": "failed" if error else "ok",
+            "error": str(error) if error else None,
+            "wall_seconds": round(wall, 3),
+            "model_seconds": round(self.model_seconds, 3),
+            "tool_seconds": round(tool_seconds, 3),
+            "filesystem_seconds": round(filesystem_seconds, 3),
+            "other_seconds": round(
+                max(0.0, wall - self.model_seconds - tool_seconds - filesystem_seconds),
+                3,
+            ),
+            "model_turns": self.turns,
+            "events": self.events,
+            "tool_calls": sum(t["calls"] for t in self.tools.values()),
+            "file_writes": len(self.file_writes),
+            "bytes_written": sum(w["bytes"] for w in self.file_writes),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tools": {
+                name: {**t, "seconds": round(t["seconds"], 3)}
+                for name, t in sorted(self.tools.items())
+            },
+        }
+        self._write(summary)
+
+        print(f"\n=== MCP run {self.procedure}: {wall:.1f}s ===")
+        for label, seconds in (
+            ("Model", summary["model_seconds"]),
+            ("Tools", summary["tool_seconds"]),
+            ("Filesystem", summary["filesystem_seconds"]),
+            ("Other", summary["other_seconds"]),
+        ):
+            share = seconds / wall if wall else 0
+            print(f"{label:<12} {seconds:>8.1f}s {share:>6.0%}")
+        print(
+            f"{self.turns} model turns, {summary['tool_calls']} tool calls, "
+            f"{summary['file_writes']} file writes, "
+            f"{self.prompt_tokens}+{self.completion_tokens} tokens"
+        )
+        print(f"Trace saved to {self.path}")
+        return summary
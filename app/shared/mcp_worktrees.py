@@ -0,0 +1,308 @@
+import os
+import sys
+import json
+import shutil
+import asyncio
+import hashlib
+import tempfile
+import subprocess
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# MCP agent runs working at the same time, each on its own working copy
+MCP_CONCURRENCY = int(os.getenv("MCP_CONCURRENCY", "3"))
+
+WORKTREE_DIR = ".worktrees"
+MERGE_REPORT_DIR = "data"
+MERGE_REPORT_FILE = "mcp_merge_report.json"
+
+# Build output is neither compared nor merged
+IGNORED_DIRS = {"bin", "obj", ".git", ".vs"}
+
+# Arguments of the MCP filesystem tools that hold a path or a list of paths
+PATH_ARGUMENTS = ("path", "source", "destination", "paths")
+
+
+def get_file_hash(path):
+    """SHA-256 of a file (None when it does not exist)"""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_tree(root):
+    """Hash every file below root, by path relative to root"""
+    snapshot = {}
+    for current, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
+        for file in files:
+            path = os.path.join(current, file)
+            snapshot[os.path.relpath(path, root)] = get_file_hash(path)
+    return snapshot
+
+
+def get_outside_paths(args, workspace_path):
+    """
+    List the paths in the arguments of an MCP filesystem tool call that are
+    outside a working copy. Relative paths are resolved like the server
+    resolves them, against the working directory.
+
+    Returns:
+        list: Paths as given in the arguments
+    """
+    root = os.path.realpath(workspace_path)
+    outside = []
+    for name in PATH_ARGUMENTS:
+        values = args.get(name)
+        if not values:
+            continue
+        for value in values if isinstance(values, list) else [values]:
+            path = os.path.realpath(os.path.expanduser(str(value)))
+            if os.path.commonpath([root, path]) != root:
+                outside.append(str(value))
+    return outside
+
+
+def clone_tree(source, destination):
+    """
+    Copy a folder, copy-on-write where the file system supports it (APFS,
+    Btrfs, XFS), so a working copy costs almost nothing until it is edited.
+    """
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    clone_flag = "-c" if sys.platform == "darwin" else "--reflink=auto"
+    try:
+        subprocess.run(
+            ["cp", "-R", clone_flag, source, destination],
+            check=True,
+            capture_output=True,
+        )
+        return
+    except (OSError, subprocess.CalledProcessError):
+        shutil.rmtree(destination, ignore_errors=True)
+    shutil.copytree(
+        source, destination, ignore=shutil.ignore_patterns(*IGNORED_DIRS)
+    )
+
+
+def create_worktree(project_path, procedure):
+    """
+    Create the working copy of a procedure: csharp-code/ and the procedure's
+    analysis folder under .worktrees/<procedure>/, laid out like the project.
+
+    Returns:
+        str: Path of the working copy
+    """
+    worktree = os.path.join(project_path, WORKTREE_DIR, procedure)
+    shutil.rmtree(worktree, ignore_errors=True)
+    clone_tree(
+        os.path.join(project_path, "csharp-code"),
+        os.path.join(worktree, "csharp-code"),
+    )
+    analysis_dir = os.path.join(project_path, "analysis", procedure)
+    if os.path.isdir(analysis_dir):
+        shutil.copytree(analysis_dir, os.path.join(worktree, "analysis", procedure))
+    return worktree
+
+
+def get_changes(worktree, baseline):
+    """
+    Compare a working copy's csharp-code/ with the baseline.
+
+    Returns:
+        dict: relative path -> new hash (None for a deleted file)
+    """
+    snapshot = snapshot_tree(os.path.join(worktree, "csharp-code"))
+    changes = {
+        path: digest
+        for path, digest in snapshot.items()
+        if baseline.get(path) != digest
+    }
+    for path in baseline:
+        if path not in snapshot:
+            changes[path] = None
+    return changes
+
+
+def merge_file(base_path, current_text, other_path):
+    """
+    Three-way merge of two edits of the same file with git merge-file.
+
+    Returns:
+        str: Merged content (None when the edits conflict or git is missing)
+    """
+    if not shutil.which("git"):
+        return None
+    with tempfile.TemporaryDirectory() as temp_dir:
+        current_path = os.path.join(temp_dir, "current")
+        with open(current_path, "w") as f:
+            f.write(current_text)
+        result = subprocess.run(
+            ["git", "merge-file", "-p", current_path, base_path, other_path],
+            capture_output=True,
+            text=True,
+        )
+    # git merge-file exits with the number of conflicts, negative on errors
+    if result.returncode != 0:
+        return None
+    return result.stdout
+
+
+def merge_worktrees(project_path, worktrees, baseline):
+    """
+    Merge the working copies back into the project's csharp-code/. A file
+    edited by one run is copied over, edits of the same file by several runs
+    are merged line by line, everything else is reported as a conflict and
+    left in the working copies.
+
+    Args:
+        project_path: Project path
+        worktrees: (procedure, worktree) tuples of the successful runs
+        baseline: Snapshot of csharp-code/ before the runs
+
+    Returns:
+        dict: {"merged": {procedure: [paths]}, "conflicts": [...]}
+    """
+    code_dir = os.path.join(project_path, "csharp-code")
+    edits = {}
+    for procedure, worktree in worktrees:
+        for path, digest in get_changes(worktree, baseline).items():
+            edits.setdefault(path, []).append((procedure, worktree, digest))
+
+    merged = {procedure: [] for procedure, _ in worktrees}
+    conflicts = []
+    for path in sorted(edits):
+        file_edits = edits[path]
+        procedures = [procedure for procedure, _, _ in file_edits]
+        target = os.path.join(code_dir, path)
+
+        if get_file_hash(target) != baseline.get(path):
+            reason = "changed in the project while the runs were working"
+        elif len({digest for _, _, digest in file_edits}) == 1:
+            # One run, or several runs with the same result
+            _, worktree, digest = file_edits[0]
+            if digest is None:
+                os.remove(target)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(os.path.join(worktree, "csharp-code", path), target)
+            for procedure in procedures:
+                merged[procedure].append(path)
+            continue
+        elif any(digest is None for _, _, digest in file_edits):
+            reason = "deleted by one run and edited by another"
+        elif path not in baseline:
+            reason = "created by several runs with different content"
+        else:
+            with open(target, "r") as f:
+                content = f.read()
+            for _, worktree, _ in file_edits:
+                content = merge_file(
+                    target, content, os.path.join(worktree, "csharp-code", path)
+                )
+                if content is None:
+                    break
+            if content is not None:
+                with open(target, "w") as f:
+                    f.write(content)
+                for procedure in procedures:
+                    merged[procedure].append(path)
+                continue
+            reason = "overlapping edits by several runs"
+
+        conflicts.append(
+            {
+                "path": path,
+                "reason": reason,
+                "procedures": procedures,
+                "versions": [
+                    os.path.join(worktree, "csharp-code", path)
+                    for _, worktree, digest in file_edits
+                    if digest is not None
+                ],
+            }
+        )
+    return {"merged": merged, "conflicts": conflicts}
+
+
+def write_merge_report(project_path, report):
+    """Write the merge report to data/mcp_merge_report.json, returns the path"""
+    report_dir = os.path.join(project_path, MERGE_REPORT_DIR)
+    os.makedirs(report_dir, exist_ok=True)
+    report_path = os.path.join(report_dir, MERGE_REPORT_FILE)
+    with open(report_path, "w") as f:
+        json.dump({"generated_at": datetime.now().isoformat(), **report}, f, indent=4)
+    return report_path
+
+
+async def run_mcp_batch(procedures, project_path, run_procedure, concurrency=None):
+    """
+    Implement several procedures with concurrent MCP agent runs, each on its
+    own working copy, then merge the results into the project. All runs share
+    one MCP server rooted at .worktrees/, each prompt points at the run's own
+    working copy and run_procedure refuses tool calls outside of it. Must run
+    on the MCP server loop.
+
+    Args:
+        procedures: Procedure names
+        project_path: Project path
+        run_procedure: Coroutine function (procedure, project_path,
+                       workspace_path, server_root)
+        concurrency: Runs at the same time (default MCP_CONCURRENCY)
+
+    Returns:
+        dict: Merge report ({"merged", "conflicts", "failed"})
+    """
+    baseline = snapshot_tree(os.path.join(project_path, "csharp-code"))
+    # The server only serves folders that exist when it starts
+    worktree_root = os.path.join(project_path, WORKTREE_DIR)
+    os.makedirs(worktree_root, exist_ok=True)
+    semaphore = asyncio.Semaphore(max(1, concurrency or MCP_CONCURRENCY))
+
+    async def run(procedure):
+        async with semaphore:
+            worktree = await asyncio.to_thread(
+                create_worktree, project_path, procedure
+            )
+            try:
+                await run_procedure(procedure, project_path, worktree, worktree_root)
+                return procedure, worktree, None
+            except Exception as e:
+                print(f"❌ MCP implementation of {procedure} failed: {str(e)}")
+                return procedure, worktree, str(e)
+
+    results = await asyncio.gather(*(run(procedure) for procedure in procedures))
+
+    succeeded = [
+        (procedure, worktree) for procedure, worktree, error in results if not error
+    ]
+    report = merge_worktrees(project_path, succeeded, baseline)
+    report["failed"] = {procedure: error for procedure, _, error in results if error}
+
+    # Working copies with conflicting versions are kept for a manual merge
+    conflicted = {
+        procedure
+        for conflict in report["conflicts"]
+        for procedure in conflict["procedures"]
+    }
+    for procedure, worktree, _ in results:
+        if procedure not in conflicted:
+            shutil.rmtree(worktree, ignore_errors=True)
+
+    report_path = write_merge_report(project_path, report)
+    print(
+        f"\n=== MCP batch: {len(succeeded)}/{len(procedures)} procedures implemented ==="
+    )
+    for procedure, paths in report["merged"].items():
+        print(f"✅ {procedure}: {len(paths)} files merged")
+    for procedure in report["failed"]:
+        print(f"❌ {procedure}: failed")
+    for conflict in report["conflicts"]:
+        print(
+            f"⚠️ Conflict in {conflict['path']} ({', '.join(conflict['procedures'])}): {conflict['reason']}"
+        )
+    print(f"Merge report saved to {report_path}")
+    return report
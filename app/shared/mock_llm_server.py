@@ -0,0 +1,449 @@
+import os
+import re
+import json
+import time
+import uuid
+import random
+import hashlib
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MOCK_LLM_HOST = os.getenv("MOCK_LLM_HOST", "127.0.0.1")
+MOCK_LLM_PORT = int(os.getenv("MOCK_LLM_PORT", "8765"))
+# Seconds until the full response is sent, plus or minus up to MOCK_LLM_JITTER
+MOCK_LLM_LATENCY = float(os.getenv("MOCK_LLM_LATENCY", "1.0"))
+MOCK_LLM_JITTER = float(os.getenv("MOCK_LLM_JITTER", "0.25"))
+# Share of the latency spent before the first streamed chunk
+MOCK_LLM_TTFT_SHARE = float(os.getenv("MOCK_LLM_TTFT_SHARE", "0.3"))
+MOCK_LLM_STREAM_CHUNKS = int(os.getenv("MOCK_LLM_STREAM_CHUNKS", "8"))
+MOCK_LLM_SEED = os.getenv("MOCK_LLM_SEED", "0")
+
+AGENT_NAME_PATTERN = r'internal name is "(\w+)"'
+# FILE markers that name a real file (templates use <file_name> or [filename])
+REQUESTED_FILE_PATTERN = r"FILE:\s*([\w./-]+\.json)\b"
+
+# Canned content of the JSON files the agents are asked for
+CANNED_FILES = {
+    "business_rules.json": {
+        "businessRules": [
+            {
+                "id": "BR-001",
+                "name": "Mock Validation Rule",
+                "description": "Input parameters must be valid",
+                "category": "validation",
+                "sqlSnippet": "IF @Id IS NULL RETURN -1",
+            }
+        ]
+    },
+    "business_functions.json": {
+        "businessFunctions": [
+            {
+                "id": "BF-001",
+                "name": "Mock Business Function",
+                "description": "Processes the request",
+                "enforcedRules": ["BR-001"],
+                "sqlSnippet": "SELECT * FROM dbo.MockTable WHERE Id = @Id",
+            }
+        ]
+    },
+    "business_processes.json": {
+        "businessProcesses": [
+            {
+                "id": "PROC-001",
+                "name": "Mock Business Process",
+                "description": "Runs the mock business function",
+                "steps": [{"id": "STEP-001", "functionId": "BF-001", "conditions": []}],
+            }
+        ]
+    },
+    "returnable_objects.json": {
+        "returnableObjects": [
+            {
+                "id": "RO-001",
+                "name": "MockResult",
+                "type": "ResultSet",
+                "columns": [{"name": "Id", "dataType": "INT", "isRequired": True}],
+                "returnConditions": ["Request is valid"],
+            }
+        ],
+        "returnScenarios": [
+            {
+                "id": "RS-001",
+                "name": "Success",
+                "returnedObjects": [{"objectId": "RO-001", "isRequired": True}],
+                "triggerCondition": "Request is valid",
+            }
+        ],
+        "sideEffects": {"description": "No side effects", "effects": []},
+    },
+    "process_object_mapping.json": {
+        "processObjectMapping": {
+            "description": "Maps the mock process to its returnable objects",
+            "mappings": [
+                {
+                    "processId": "PROC-001",
+                    "processName": "Mock Business Process",
+                    "flowPaths": [
+                        {"pathId": "PATH-001", "returnableObjects": ["RO-001"]}
+                    ],
+                }
+            ],
+            "decisionPoints": [],
+        }
+    },
+    "testable_units.json": {
+        "testableUnits": [
+            {
+                "id": "TU-001",
+                "name": "Mock Testable Unit",
+                "parentFunctionId": "BF-001",
+                "category": "validation",
+                "description": "Validates the input",
+                "sqlSnippet": "IF @Id IS NULL RETURN -1",
+                "entities": ["MockTable"],
+            }
+        ]
+    },
+    "faq.json": {
+        "id": "BF-001",
+        "name": "Mock Business Function",
+        "topics": [
+            {
+                "question": "What does this function do?",
+                "answer": "It processes the request.",
+            }
+        ],
+    },
+    "implementation_approach.json": {
+        "implementationApproach": {
+            "name": "Mock Migration",
+            "description": "Migration from stored procedure to C# repository pattern implementation using LINQ",
+            "layers": [
+                {
+                    "name": "API Layer",
+                    "position": 1,
+                    "components": [
+                        {
+                            "name": "Controller",
+                            "namespace": "sql2code.Controllers",
+                            "path": "Controllers/Mock/Controller.cs",
+                            "description": "Mock controller",
+                            "methods": [],
+                        }
+                    ],
+                }
+            ],
+        }
+    },
+    "out_of_scope.json": {"outOfScope": {"features": [], "technicalApproaches": []}},
+    "specific_considerations.json": {
+        "specificConsiderations": {"returnableObjects": [], "testSeams": []}
+    },
+}
+
+TESTABLE_UNIT_SCENARIOS = {
+    "id": "TU-001",
+    "name": "Mock Testable Unit",
+    "parentFunctionId": "BF-001",
+    "category": "validation",
+    "description": "Validates the input",
+    "sqlSnippet": "IF @Id IS NULL RETURN -1",
+    "entities": ["MockTable"],
+    "testScenarios": [
+        {"id": "TS-001", "type": "normal", "description": "Valid input succeeds"},
+        {"id": "TS-002", "type": "null", "description": "NULL input is rejected"},
+    ],
+}
+
+INTEGRATION_TEST_SPEC = {
+    "testScenarios": [
+        {
+            "testId": "MOCK-positive",
+            "category": "BusinessRule",
+            "business_rule_function_id": "BR-001",
+            "description": "Valid input returns the mock result",
+            "testDataSetup": [{"entity": "MockTable", "data": [{"Id": 1}]}],
+            "inputs": [{"name": "@Id", "value": 1}],
+            "validationCriteria": {"expectedResult": "One row is returned"},
+        }
+    ]
+}
+
+SQL_TEST = """CREATE PROCEDURE {test_name}
+AS
+BEGIN
+    -- Arrange
+    EXEC tSQLt.FakeTable 'dbo.MockTable';
+    INSERT INTO dbo.MockTable (Id) VALUES (1);
+
+    -- Act
+    DECLARE @Result INT = 1;
+
+    -- Assert
+    EXEC tSQLt.AssertEquals @Expected = 1, @Actual = @Result;
+END;
+GO"""
+
+CSHARP_TEST = """```csharp
+using Xunit;
+
+namespace sql2code.Tests
+{
+    public class MockTests
+    {
+        [Fact]
+        public void MockScenario_ReturnsExpectedResult()
+        {
+            var result = 1;
+            Assert.Equal(1, result);
+        }
+    }
+}
+```"""
+
+CSHARP_FILE = """namespace sql2code
+{{
+    public class {class_name}
+    {{
+    }}
+}}"""
+
+
+def _message_text(message):
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def get_agent_name(messages):
+    """Get the ADK agent name from the system instruction"""
+    for message in messages:
+        if message.get("role") == "system":
+            match = re.search(AGENT_NAME_PATTERN, _message_text(message))
+            if match:
+                return match.group(1)
+    return None
+
+
+def get_requested_files(messages):
+    """
+    JSON files the last prompt asks for (the system instruction when the
+    prompt names none), in order of appearance. Folders are kept, batched
+    prompts ask for <procedure>/<file_name>.
+    """
+    user_messages = [m for m in messages if m.get("role") == "user"]
+    system_messages = [m for m in messages if m.get("role") == "system"]
+    for candidates in (user_messages[-1:], system_messages):
+        text = "".join(_message_text(message) for message in candidates)
+        names = []
+        for name in re.findall(REQUESTED_FILE_PATTERN, text):
+            if name not in names:
+                names.append(name)
+        if names:
+            return names
+    return []
+
+
+def _json_block(data):
+    return "```json\n" + json.dumps(data, indent=2) + "\n```"
+
+
+def _file_blocks(names):
+    return "\n\n".join(
+        f"FILE: {name}\n" + _json_block(CANNED_FILES.get(os.path.basename(name), {}))
+        for name in names
+    )
+
+
+def _sql_test(prompt):
+    match = re.search(r"Create test with name:\s*(\[[^\]]+\]\.\[[^\]]+\])", prompt)
+    test_name = match.group(1) if match else "[test_mock].[test_mock_case]"
+    return SQL_TEST.format(test_name=test_name)
+
+
+def _csharp_files(prompt):
+    paths = []
+    for path in re.findall(r'"path":\s*"([\w./-]+\.cs)"', prompt):
+        if path not in paths:
+            paths.append(path)
+    if not paths:
+        paths = ["Services/MockService.cs"]
+    return "\n\n".join(
+        f"FILE: {path}\n```csharp\n"
+        + CSHARP_FILE.format(class_name=os.path.splitext(os.path.basename(path))[0])
+        + "\n```"
+        for path in paths
+    )
+
+
+def build_response(messages):
+    """Canned response in the format the calling agent parses"""
+    agent_name = get_agent_name(messages) or ""
+    user_messages = [m for m in messages if m.get("role") == "user"]
+    prompt = _message_text(user_messages[-1]) if user_messages else ""
+
+    if agent_name == "sql_test_generation_agent":
+        return _sql_test(prompt)
+    if agent_name == "csharp_test_generation_agent":
+        return CSHARP_TEST
+    if agent_name == "testable_unit_scenario_agent":
+        return json.dumps(TESTABLE_UNIT_SCENARIOS, indent=2)
+    if agent_name == "integration_test_spec_agent":
+        return _json_block(INTEGRATION_TEST_SPEC)
+    if agent_name == "implementation_executor_agent":
+        return _csharp_files(prompt)
+
+    requested_files = get_requested_files(messages)
+    if requested_files:
+        return _file_blocks(requested_files)
+    return "OK"
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def get_latency(body):
+    """Latency of a request, the jitter is derived from the request so reruns match"""
+    digest = hashlib.sha256((MOCK_LLM_SEED + body).encode("utf-8")).hexdigest()
+    jitter = random.Random(digest).uniform(-MOCK_LLM_JITTER, MOCK_LLM_JITTER)
+    return max(0.0, MOCK_LLM_LATENCY + jitter)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """Serves /v1/chat/completions and /v1/models"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, data):
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(
+                200, {"object": "list", "data": [{"id": "mock-llm", "object": "model"}]}
+            )
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        try:
+            request = json.loads(body)
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+            return
+
+        messages = request.get("messages", [])
+        text = build_response(messages)
+        latency = get_latency(body)
+        usage = {
+            "prompt_tokens": sum(estimate_tokens(_message_text(m)) for m in messages),
+            "completion_tokens": estimate_tokens(text),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = request.get("model", "mock-llm")
+
+        if request.get("stream"):
+            self._stream(completion_id, model, text, usage, latency)
+            return
+
+        time.sleep(latency)
+        self._send_json(
+            200,
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            },
+        )
+
+    def _stream(self, completion_id, model, text, usage, latency):
+        """Send the response as server-sent events spread over the latency"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        chunk_count = max(1, MOCK_LLM_STREAM_CHUNKS)
+        chunk_size = -(-len(text) // chunk_count)
+        chunks = [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)]
+        chunk_delay = latency * (1 - MOCK_LLM_TTFT_SHARE) / max(1, len(chunks))
+
+        def send(delta, finish_reason=None, usage=None):
+            event = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            }
+            if usage:
+                event["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        time.sleep(latency * MOCK_LLM_TTFT_SHARE)
+        for index, chunk in enumerate(chunks):
+            delta = {"content": chunk}
+            if index == 0:
+                delta["role"] = "assistant"
+            send(delta)
+            time.sleep(chunk_delay)
+        send({}, "stop", usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def run_mock_llm_server(host=MOCK_LLM_HOST, port=MOCK_LLM_PORT):
+    """Serve the mock LLM until interrupted"""
+    server = ThreadingHTTPServer((host, port), MockLLMHandler)
+    server.daemon_threads = True
+    print(
+        f"🧪 Mock LLM listening on http://{host}:{port}/v1 "
+        f"(latency {MOCK_LLM_LATENCY}s ± {MOCK_LLM_JITTER}s)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Mock LLM stopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the LLM provider")
+    parser.add_argument("--host", default=MOCK_LLM_HOST)
+    parser.add_argument("--port", type=int, default=MOCK_LLM_PORT)
+    args = parser.parse_args()
+    run_mock_llm_server(args.host, args.port)
@@ -0,0 +1,75 @@
+import os
+from dotenv import load_dotenv
+from app.agents.model_configuration import llm_fast, llm_strong
+from app.shared.procedure_complexity import (
+    get_complexity_tier,
+    get_procedure_complexity,
+)
+
+load_dotenv()
+
+# Set MODEL_ROUTING=false to send every procedure to the configured model
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "true").lower() in ("1", "true", "yes")
+
+# Procedures scoring below the first value are simple, from the second on complex.
+# Per agent: MODEL_ROUTING_THRESHOLDS_<AGENT_NAME>, e.g.
+# MODEL_ROUTING_THRESHOLDS_SQL_TEST_GENERATION_AGENT=10,40
+DEFAULT_THRESHOLDS = os.getenv("MODEL_ROUTING_THRESHOLDS", "15,50")
+
+
+def get_thresholds(agent_name):
+    """Get the (simple_below, complex_from) score thresholds of an agent"""
+    value = os.getenv(f"MODEL_ROUTING_THRESHOLDS_{agent_name.upper()}")
+    try:
+        simple_below, complex_from = (
+            float(part) for part in (value or DEFAULT_THRESHOLDS).split(",")
+        )
+    except ValueError:
+        print(f"Warning: Invalid model routing thresholds '{value}' for {agent_name}")
+        simple_below, complex_from = (
+            float(part) for part in DEFAULT_THRESHOLDS.split(",")
+        )
+    return simple_below, complex_from
+
+
+def route_model(agent_name, procedure, project_path, default_model):
+    """
+    Pick the model for a procedure from its static complexity. A batch of
+    procedures sharing one request is routed by its most complex procedure.
+
+    Args:
+        agent_name: Name of the calling agent
+        procedure: Procedure name, or a list of procedure names for a batch
+        project_path: Project path
+        default_model: Model the agent is configured with (used for moderate procedures)
+
+    Returns:
+        dict: model, complexity_tier, complexity_score and thresholds,
+              or None when the procedure is not routed
+    """
+    if not MODEL_ROUTING or not procedure or not project_path:
+        return None
+
+    procedures = [procedure] if isinstance(procedure, str) else procedure
+    scores = []
+    for name in procedures:
+        complexity = get_procedure_complexity(name, project_path)
+        if complexity is None:
+            return None
+        scores.append(complexity["score"])
+
+    thresholds = get_thresholds(agent_name)
+    score = max(scores)
+    tier = get_complexity_tier(score, thresholds)
+    model = default_model
+    if tier == "simple" and llm_fast:
+        model = llm_fast
+    elif tier == "complex" and llm_strong:
+        model = llm_strong
+
+    return {
+        "model": model,
+        "complexity_tier": tier,
+        "complexity_score": score,
+        "thresholds": list(thresholds),
+    }
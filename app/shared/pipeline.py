@@ -0,0 +1,741 @@
+import os
+import time
+import fnmatch
+import importlib
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+from app.shared.concurrency import LLM_MAX_CONCURRENCY
+from app.shared import stage_journal, artifact_manifest
+from app.shared.procedure_complexity import get_procedure_complexity
+from app.shared.procedure_profiler import load_profile_scores
+from app.shared.procedure_batching import BATCH_PROMPTING, plan_batches
+from app.shared.procedure_fingerprint import (
+    load_cluster_templates,
+    load_cluster_siblings,
+)
+
+load_dotenv()
+
+# Number of (procedure, stage) nodes of each kind that may run at the same time
+PIPELINE_LLM_CONCURRENCY = int(
+    os.getenv("PIPELINE_LLM_CONCURRENCY", str(LLM_MAX_CONCURRENCY))
+)
+PIPELINE_DB_CONCURRENCY = int(os.getenv("PIPELINE_DB_CONCURRENCY", "2"))
+PIPELINE_LOCAL_CONCURRENCY = int(
+    os.getenv("PIPELINE_LOCAL_CONCURRENCY", str(os.cpu_count() or 2))
+)
+
+# Stage definitions, in pipeline order.
+#   scope:     "project" stages run once, "procedure" stages once per procedure
+#   kind:      concurrency pool the stage counts against (llm, db or local)
+#   requires:  stages that must have succeeded first (same procedure for
+#              procedure stages, every procedure for project stages)
+#   outputs:   files the stage writes, a stage that returns None succeeded
+#              when it wrote all of them during the run
+#   inputs:    files (glob patterns) the stage reads besides the procedure SQL
+#              and the outputs of the stages it requires, a change reruns it
+#   template_inputs: files of the cluster template (see procedure_fingerprint)
+#              a sibling reads, the sibling waits for the template's node
+#   exclusive: the stage changes the working directory, nothing runs beside it
+#   truthy:    the stage only succeeded when it returned a non-empty result
+#   batch_target: function(procedures, project_path) that handles several
+#              small procedures with one request when BATCH_PROMPTING is on
+# Business analysis files the later stages read besides its declared outputs
+ANALYSIS_INPUTS = [
+    "analysis/{procedure}/business_functions.json",
+    "analysis/{procedure}/business_processes.json",
+    "analysis/{procedure}/process_object_mapping.json",
+    "analysis/{procedure}/testable_units.json",
+]
+
+# Scaffolded entities, DbContext and repositories
+MODEL_INPUTS = [
+    "csharp-code/Data/AppDbContext.cs",
+    "csharp-code/Models/*.cs",
+    "csharp-code/Abstractions/Repositories/*.cs",
+]
+
+STAGES = [
+    {
+        "name": "extract-procedures",
+        "scope": "project",
+        "kind": "db",
+        "requires": [],
+        "truthy": True,
+        "target": ("app.shared.get_stored_procedures", "extract_stored_procedures"),
+    },
+    {
+        "name": "discover-dependencies",
+        "scope": "project",
+        "kind": "db",
+        "requires": ["extract-procedures"],
+        "target": ("app.shared.discover_dependencies", "discover_dependencies"),
+    },
+    {
+        "name": "scaffold-database",
+        "scope": "project",
+        "kind": "local",
+        "requires": [],
+        "exclusive": True,
+        "target": ("app.shared.scaffold_database", "scaffold_database"),
+    },
+    {
+        "name": "business-analysis",
+        "scope": "procedure",
+        "kind": "llm",
+        "requires": ["discover-dependencies"],
+        "truthy": True,
+        "template_inputs": [
+            "sql_raw/{procedure}/{procedure}.sql",
+            "analysis/{procedure}/business_rules.json",
+            "analysis/{procedure}/returnable_objects.json",
+        ]
+        + ANALYSIS_INPUTS,
+        "outputs": [
+            "analysis/{procedure}/business_rules.json",
+            "analysis/{procedure}/returnable_objects.json",
+        ],
+        "target": ("app.agents.business_analysis_agent.main", "business_analysis"),
+        "batch_target": (
+            "app.agents.business_analysis_agent.main",
+            "business_analysis_batch",
+        ),
+    },
+    {
+        "name": "csharp-dependency-analysis",
+        "scope": "procedure",
+        "kind": "local",
+        "requires": ["scaffold-database"],
+        "outputs": ["analysis/{procedure}/ef_analysis.json"],
+        "inputs": MODEL_INPUTS + ["csharp-code/Repositories/*/*.cs"],
+        "target": (
+            "app.shared.scaffold_templates.create_ef_analysis",
+            "analyze_csharp_dependencies",
+        ),
+    },
+    {
+        "name": "faq",
+        "scope": "procedure",
+        "kind": "llm",
+        "requires": ["business-analysis"],
+        "outputs": ["analysis/{procedure}/faq.json"],
+        "inputs": ANALYSIS_INPUTS,
+        "target": ("app.agents.faq_builder_agent.main", "faq_builder"),
+    },
+    {
+        "name": "testable-unit-scenarios",
+        "scope": "procedure",
+        "kind": "llm",
+        "requires": ["business-analysis", "csharp-dependency-analysis"],
+        "outputs": ["analysis/{procedure}/testable_unit_scenarios.json"],
+        "inputs": ANALYSIS_INPUTS,
+        "target": (
+            "app.agents.testable_unit_scenario_agent.main",
+            "testable_unit_scenarios",
+        ),
+    },
+    {
+        "name": "implementation-planner",
+        "scope": "procedure",
+        "kind": "llm",
+        "requires": ["business-analysis", "csharp-dependency-analysis"],
+        "inputs": ANALYSIS_INPUTS + MODEL_INPUTS,
+        "target": (
+            "app.agents.implementation_planner_agent.main",
+            "implementation_planner",
+        ),
+    },
+    {
+        "name": "implementation-executor",
+        "scope": "procedure",
+        "kind": "llm",
+        "requires": ["implementation-planner"],
+        "inputs": [
+            "analysis/{procedure}/business_rules.json",
+            "analysis/{procedure}/implementation_plan.json",
+        ]
+        + ANALYSIS_INPUTS,
+        "target": (
+            "app.agents.implementation_executor_agent.main",
+            "implementation_executor",
+        ),
+    },
+    {
+        "name": "integration-test-spec",
+        "scope": "procedure",
+        "kind": "llm",
+        "requires": ["business-analysis", "csharp-dependency-analysis"],
+        "outputs": ["analysis/{procedure}/{procedure}_integration_test_spec.json"],
+        "inputs": ANALYSIS_INPUTS,
+        "target": (
+            "app.agents.integration_test_spec_agent.main",
+            "create_integration_test_spec",
+        ),
+    },
+    {
+        "name": "sql-tests",
+        "scope": "procedure",
+        "kind": "llm",
+        "requires": ["integration-test-spec"],
+        "outputs": ["sql_tests/{procedure}/{procedure}_test.sql"],
+        "inputs": ["analysis/{procedure}/returnable_objects.json"],
+        "target": ("app.agents.sql_test_generation_agent.main", "generate_sql_test"),
+    },
+    {
+        "name": "csharp-tests",
+        "scope": "procedure",
+        "kind": "llm",
+        "requires": ["integration-test-spec", "implementation-executor"],
+        "inputs": ["analysis/{procedure}/ef_analysis.json"] + MODEL_INPUTS,
+        "target": (
+            "app.agents.csharp_test_generation_agent.main",
+            "generate_csharp_test",
+        ),
+    },
+    {
+        "name": "run-sql-tests",
+        "scope": "project",
+        "kind": "db",
+        "requires": ["sql-tests"],
+        "target": ("app.shared.run_sql_tests", "run_sql_tests"),
+    },
+]
+
+STAGE_NAMES = [stage["name"] for stage in STAGES]
+
+
+def get_stage(name):
+    """Get a stage definition by name"""
+    for stage in STAGES:
+        if stage["name"] == name:
+            return stage
+    raise ValueError(f"Unknown stage '{name}'. Available stages: {', '.join(STAGE_NAMES)}")
+
+
+def get_project_procedures(project_path, procedure_patterns=None):
+    """List the extracted procedures of a project, optionally filtered by name patterns"""
+    sql_raw_dir = os.path.join(project_path, "sql_raw")
+    if not os.path.exists(sql_raw_dir):
+        return []
+
+    procedures = sorted(
+        folder
+        for folder in os.listdir(sql_raw_dir)
+        if os.path.isdir(os.path.join(sql_raw_dir, folder))
+    )
+    if procedure_patterns:
+        procedures = [
+            procedure
+            for procedure in procedures
+            if any(
+                fnmatch.fnmatch(procedure.lower(), pattern.lower())
+                for pattern in procedure_patterns
+            )
+        ]
+    return procedures
+
+
+def _stage_arguments(stage, procedure, context):
+    """Build the call arguments of a stage function"""
+    name = stage["name"]
+    if name == "extract-procedures":
+        return (
+            context["project_path"],
+            context["connection_string"],
+            context["procedure_patterns"] or ["*"],
+        )
+    if name == "discover-dependencies":
+        return (context["connection_string"], context["project_name"])
+    if name == "scaffold-database":
+        return ("csharp-code", context["project_name"])
+    if name == "run-sql-tests":
+        return (context["project_path"], context["connection_string"])
+    return (procedure, context["project_path"])
+
+
+def _outputs_written(stage, procedure, project_path, started):
+    """Check if every output of a procedure stage was written since started"""
+    for output in stage["outputs"]:
+        path = os.path.join(project_path, output.format(procedure=procedure))
+        try:
+            if os.path.getmtime(path) < started:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def load_stage_function(stage, target="target"):
+    """Import the function of a stage (stage modules are only imported when used)"""
+    module_name, function_name = stage[target]
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def lazy_function(module_name, function_name):
+    """
+    Stand-in for a stage function that imports its module on the first call,
+    so menus and argument parsing never wait for the agents, LiteLLM or a
+    database driver to load.
+    """
+
+    def call(*args, **kwargs):
+        module = importlib.import_module(module_name)
+        return getattr(module, function_name)(*args, **kwargs)
+
+    call.__name__ = function_name
+    call.__qualname__ = function_name
+    return call
+
+
+def stage_succeeded(stage, procedure, project_path, result, started):
+    """
+    Check if a stage succeeded, given what its function returned. False is
+    always a failure. A function that returns None succeeded when it wrote
+    all of the stage's outputs during this run (outputs of an earlier run
+    do not count).
+
+    Args:
+        started: Timestamp the run started at
+    """
+    if stage.get("truthy"):
+        return bool(result)
+    if result is False:
+        return False
+    if result is None and procedure is not None and stage.get("outputs"):
+        return _outputs_written(stage, procedure, project_path, started)
+    return True
+
+
+def run_stage(stage, procedure, context):
+    """
+    Run one (procedure, stage) node, procedure stages are recorded in the journal
+    and the artifact manifest.
+
+    Returns:
+        bool: True when the stage succeeded
+    """
+    function = load_stage_function(stage)
+    project_path = context["project_path"]
+
+    started = time.time()
+    if procedure is not None:
+        result = stage_journal.run_journaled(
+            stage["name"], procedure, project_path, function
+        )
+    else:
+        result = function(*_stage_arguments(stage, procedure, context))
+        succeeded = stage_succeeded(stage, None, project_path, result, started)
+        stage_journal.record(
+            project_path,
+            stage["name"],
+            None,
+            "done" if succeeded else "failed",
+            duration=round(time.time() - started, 1),
+        )
+    return stage_succeeded(stage, procedure, project_path, result, started)
+
+
+def run_stage_batch(stage, procedures, context):
+    """
+    Run a procedure stage for a batch of procedures with its batch function.
+
+    Returns:
+        dict: Procedure name to True when the stage succeeded for it
+    """
+    function = load_stage_function(stage, "batch_target")
+    project_path = context["project_path"]
+    started = time.time()
+    results = stage_journal.run_journaled_batch(
+        stage["name"], procedures, project_path, function
+    )
+    return {
+        procedure: stage_succeeded(
+            stage, procedure, project_path, results.get(procedure, False), started
+        )
+        for procedure in procedures
+    }
+
+
+def get_batch_groups(nodes, project_path):
+    """
+    Plan the batches of the pending nodes of stages that support batching.
+
+    Returns:
+        dict: (stage name, procedure) to the procedures of its batch
+    """
+    groups = {}
+    if not BATCH_PROMPTING:
+        return groups
+    for stage in STAGES:
+        if "batch_target" not in stage:
+            continue
+        procedures = [
+            node.procedure
+            for node in nodes
+            if node.stage is stage and node.status == "pending"
+        ]
+        if len(procedures) < 2:
+            continue
+        batches, _ = plan_batches(procedures, project_path)
+        for batch in batches:
+            for procedure in batch:
+                groups[(stage["name"], procedure)] = batch
+        if batches:
+            print(
+                f"📦 {stage['name']}: {sum(len(b) for b in batches)} small procedures in {len(batches)} batches"
+            )
+    return groups
+
+
+class PipelineNode:
+    """A (procedure, stage) pair scheduled by the pipeline"""
+
+    def __init__(self, stage, procedure=None):
+        self.stage = stage
+        self.procedure = procedure
+        self.requires = []
+        # Nodes that must finish first, without blocking this one when they fail
+        self.waits_for = []
+        self.status = "pending"
+        self.started = None
+        self.duration = None
+        self.error = None
+
+    @property
+    def label(self):
+        if self.procedure:
+            return f"{self.stage['name']}[{self.procedure}]"
+        return self.stage["name"]
+
+
+def build_pipeline(stage_names, procedures, siblings=None):
+    """
+    Build the (procedure, stage) DAG.
+
+    Requirements on stages that are not part of this run are treated as
+    already satisfied by an earlier run.
+
+    Args:
+        stage_names: Stages to run
+        procedures: Procedures the procedure-level stages run for
+        siblings: Cluster sibling to its template, the sibling's nodes of
+                  stages with template_inputs wait for the template's node
+
+    Returns:
+        list: PipelineNode objects in pipeline order
+    """
+    selected = [stage for stage in STAGES if stage["name"] in stage_names]
+    nodes = []
+    by_stage = {}
+
+    for stage in selected:
+        if stage["scope"] == "project":
+            stage_nodes = [PipelineNode(stage)]
+        else:
+            stage_nodes = [PipelineNode(stage, procedure) for procedure in procedures]
+        by_stage[stage["name"]] = stage_nodes
+        nodes.extend(stage_nodes)
+
+    for node in nodes:
+        for required_name in node.stage["requires"]:
+            for required in by_stage.get(required_name, []):
+                if (
+                    node.procedure is None
+                    or required.procedure is None
+                    or required.procedure == node.procedure
+                ):
+                    node.requires.append(required)
+
+    for stage in selected:
+        if "template_inputs" not in stage or not siblings:
+            continue
+        stage_nodes = {node.procedure: node for node in by_stage[stage["name"]]}
+        for procedure, node in stage_nodes.items():
+            template = stage_nodes.get(siblings.get(procedure))
+            if template is not None:
+                node.waits_for.append(template)
+
+    return nodes
+
+
+def get_procedure_sizes(project_path, procedures):
+    """Complexity score per procedure, from the profile report when there is one"""
+    sizes = load_profile_scores(project_path)
+    for procedure in procedures:
+        if procedure not in sizes:
+            complexity = get_procedure_complexity(procedure, project_path)
+            sizes[procedure] = complexity["score"] if complexity else 0.0
+    return sizes
+
+
+def _is_ready(node):
+    if node.stage["scope"] == "project" and node.requires:
+        # Project stages that collect procedure results run once all of them
+        # finished, as long as at least one procedure got through
+        if any(req.status in ("pending", "running") for req in node.requires):
+            return False
+        return any(req.status in ("done", "skipped") for req in node.requires)
+    if any(n.status in ("pending", "running") for n in node.waits_for):
+        return False
+    return all(req.status in ("done", "skipped") for req in node.requires)
+
+
+def _is_blocked(node):
+    if node.stage["scope"] == "project" and node.requires:
+        return all(req.status in ("failed", "blocked") for req in node.requires)
+    return any(req.status in ("failed", "blocked") for req in node.requires)
+
+
+def run_pipeline(
+    project_path,
+    project_name=None,
+    connection_string=None,
+    stages=None,
+    procedure_patterns=None,
+    llm_concurrency=None,
+    db_concurrency=None,
+    resume=True,
+):
+    """
+    Run the pipeline stages for the whole project, running every ready
+    (procedure, stage) node concurrently within the LLM and DB limits.
+
+    Args:
+        project_path: Project path
+        project_name: Project name (defaults to the project folder name)
+        connection_string: Database connection string
+        stages: Stage names to run (defaults to every stage)
+        procedure_patterns: Optional name patterns limiting the procedures
+        llm_concurrency: Max LLM-bound nodes at once (defaults to PIPELINE_LLM_CONCURRENCY)
+        db_concurrency: Max DB-bound nodes at once (defaults to PIPELINE_DB_CONCURRENCY)
+        resume: Skip procedure stages the artifact manifest has up to date
+
+    Returns:
+        list: Finished PipelineNode objects with status and duration
+    """
+    stage_names = list(stages or STAGE_NAMES)
+    for name in stage_names:
+        get_stage(name)
+
+    context = {
+        "project_path": project_path,
+        "project_name": project_name or os.path.basename(os.path.normpath(project_path)),
+        "connection_string": connection_string,
+        "procedure_patterns": procedure_patterns,
+    }
+
+    # Extraction decides which procedures exist, so it runs before the DAG is built
+    nodes_before = []
+    if "extract-procedures" in stage_names:
+        extract_node = PipelineNode(get_stage("extract-procedures"))
+        _run_node_inline(extract_node, context)
+        nodes_before.append(extract_node)
+        stage_names.remove("extract-procedures")
+        if extract_node.status != "done":
+            print("❌ Extraction failed, stopping the pipeline")
+            print_pipeline_summary(nodes_before)
+            return nodes_before
+
+    procedures = get_project_procedures(project_path, procedure_patterns)
+    print(
+        f"\n🚀 Running {len(stage_names)} stages for {len(procedures)} procedures "
+        f"in {os.path.basename(os.path.normpath(project_path))}"
+    )
+
+    nodes = build_pipeline(
+        stage_names, procedures, load_cluster_siblings(project_path)
+    )
+    if resume:
+        mark_completed_nodes(nodes, project_path)
+
+    # Import the stage modules up front, concurrent first imports from worker threads can deadlock
+    for stage_name in stage_names:
+        load_stage_function(get_stage(stage_name))
+
+    limits = {
+        "llm": llm_concurrency or PIPELINE_LLM_CONCURRENCY,
+        "db": db_concurrency or PIPELINE_DB_CONCURRENCY,
+        "local": PIPELINE_LOCAL_CONCURRENCY,
+    }
+    in_use = {kind: 0 for kind in limits}
+    stage_order = {name: index for index, name in enumerate(STAGE_NAMES)}
+    sizes = get_procedure_sizes(project_path, procedures)
+    templates = load_cluster_templates(project_path)
+    batch_groups = get_batch_groups(nodes, project_path)
+    running = {}
+    checked = set()
+
+    with ThreadPoolExecutor(max_workers=sum(limits.values())) as executor:
+        while True:
+            for node in nodes:
+                if node.status == "pending" and _is_blocked(node):
+                    node.status = "blocked"
+
+            # Later stages first, so procedures flow through the whole chain,
+            # near-duplicate templates before their siblings (which reuse their
+            # analysis) and the largest procedures first so they do not end up
+            # as a long tail
+            ready = sorted(
+                (n for n in nodes if n.status == "pending" and _is_ready(n)),
+                key=lambda n: (
+                    -stage_order[n.stage["name"]],
+                    n.procedure not in templates,
+                    -sizes.get(n.procedure, 0.0),
+                ),
+            )
+
+            # A node behind a rerun stage is still up to date when the rerun
+            # wrote the same content again, check once its requirements are done
+            if resume:
+                skipped = [
+                    n
+                    for n in ready
+                    if n.procedure is not None
+                    and n not in checked
+                    and artifact_manifest.is_up_to_date(
+                        project_path, n.stage["name"], n.procedure
+                    )
+                ]
+                checked.update(ready)
+                for node in skipped:
+                    node.status = "skipped"
+                    print(f"⏭️  {node.label} is up to date, skipping")
+                if skipped:
+                    continue
+
+            # An exclusive stage waits for the running nodes to drain, then runs alone
+            exclusive = [n for n in ready if n.stage.get("exclusive")]
+            if exclusive or any(
+                n.stage.get("exclusive") for group in running.values() for n in group
+            ):
+                ready = exclusive[:1] if not running else []
+
+            for node in ready:
+                kind = node.stage["kind"]
+                if node.status != "pending":
+                    continue
+                if in_use[kind] >= limits[kind] and not node.stage.get("exclusive"):
+                    continue
+
+                # The ready nodes of a planned batch share one request
+                batch = batch_groups.get((node.stage["name"], node.procedure), [])
+                group = [
+                    n
+                    for n in ready
+                    if n.stage is node.stage
+                    and n.procedure in batch
+                    and n.status == "pending"
+                ] or [node]
+
+                in_use[kind] += 1
+                for n in group:
+                    n.status = "running"
+                    n.started = time.time()
+                if len(group) > 1:
+                    procedures_in_batch = [n.procedure for n in group]
+                    print(
+                        f"▶️  Starting {node.stage['name']} batch: {', '.join(procedures_in_batch)}"
+                    )
+                    future = executor.submit(
+                        run_stage_batch, node.stage, procedures_in_batch, context
+                    )
+                else:
+                    print(f"▶️  Starting {node.label}")
+                    future = executor.submit(
+                        run_stage, node.stage, node.procedure, context
+                    )
+                running[future] = group
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                group = running.pop(future)
+                in_use[group[0].stage["kind"]] -= 1
+                try:
+                    result = future.result()
+                    error = None
+                except Exception as e:
+                    result = False
+                    error = str(e)
+                    traceback.print_exc()
+                for node in group:
+                    node.duration = round(time.time() - node.started, 1)
+                    node.error = error
+                    if isinstance(result, dict):
+                        succeeded = result.get(node.procedure, False)
+                    else:
+                        succeeded = result
+                    node.status = "done" if succeeded else "failed"
+                    icon = "✅" if succeeded else "❌"
+                    print(f"{icon} {node.label} {node.status} in {node.duration}s")
+
+    for node in nodes:
+        if node.status == "pending":
+            node.status = "blocked"
+
+    all_nodes = nodes_before + nodes
+    print_pipeline_summary(all_nodes)
+    return all_nodes
+
+
+def mark_completed_nodes(nodes, project_path):
+    """
+    Mark the procedure nodes the artifact manifest has up to date as skipped.
+    A node is only skipped when the procedure nodes it requires (and its
+    cluster template's node) were skipped too, the others are checked again
+    once those finished.
+    """
+    manifest = artifact_manifest.load_manifest(project_path)
+    skipped = 0
+    for node in nodes:
+        if node.procedure is None:
+            continue
+        if any(
+            req.status != "skipped" for req in node.requires if req.procedure is not None
+        ) or any(n.status != "skipped" for n in node.waits_for):
+            continue
+        if artifact_manifest.is_up_to_date(
+            project_path, node.stage["name"], node.procedure, manifest
+        ):
+            node.status = "skipped"
+            skipped += 1
+
+    if skipped:
+        print(
+            f"⏭️  Skipping {skipped} nodes whose inputs did not change (--force reruns them)"
+        )
+
+
+def _run_node_inline(node, context):
+    node.started = time.time()
+    print(f"▶️  Starting {node.label}")
+    try:
+        succeeded = run_stage(node.stage, node.procedure, context)
+    except Exception as e:
+        succeeded = False
+        node.error = str(e)
+        traceback.print_exc()
+    node.duration = round(time.time() - node.started, 1)
+    node.status = "done" if succeeded else "failed"
+
+
+def print_pipeline_summary(nodes):
+    """Print the status of every stage, with the procedures that did not finish"""
+    print("\n=== Pipeline summary ===")
+    for stage_name in STAGE_NAMES:
+        stage_nodes = [n for n in nodes if n.stage["name"] == stage_name]
+        if not stage_nodes:
+            continue
+        counts = {}
+        for node in stage_nodes:
+            counts[node.status] = counts.get(node.status, 0) + 1
+        total_time = sum(n.duration or 0 for n in stage_nodes)
+        status_text = ", ".join(f"{count} {status}" for status, count in counts.items())
+        print(f"{stage_name:<28} {status_text:<40} {total_time:>8.1f}s")
+        for node in stage_nodes:
+            if node.status in ("failed", "blocked") and node.procedure:
+                reason = f": {node.error}" if node.error else ""
+                print(f"    {node.status}: {node.procedure}{reason}")
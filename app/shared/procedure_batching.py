@@ -0,0 +1,127 @@
+import os
+from dotenv import load_dotenv
+from app.shared.file_block_stream import FileBlockStream
+from app.shared.procedure_complexity import get_procedure_complexity
+from app.shared.procedure_profiler import load_dependency_tokens
+from app.shared.prompt_context import estimate_tokens
+from app.shared.stage_journal import record_written
+
+load_dotenv()
+
+# Set BATCH_PROMPTING=true to analyze several tiny procedures with one request
+BATCH_PROMPTING = os.getenv("BATCH_PROMPTING", "false").lower() in ("1", "true", "yes")
+
+# Only procedures below this complexity score are batched
+BATCH_MAX_SCORE = float(os.getenv("BATCH_MAX_SCORE", "10"))
+
+# Estimated procedure + dependency tokens of all procedures in one batch
+BATCH_TOKEN_BUDGET = int(os.getenv("BATCH_TOKEN_BUDGET", "6000"))
+
+# Upper limit of procedures per batch, the response grows with every procedure
+BATCH_MAX_PROCEDURES = int(os.getenv("BATCH_MAX_PROCEDURES", "8"))
+
+
+def get_procedure_tokens(procedure, project_path, dependency_tokens):
+    """Estimated prompt tokens of a procedure: its SQL plus its dependency context"""
+    sql_file = os.path.join(project_path, "sql_raw", procedure, f"{procedure}.sql")
+    try:
+        with open(sql_file, "r") as f:
+            sql = f.read()
+    except FileNotFoundError:
+        return None
+    return estimate_tokens(sql) + dependency_tokens.get(procedure, 0)
+
+
+def plan_batches(procedures, project_path):
+    """
+    Pack the small procedures into batches that fit the token budget, the
+    others run on their own.
+
+    Args:
+        procedures: Procedure names
+        project_path: Project path
+
+    Returns:
+        tuple: (batches, singles) - batches is a list of procedure lists with
+               at least two procedures each, singles the procedures to run alone
+    """
+    dependency_tokens = load_dependency_tokens(project_path)
+    candidates = []
+    singles = []
+    for procedure in procedures:
+        complexity = get_procedure_complexity(procedure, project_path)
+        tokens = get_procedure_tokens(procedure, project_path, dependency_tokens)
+        if (
+            complexity is None
+            or tokens is None
+            or complexity["score"] >= BATCH_MAX_SCORE
+            or tokens > BATCH_TOKEN_BUDGET // 2
+        ):
+            singles.append(procedure)
+        else:
+            candidates.append((procedure, tokens))
+
+    # Largest first, each procedure goes into the first batch it still fits in
+    batches = []
+    for procedure, tokens in sorted(candidates, key=lambda c: (-c[1], c[0])):
+        for batch in batches:
+            if (
+                batch["tokens"] + tokens <= BATCH_TOKEN_BUDGET
+                and len(batch["procedures"]) < BATCH_MAX_PROCEDURES
+            ):
+                batch["procedures"].append(procedure)
+                batch["tokens"] += tokens
+                break
+        else:
+            batches.append({"procedures": [procedure], "tokens": tokens})
+
+    planned = []
+    for batch in batches:
+        if len(batch["procedures"]) > 1:
+            planned.append(batch["procedures"])
+        else:
+            singles.extend(batch["procedures"])
+
+    # Keep the caller's order for the procedures that run on their own
+    order = {procedure: index for index, procedure in enumerate(procedures)}
+    singles.sort(key=lambda procedure: order[procedure])
+    return planned, singles
+
+
+def get_batch_file_names(procedures, file_names):
+    """Namespaced names (<procedure>/<file_name>) of the files a batch response must contain"""
+    return [f"{procedure}/{name}" for procedure in procedures for name in file_names]
+
+
+def save_batch_file(project_path, procedures, file_path, file_content):
+    """
+    Save a namespaced FILE block to analysis/<procedure>/<file_name>.
+
+    Returns:
+        str: Namespaced name of the saved file (None when it was not saved)
+    """
+    parts = file_path.strip().replace("\\", "/").split("/")
+    if len(parts) < 2:
+        print(f"  ⚠️ {file_path} has no procedure folder, not saved")
+        return None
+
+    procedure, filename = parts[-2], parts[-1]
+    if procedure not in procedures:
+        print(f"  ⚠️ {file_path} is not for a procedure of this batch, not saved")
+        return None
+
+    full_path = os.path.join(project_path, "analysis", procedure, filename)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "w") as f:
+        f.write(file_content)
+    record_written(full_path, procedure)
+    return f"{procedure}/{filename}"
+
+
+def create_batch_file_stream(project_path, procedures):
+    """Create a parser that splits a batch response into the procedure analysis folders"""
+
+    def save_file(file_path, file_content):
+        return save_batch_file(project_path, procedures, file_path, file_content)
+
+    return FileBlockStream(save_file)
@@ -0,0 +1,204 @@
+import os
+import re
+import threading
+from app.shared.prompt_context import OBJECT_REFERENCE_PATTERN, strip_sql_noise
+
+# Weight of every metric in the complexity score
+COMPLEXITY_WEIGHTS = {
+    "lines": 0.05,
+    "statements": 0.5,
+    "tables": 2.0,
+    "temp_tables": 1.5,
+    "joins": 0.5,
+    "cursors": 8.0,
+    "loops": 2.0,
+    "dynamic_sql": 6.0,
+    "max_nesting": 3.0,
+    "transactions": 2.0,
+    "error_handlers": 1.0,
+}
+
+STATEMENT_PATTERN = (
+    r"\b(?:SELECT|INSERT|UPDATE|DELETE|MERGE|TRUNCATE|DECLARE|IF|WHILE|EXEC|EXECUTE"
+    r"|RETURN|THROW|RAISERROR|PRINT|FETCH|OPEN|CLOSE|DEALLOCATE)\b|\bSET\s+@"
+)
+
+OBJECT_NAME_PATTERN = r"((?:\[[^\]]+\]|[\w#@]+)(?:\s*\.\s*(?:\[[^\]]+\]|[\w#@]+)){0,2})"
+
+# Statements that write to the object following them
+WRITE_TARGET_PATTERN = (
+    r"\b(?:INSERT\s+(?:INTO\s+)?|UPDATE\s+|DELETE\s+(?:FROM\s+)?|MERGE\s+(?:INTO\s+)?"
+    r"|TRUNCATE\s+TABLE\s+|\bINTO\s+)" + OBJECT_NAME_PATTERN
+)
+READ_SOURCE_PATTERN = r"\b(DELETE\s+)?(?:FROM|JOIN|APPLY)\s+" + OBJECT_NAME_PATTERN
+
+# BEGIN that does not open a BEGIN ... END block
+NON_BLOCK_BEGIN_PATTERN = r"\s+(?:TRAN|TRANSACTION|DISTRIBUTED|DIALOG|CONVERSATION)\b"
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _max_block_nesting(code):
+    """Deepest BEGIN ... END nesting (CASE ... END is tracked but not counted)"""
+    stack = []
+    max_depth = 0
+    for match in re.finditer(r"\b(BEGIN|CASE|END)\b", code, re.IGNORECASE):
+        word = match.group(1).upper()
+        if word == "BEGIN":
+            if re.match(NON_BLOCK_BEGIN_PATTERN, code[match.end() :], re.IGNORECASE):
+                continue
+            stack.append("BEGIN")
+            max_depth = max(max_depth, stack.count("BEGIN"))
+        elif word == "CASE":
+            stack.append("CASE")
+        elif stack:
+            stack.pop()
+    return max_depth
+
+
+def _object_name(name):
+    return re.sub(r"[\[\]\s]", "", name).lower()
+
+
+def _is_table_name(name):
+    # Variables, table-valued parameters and keywords caught by the patterns
+    return bool(name) and not name.startswith("@") and name not in ("(", "select")
+
+
+def get_table_usage(code):
+    """
+    Split the tables of (noise-stripped) SQL code into read and written ones.
+
+    Returns:
+        tuple: (sorted read table names, sorted written table names)
+    """
+    written = {
+        _object_name(name)
+        for name in re.findall(WRITE_TARGET_PATTERN, code, re.IGNORECASE)
+    }
+    read = {
+        _object_name(name)
+        for delete, name in re.findall(READ_SOURCE_PATTERN, code, re.IGNORECASE)
+        if not delete
+    }
+    return (
+        sorted(name for name in read if _is_table_name(name)),
+        sorted(name for name in written if _is_table_name(name)),
+    )
+
+
+def analyze_procedure(sql):
+    """
+    Collect static complexity metrics of a procedure definition.
+
+    Args:
+        sql: Procedure definition
+
+    Returns:
+        dict: Metric name to value
+    """
+    code = strip_sql_noise(sql or "")
+
+    objects = set()
+    temp_tables = set()
+    for match in re.finditer(OBJECT_REFERENCE_PATTERN, code, re.IGNORECASE):
+        name = match.group(1).replace("[", "").replace("]", "").lower()
+        name = re.sub(r"\s+", "", name)
+        if name.startswith("@"):
+            continue
+        if name.startswith("#"):
+            temp_tables.add(name)
+        else:
+            objects.add(name)
+
+    # EXEC targets are procedures, not tables
+    executed = {
+        re.sub(r"[\[\]\s]", "", name).lower()
+        for name in re.findall(
+            r"\bEXEC(?:UTE)?\s+((?:\[[^\]]+\]|[\w]+)(?:\s*\.\s*(?:\[[^\]]+\]|[\w]+))*)",
+            code,
+            re.IGNORECASE,
+        )
+    }
+
+    tables_read, tables_written = get_table_usage(code)
+
+    return {
+        "lines": len([line for line in code.splitlines() if line.strip()]),
+        "statements": len(re.findall(STATEMENT_PATTERN, code, re.IGNORECASE)),
+        "tables": len(objects - executed),
+        "temp_tables": len(temp_tables),
+        "joins": len(re.findall(r"\bJOIN\b", code, re.IGNORECASE)),
+        "cursors": len(
+            re.findall(r"\bDECLARE\s+[\w@]+\s+CURSOR\b", code, re.IGNORECASE)
+        ),
+        "dynamic_sql": len(
+            re.findall(r"\bsp_executesql\b|\bEXEC(?:UTE)?\s*\(", code, re.IGNORECASE)
+        ),
+        "loops": len(re.findall(r"\bWHILE\b", code, re.IGNORECASE)),
+        "max_nesting": _max_block_nesting(code),
+        "transactions": len(
+            re.findall(r"\bBEGIN\s+(?:DISTRIBUTED\s+)?TRAN(?:SACTION)?\b", code, re.I)
+        ),
+        "error_handlers": len(re.findall(r"\bBEGIN\s+CATCH\b", code, re.IGNORECASE)),
+        "tables_read": tables_read,
+        "tables_written": tables_written,
+    }
+
+
+def score_metrics(metrics):
+    """Weighted complexity score (the outer BEGIN ... END of a procedure is free)"""
+    score = 0.0
+    for name, weight in COMPLEXITY_WEIGHTS.items():
+        value = metrics.get(name, 0)
+        if name == "max_nesting":
+            value = max(0, value - 1)
+        score += value * weight
+    return round(score, 1)
+
+
+def get_complexity_tier(score, thresholds):
+    """
+    Map a score to a tier.
+
+    Args:
+        score: Complexity score
+        thresholds: (simple_below, complex_from)
+
+    Returns:
+        str: "simple", "moderate" or "complex"
+    """
+    simple_below, complex_from = thresholds
+    if score < simple_below:
+        return "simple"
+    if score >= complex_from:
+        return "complex"
+    return "moderate"
+
+
+def get_procedure_complexity(procedure, project_path):
+    """
+    Metrics and score of an extracted procedure (cached until the SQL file changes).
+
+    Returns:
+        dict: {"metrics": ..., "score": ...} or None when the SQL file is missing
+    """
+    sql_file = os.path.join(project_path, "sql_raw", procedure, f"{procedure}.sql")
+    try:
+        modified = os.path.getmtime(sql_file)
+    except OSError:
+        return None
+
+    with _cache_lock:
+        cached = _cache.get(sql_file)
+    if cached and cached[0] == modified:
+        return cached[1]
+
+    with open(sql_file, "r") as f:
+        metrics = analyze_procedure(f.read())
+    complexity = {"metrics": metrics, "score": score_metrics(metrics)}
+
+    with _cache_lock:
+        _cache[sql_file] = (modified, complexity)
+    return complexity
@@ -0,0 +1,371 @@
+import os
+import re
+import json
+import random
+import hashlib
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from app.shared.prompt_context import strip_sql_noise
+
+load_dotenv()
+
+# Estimated similarity from which two procedures are near-duplicates
+CLUSTER_SIMILARITY_THRESHOLD = float(
+    os.getenv("CLUSTER_SIMILARITY_THRESHOLD", "0.85")
+)
+
+# Set CLUSTER_TEMPLATES=false to stop offering a sibling's analysis in prompts
+CLUSTER_TEMPLATES = os.getenv("CLUSTER_TEMPLATES", "true").lower() in (
+    "1", "true", "yes"
+)
+
+CLUSTER_DIR = "data"
+CLUSTER_FILE = "procedure_clusters.json"
+
+# Tokens per shingle, MinHash permutations and LSH bands
+# (rows per band = permutations / bands)
+SHINGLE_SIZE = 5
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 32
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_random = random.Random(42)
+MINHASH_PARAMETERS = [
+    (_random.randrange(1, _MERSENNE_PRIME), _random.randrange(0, _MERSENNE_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+
+# Words kept as they are, every other identifier is renamed by first appearance
+SQL_KEYWORDS = set(
+    """
+    add all alter and any apply as asc begin between break by cascade case cast
+    catch check close coalesce commit constraint continue convert count create
+    cross cursor deallocate declare default delete desc distinct drop else end
+    exec execute exists fetch for from full function goto group having if in
+    index inner insert into is isnull join key left like matched max merge min
+    next nocount not null of off on open option or order outer output over
+    partition print proc procedure raiserror return returns right rollback
+    rowcount save select set source sum table target then throw top tran
+    transaction trigger truncate try union update using values view when where
+    while with avg getdate sysdatetime datediff dateadd len ltrim rtrim upper
+    lower substring replace row_number rank int bigint smallint tinyint bit
+    decimal numeric money float real date datetime datetime2 time char varchar
+    nchar nvarchar text uniqueidentifier varbinary xml sp_executesql
+    scope_identity error_message error_number xact_state local fast_forward
+    read_only static status
+    """.split()
+)
+
+TOKEN_PATTERN = r"\[[^\]]+\]|@@\w+|[@#]*\w+|''|[^\s\w]"
+
+
+def normalize_procedure(sql):
+    """
+    Normalize a procedure so copies that only differ in names or literals
+    become the same token stream: comments are dropped, literals replaced
+    and identifiers renamed in order of first appearance.
+
+    Returns:
+        list: Normalized tokens
+    """
+    code = strip_sql_noise(sql or "")
+    renamed = {}
+    tokens = []
+    for token in re.findall(TOKEN_PATTERN, code):
+        word = token.strip("[]").lower()
+        if token == "''":
+            tokens.append("<str>")
+        elif re.fullmatch(r"\d+(?:\.\d+)?", word):
+            tokens.append("<num>")
+        elif word in SQL_KEYWORDS or word.startswith("@@"):
+            tokens.append(word)
+        elif not re.match(r"[@#\w]", word):
+            # Operators and punctuation
+            tokens.append(word)
+        else:
+            if word not in renamed:
+                prefix = word[0] if word[0] in "@#" else ""
+                renamed[word] = f"{prefix}id{len(renamed)}"
+            tokens.append(renamed[word])
+    return tokens
+
+
+def get_shingles(tokens, size=SHINGLE_SIZE):
+    """Hash every run of size tokens (stable across processes)"""
+    if len(tokens) < size:
+        size = max(1, len(tokens))
+    shingles = set()
+    for index in range(len(tokens) - size + 1):
+        shingle = " ".join(tokens[index : index + size]).encode("utf-8")
+        shingles.add(
+            int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "big")
+        )
+    return shingles
+
+
+def get_minhash(shingles):
+    """MinHash signature of a shingle set"""
+    if not shingles:
+        return [_MERSENNE_PRIME] * MINHASH_PERMUTATIONS
+    return [
+        min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles)
+        for a, b in MINHASH_PARAMETERS
+    ]
+
+
+def estimate_similarity(signature, other):
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+
+
+def fingerprint_procedure(procedure, sql_file):
+    """
+    Fingerprint one procedure file (runs in a worker process).
+
+    Returns:
+        dict: procedure, exact (hash of the normalized tokens) and signature
+    """
+    with open(sql_file, "r") as f:
+        tokens = normalize_procedure(f.read())
+    return {
+        "procedure": procedure,
+        "tokens": len(tokens),
+        "exact": hashlib.sha256(" ".join(tokens).encode("utf-8")).hexdigest(),
+        "signature": get_minhash(get_shingles(tokens)),
+    }
+
+
+def _fingerprint_task(task):
+    return fingerprint_procedure(*task)
+
+
+def fingerprint_project(project_path, max_workers=None):
+    """Fingerprint every procedure in sql_raw/, in parallel for larger projects"""
+    sql_raw_dir = os.path.join(project_path, "sql_raw")
+    if not os.path.exists(sql_raw_dir):
+        print(f"No procedures found in {sql_raw_dir}")
+        return []
+
+    tasks = []
+    for procedure in sorted(os.listdir(sql_raw_dir)):
+        sql_file = os.path.join(sql_raw_dir, procedure, f"{procedure}.sql")
+        if os.path.isfile(sql_file):
+            tasks.append((procedure, sql_file))
+
+    if len(tasks) < 50:
+        # Starting worker processes costs more than fingerprinting a few files
+        return [_fingerprint_task(task) for task in tasks]
+
+    workers = max_workers or os.cpu_count() or 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(
+                _fingerprint_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))
+            )
+        )
+
+
+def _has_analysis(procedure, project_path):
+    return os.path.exists(
+        os.path.join(project_path, "analysis", procedure, "returnable_objects.json")
+    )
+
+
+def cluster_fingerprints(fingerprints, project_path, threshold=None):
+    """
+    Group near-duplicate procedures: LSH bands find the candidate pairs, the
+    signature similarity confirms them.
+
+    Returns:
+        list: Clusters with at least two procedures, largest first
+    """
+    threshold = CLUSTER_SIMILARITY_THRESHOLD if threshold is None else threshold
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    parent = list(range(len(fingerprints)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    similarities = {}
+    buckets = {}
+    for index, fingerprint in enumerate(fingerprints):
+        for band in range(LSH_BANDS):
+            band_values = fingerprint["signature"][band * rows : (band + 1) * rows]
+            buckets.setdefault((band, tuple(band_values)), []).append(index)
+
+    for members in buckets.values():
+        for position, first in enumerate(members):
+            for second in members[position + 1 :]:
+                if (first, second) in similarities:
+                    continue
+                if fingerprints[first]["exact"] == fingerprints[second]["exact"]:
+                    similarity = 1.0
+                else:
+                    similarity = estimate_similarity(
+                        fingerprints[first]["signature"],
+                        fingerprints[second]["signature"],
+                    )
+                similarities[(first, second)] = similarity
+                if similarity >= threshold:
+                    parent[find(second)] = find(first)
+
+    groups = {}
+    for index in range(len(fingerprints)):
+        groups.setdefault(find(index), []).append(index)
+
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        signatures = {i: fingerprints[i]["signature"] for i in members}
+        # The template is the procedure closest to all others, analyzed ones first
+        centrality = {
+            i: sum(
+                estimate_similarity(signatures[i], signatures[j])
+                for j in members
+                if j != i
+            )
+            for i in members
+        }
+        template = max(
+            members,
+            key=lambda i: (
+                _has_analysis(fingerprints[i]["procedure"], project_path),
+                centrality[i],
+                -fingerprints[i]["tokens"],
+            ),
+        )
+        clusters.append(
+            {
+                "template": fingerprints[template]["procedure"],
+                "members": [
+                    {
+                        "procedure": fingerprints[i]["procedure"],
+                        "similarity": round(
+                            estimate_similarity(signatures[template], signatures[i]), 3
+                        ),
+                    }
+                    for i in sorted(members, key=lambda i: fingerprints[i]["procedure"])
+                ],
+            }
+        )
+
+    clusters.sort(key=lambda cluster: (-len(cluster["members"]), cluster["template"]))
+    for number, cluster in enumerate(clusters, start=1):
+        cluster["id"] = f"CL-{number:03d}"
+    return clusters
+
+
+def write_cluster_report(clusters, procedures, project_path, threshold=None):
+    """Write the clusters to data/procedure_clusters.json, returns the path"""
+    report_dir = os.path.join(project_path, CLUSTER_DIR)
+    os.makedirs(report_dir, exist_ok=True)
+    report_path = os.path.join(report_dir, CLUSTER_FILE)
+    clustered = sum(len(cluster["members"]) for cluster in clusters)
+    with open(report_path, "w") as f:
+        json.dump(
+            {
+                "generated_at": datetime.now().isoformat(),
+                "threshold": (
+                    CLUSTER_SIMILARITY_THRESHOLD if threshold is None else threshold
+                ),
+                "summary": {
+                    "procedures": procedures,
+                    "clusters": len(clusters),
+                    "clustered_procedures": clustered,
+                    # Siblings that can start from their template's analysis
+                    "siblings": clustered - len(clusters),
+                },
+                "clusters": clusters,
+            },
+            f,
+            indent=4,
+        )
+    return report_path
+
+
+def load_procedure_cluster(procedure, project_path):
+    """
+    Find the cluster of a procedure in the last cluster report.
+
+    Returns:
+        dict: {"id", "template", "similarity"} for a sibling, None for a
+              template or a procedure without near-duplicates
+    """
+    report_path = os.path.join(project_path, CLUSTER_DIR, CLUSTER_FILE)
+    try:
+        with open(report_path, "r") as f:
+            report = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    for cluster in report.get("clusters", []):
+        if cluster["template"] == procedure:
+            return None
+        for member in cluster["members"]:
+            if member["procedure"] == procedure:
+                return {
+                    "id": cluster["id"],
+                    "template": cluster["template"],
+                    "similarity": member["similarity"],
+                }
+    return None
+
+
+def load_cluster_templates(project_path):
+    """Get the template procedures of the last cluster report"""
+    report_path = os.path.join(project_path, CLUSTER_DIR, CLUSTER_FILE)
+    try:
+        with open(report_path, "r") as f:
+            report = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return set()
+    return {cluster["template"] for cluster in report.get("clusters", [])}
+
+
+def load_cluster_siblings(project_path):
+    """
+    Map every sibling of the last cluster report to its template (empty when
+    CLUSTER_TEMPLATES is off, the siblings then do not use the template)
+    """
+    if not CLUSTER_TEMPLATES:
+        return {}
+    report_path = os.path.join(project_path, CLUSTER_DIR, CLUSTER_FILE)
+    try:
+        with open(report_path, "r") as f:
+            report = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return {
+        member["procedure"]: cluster["template"]
+        for cluster in report.get("clusters", [])
+        for member in cluster["members"]
+        if member["procedure"] != cluster["template"]
+    }
+
+
+def run_procedure_clustering(project_path, threshold=None):
+    """Fingerprint and cluster the project's procedures and print the clusters"""
+    fingerprints = fingerprint_project(project_path)
+    if not fingerprints:
+        return None
+
+    clusters = cluster_fingerprints(fingerprints, project_path, threshold)
+    report_path = write_cluster_report(
+        clusters, len(fingerprints), project_path, threshold
+    )
+
+    print(
+        f"\n=== Near-duplicate procedures ({len(clusters)} clusters in {len(fingerprints)} procedures) ==="
+    )
+    for cluster in clusters:
+        print(f"\n{cluster['id']} template: {cluster['template']}")
+        for member in cluster["members"]:
+            if member["procedure"] != cluster["template"]:
+                print(f"   {member['similarity']:.0%}  {member['procedure']}")
+    print(f"\nCluster report saved to {report_path}")
+    return report_path
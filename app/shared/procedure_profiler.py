@@ -0,0 +1,286 @@
+import os
+import csv
+import json
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from app.shared.procedure_complexity import analyze_procedure, score_metrics
+from app.shared.prompt_context import (
+    PROMPT_CONTEXT_PRUNING,
+    PROMPT_CONTEXT_TOKEN_BUDGET,
+    estimate_tokens,
+)
+
+PROFILE_DIR = "metrics"
+PROFILE_FILE = "procedure_profile"
+
+# Columns of the CSV report, in order
+PROFILE_COLUMNS = [
+    "procedure",
+    "score",
+    "lines",
+    "statements",
+    "tables_read_count",
+    "tables_written_count",
+    "temp_tables",
+    "cursors",
+    "loops",
+    "dynamic_sql",
+    "transactions",
+    "max_nesting",
+    "joins",
+    "procedure_tokens",
+    "dependency_tokens",
+    "estimated_prompt_tokens",
+    "tables_read",
+    "tables_written",
+]
+
+
+def load_dependency_tokens(project_path):
+    """
+    Estimate the dependency context tokens of every procedure from the
+    discovered dependencies (no database connection needed).
+
+    Returns:
+        dict: Procedure name to estimated dependency tokens
+    """
+    data_dir = os.path.join(project_path, "data")
+    try:
+        with open(os.path.join(data_dir, "procedure_dependencies.json"), "r") as f:
+            procedure_dependencies = json.load(f)
+        with open(os.path.join(data_dir, "object_create_scripts.json"), "r") as f:
+            object_scripts = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+    script_tokens = {
+        obj["name"]: estimate_tokens(obj.get("definition") or "")
+        for obj in object_scripts
+    }
+
+    dependency_tokens = {}
+    for procedure in procedure_dependencies:
+        tokens = 0
+        for dependency in procedure.get("dependencies", []):
+            name = dependency["name"]
+            tokens += script_tokens.get(name, script_tokens.get(name.split(".")[-1], 0))
+        # Pruned prompts never send more than the context budget
+        if PROMPT_CONTEXT_PRUNING:
+            tokens = min(tokens, PROMPT_CONTEXT_TOKEN_BUDGET)
+        dependency_tokens[procedure["name"]] = tokens
+    return dependency_tokens
+
+
+def profile_procedure(procedure, sql_file, dependency_tokens=0):
+    """
+    Profile one procedure file (runs in a worker process).
+
+    Returns:
+        dict: Report row of the procedure
+    """
+    with open(sql_file, "r") as f:
+        sql = f.read()
+
+    metrics = analyze_procedure(sql)
+    procedure_tokens = estimate_tokens(sql)
+    row = {
+        "procedure": procedure,
+        "score": score_metrics(metrics),
+        **metrics,
+        "tables_read_count": len(metrics["tables_read"]),
+        "tables_written_count": len(metrics["tables_written"]),
+        "procedure_tokens": procedure_tokens,
+        "dependency_tokens": dependency_tokens,
+        "estimated_prompt_tokens": procedure_tokens + dependency_tokens,
+    }
+    return row
+
+
+def _profile_task(task):
+    return profile_procedure(*task)
+
+
+def get_history_rates(project_path):
+    """
+    Derive seconds and USD per prompt token from the project's recorded LLM calls.
+
+    Returns:
+        dict: seconds_per_token and cost_per_token (None when there is no history)
+    """
+    calls_file = os.path.join(project_path, "metrics", "llm_calls.jsonl")
+    prompt_tokens = 0
+    latency = 0.0
+    cost = 0.0
+    if os.path.exists(calls_file):
+        with open(calls_file, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("cached") or not record.get("prompt_tokens"):
+                    continue
+                prompt_tokens += record["prompt_tokens"]
+                latency += record.get("latency") or 0.0
+                cost += record.get("cost") or 0.0
+
+    if not prompt_tokens:
+        return {"seconds_per_token": None, "cost_per_token": None}
+    return {
+        "seconds_per_token": latency / prompt_tokens,
+        "cost_per_token": cost / prompt_tokens,
+    }
+
+
+def profile_project(project_path, max_workers=None):
+    """
+    Profile every procedure in sql_raw/ in parallel.
+
+    Args:
+        project_path: Project path
+        max_workers: Worker processes (defaults to the CPU count)
+
+    Returns:
+        list: Report rows, largest (highest score) first
+    """
+    sql_raw_dir = os.path.join(project_path, "sql_raw")
+    if not os.path.exists(sql_raw_dir):
+        print(f"No procedures found in {sql_raw_dir}")
+        return []
+
+    dependency_tokens = load_dependency_tokens(project_path)
+    tasks = []
+    for procedure in sorted(os.listdir(sql_raw_dir)):
+        sql_file = os.path.join(sql_raw_dir, procedure, f"{procedure}.sql")
+        if os.path.isfile(sql_file):
+            tasks.append((procedure, sql_file, dependency_tokens.get(procedure, 0)))
+
+    if len(tasks) < 50:
+        # Starting worker processes costs more than profiling a few files
+        rows = [_profile_task(task) for task in tasks]
+    else:
+        workers = max_workers or os.cpu_count() or 2
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(
+                executor.map(
+                    _profile_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))
+                )
+            )
+
+    return sorted(rows, key=lambda row: (-row["score"], row["procedure"]))
+
+
+def summarize_profile(rows, project_path):
+    """Project totals plus a run time and cost prediction from earlier runs"""
+    total_tokens = sum(row["estimated_prompt_tokens"] for row in rows)
+    rates = get_history_rates(project_path)
+
+    summary = {
+        "procedures": len(rows),
+        "total_lines": sum(row["lines"] for row in rows),
+        "total_statements": sum(row["statements"] for row in rows),
+        "estimated_prompt_tokens": total_tokens,
+        "procedures_with_cursors": sum(1 for row in rows if row["cursors"]),
+        "procedures_with_dynamic_sql": sum(1 for row in rows if row["dynamic_sql"]),
+        "procedures_with_transactions": sum(1 for row in rows if row["transactions"]),
+        # Per pass over all procedures with one prompt each, every stage is one pass
+        "predicted_seconds_per_stage": None,
+        "predicted_cost_per_stage": None,
+    }
+    if rates["seconds_per_token"] is not None:
+        summary["predicted_seconds_per_stage"] = round(
+            total_tokens * rates["seconds_per_token"], 1
+        )
+        summary["predicted_cost_per_stage"] = round(
+            total_tokens * rates["cost_per_token"], 4
+        )
+    return summary
+
+
+def write_profile_report(rows, project_path):
+    """
+    Write the profile as JSON (with the summary) and as a sortable CSV.
+
+    Returns:
+        tuple: (json_path, csv_path)
+    """
+    profile_dir = os.path.join(project_path, PROFILE_DIR)
+    os.makedirs(profile_dir, exist_ok=True)
+
+    json_path = os.path.join(profile_dir, f"{PROFILE_FILE}.json")
+    with open(json_path, "w") as f:
+        json.dump(
+            {
+                "generated_at": datetime.now().isoformat(),
+                "summary": summarize_profile(rows, project_path),
+                "procedures": rows,
+            },
+            f,
+            indent=4,
+        )
+
+    csv_path = os.path.join(profile_dir, f"{PROFILE_FILE}.csv")
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=PROFILE_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(
+                {
+                    **row,
+                    "tables_read": " ".join(row["tables_read"]),
+                    "tables_written": " ".join(row["tables_written"]),
+                }
+            )
+
+    return json_path, csv_path
+
+
+def load_profile_scores(project_path):
+    """
+    Get the complexity score of every procedure from the last profile report.
+
+    Returns:
+        dict: Procedure name to score (empty when the project was not profiled)
+    """
+    json_path = os.path.join(project_path, PROFILE_DIR, f"{PROFILE_FILE}.json")
+    try:
+        with open(json_path, "r") as f:
+            report = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return {row["procedure"]: row["score"] for row in report.get("procedures", [])}
+
+
+def run_procedure_profiler(project_path, top=20):
+    """Profile the project, write the report and print the largest procedures"""
+    rows = profile_project(project_path)
+    if not rows:
+        return None
+
+    json_path, csv_path = write_profile_report(rows, project_path)
+    summary = summarize_profile(rows, project_path)
+
+    print(f"\n=== Procedure complexity profile ({len(rows)} procedures) ===")
+    header = f"{'Procedure':<48} {'Score':>7} {'Lines':>6} {'Stmts':>6} {'Read':>5} {'Write':>5} {'Cur':>4} {'Loop':>4} {'Dyn':>4} {'Tran':>4} {'Tokens':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in rows[:top]:
+        print(
+            f"{row['procedure'][:48]:<48} {row['score']:>7.1f} {row['lines']:>6} "
+            f"{row['statements']:>6} {row['tables_read_count']:>5} "
+            f"{row['tables_written_count']:>5} {row['cursors']:>4} {row['loops']:>4} "
+            f"{row['dynamic_sql']:>4} {row['transactions']:>4} "
+            f"{row['estimated_prompt_tokens']:>8}"
+        )
+    if len(rows) > top:
+        print(f"... {len(rows) - top} more in {csv_path}")
+
+    print(f"\nEstimated prompt tokens per stage: {summary['estimated_prompt_tokens']}")
+    if summary["predicted_seconds_per_stage"] is not None:
+        print(
+            f"Predicted per stage (from earlier runs): "
+            f"{summary['predicted_seconds_per_stage']}s of LLM time, "
+            f"${summary['predicted_cost_per_stage']}"
+        )
+    print(f"Report saved to {json_path} and {csv_path}")
+    return json_path
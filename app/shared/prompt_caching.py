@@ -0,0 +1,40 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Set PROMPT_CACHING=false to stop sending cache-control hints to the provider
+PROMPT_CACHING = os.getenv("PROMPT_CACHING", "true").lower() in ("1", "true", "yes")
+
+# Providers that only cache a prompt prefix when it is marked explicitly.
+# OpenAI, Azure, Gemini and DeepSeek cache repeated prefixes automatically.
+EXPLICIT_CACHE_PROVIDERS = ("anthropic", "bedrock", "vertex_ai")
+
+
+def needs_cache_control(model):
+    """Check if the model's provider needs cache-control markers to cache a prefix"""
+    if not model:
+        return False
+    provider = model.split("/")[0]
+    if provider not in EXPLICIT_CACHE_PROVIDERS:
+        return False
+    # Bedrock and Vertex only support prompt caching for their Claude models
+    return provider == "anthropic" or "claude" in model.lower()
+
+
+def get_prompt_cache_args(model):
+    """
+    LiteLlm arguments that mark the static system instruction as a cacheable
+    prefix, so repeated calls only pay full price for the variable content.
+
+    Args:
+        model: LiteLLM model name
+
+    Returns:
+        dict: Keyword arguments for LiteLlm (empty when no hint is needed)
+    """
+    if not PROMPT_CACHING or not needs_cache_control(model):
+        return {}
+    return {
+        "cache_control_injection_points": [{"location": "message", "role": "system"}]
+    }
@@ -0,0 +1,339 @@
+import os
+import re
+import json
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Approximate token budget for the dependency context of a single prompt
+PROMPT_CONTEXT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", "16000"))
+
+# Set PROMPT_CONTEXT_PRUNING=false to send the full CREATE scripts again
+PROMPT_CONTEXT_PRUNING = os.getenv("PROMPT_CONTEXT_PRUNING", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Identifiers of analysis artifacts (BR-001, BF-002, TU-003, PROC-001, ...)
+ARTIFACT_ID_PATTERN = r"\b(?:BR|BF|BP|TU|TS|PROC|RO|OC|SE|DP|FP)-\d+\b"
+
+OBJECT_REFERENCE_PATTERN = (
+    r"(?:FROM|JOIN|INTO|UPDATE|EXEC|EXECUTE|APPLY|MERGE|TABLE|DELETE)\s+"
+    r"((?:\[[^\]]+\]|[\w#@]+)(?:\s*\.\s*(?:\[[^\]]+\]|[\w#@]+)){0,2})"
+)
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about 4 characters per token for code and JSON)"""
+    if not isinstance(text, str):
+        text = json.dumps(text, default=str)
+    return len(text) // 4 + 1
+
+
+def strip_sql_noise(sql):
+    """Remove comments and string literals so only code identifiers remain"""
+    sql = re.sub(r"/\*.*?\*/", " ", sql, flags=re.DOTALL)
+    sql = re.sub(r"--[^\n]*", " ", sql)
+    sql = re.sub(r"N?'(?:[^']|'')*'", "''", sql)
+    return sql
+
+
+def _clean_name(name):
+    parts = [part.strip().strip("[]\"`") for part in re.split(r"\s*\.\s*", name)]
+    return ".".join(part for part in parts if part).lower()
+
+
+def extract_sql_references(sql):
+    """
+    Statically analyse SQL code for the objects and identifiers it references.
+
+    Args:
+        sql: SQL code (procedure definition, snippet, view definition)
+
+    Returns:
+        dict: objects (lower-cased object names, with and without schema),
+              identifiers (every lower-cased word/bracketed name) and
+              uses_wildcards (True for SELECT * / INSERT without column list)
+    """
+    code = strip_sql_noise(sql or "")
+
+    objects = set()
+    for match in re.finditer(OBJECT_REFERENCE_PATTERN, code, re.IGNORECASE):
+        name = _clean_name(match.group(1))
+        objects.add(name)
+        objects.add(name.split(".")[-1])
+
+    identifiers = {word.lower() for word in re.findall(r"[\w@#$]+", code)}
+    identifiers.update(
+        bracketed.strip().lower() for bracketed in re.findall(r"\[([^\]]+)\]", code)
+    )
+
+    uses_wildcards = bool(
+        re.search(r"SELECT\s+(?:DISTINCT\s+)?(?:TOP\s*\(?\s*\d+\s*\)?\s+)?\*", code, re.I)
+        or re.search(r"\w\s*\.\s*\*", code)
+        or re.search(
+            r"INSERT\s+(?:INTO\s+)?[\w\[\]\.#]+\s+(?:VALUES|SELECT|EXEC)", code, re.I
+        )
+    )
+
+    return {
+        "objects": objects,
+        "identifiers": identifiers,
+        "uses_wildcards": uses_wildcards,
+    }
+
+
+def _bracketed_columns(text):
+    return [column.lower() for column in re.findall(r"\[([^\]]+)\]", text)]
+
+
+def prune_table_script(create_script, identifiers):
+    """
+    Keep only the referenced columns and the constraints that touch them.
+
+    Primary key columns are always kept. Index definitions and SET batches are
+    dropped, triggers are kept because they change the behaviour of writes.
+
+    Args:
+        create_script: CREATE TABLE script from object_create_scripts.json
+        identifiers: Lower-cased identifiers referenced by the SQL in scope
+
+    Returns:
+        str: Pruned script (the original script if it cannot be parsed)
+    """
+    batches = re.split(r"^\s*GO\s*$", create_script, flags=re.MULTILINE | re.IGNORECASE)
+    create_batch_index = next(
+        (i for i, b in enumerate(batches) if re.search(r"CREATE\s+TABLE", b, re.I)),
+        None,
+    )
+    if create_batch_index is None:
+        return create_script
+
+    create_batch = batches[create_batch_index]
+    header_match = re.search(r"CREATE\s+TABLE[^(]*\(", create_batch, re.IGNORECASE)
+    body_end = create_batch.rfind(")")
+    if not header_match or body_end <= header_match.end():
+        return create_script
+
+    header = create_batch[header_match.start() : header_match.end()]
+    footer = create_batch[body_end:].strip()
+    body_lines = [
+        line.strip().rstrip(",")
+        for line in create_batch[header_match.end() : body_end].splitlines()
+        if line.strip()
+    ]
+
+    primary_key_columns = set()
+    for line in body_lines:
+        if re.search(r"PRIMARY\s+KEY", line, re.IGNORECASE):
+            key_part = line[re.search(r"PRIMARY\s+KEY", line, re.I).end() :]
+            primary_key_columns.update(_bracketed_columns(key_part))
+
+    kept_lines = []
+    omitted_columns = 0
+    for line in body_lines:
+        if line.upper().startswith("CONSTRAINT"):
+            constraint_columns = _bracketed_columns(
+                line[re.search(r"\(", line).start() :] if "(" in line else ""
+            )
+            if re.search(r"PRIMARY\s+KEY", line, re.IGNORECASE) or any(
+                column in identifiers for column in constraint_columns
+            ):
+                kept_lines.append(line)
+            continue
+
+        column_match = re.match(r"\[?([^\]\s]+)\]?", line)
+        column = column_match.group(1).lower() if column_match else ""
+        if column in identifiers or column in primary_key_columns:
+            kept_lines.append(line)
+        else:
+            omitted_columns += 1
+
+    pruned_batches = []
+    create_table = header + "\n    " + ",\n    ".join(kept_lines)
+    if omitted_columns:
+        create_table += f"\n    -- {omitted_columns} unreferenced columns omitted"
+    create_table += "\n" + footer
+    pruned_batches.append(create_table)
+
+    for index, batch in enumerate(batches):
+        statement = batch.strip()
+        if index == create_batch_index or not statement:
+            continue
+        if re.match(r"SET\s+", statement, re.IGNORECASE):
+            continue
+        if re.match(r"CREATE\s+(UNIQUE\s+)?(NON)?CLUSTERED\s+INDEX", statement, re.I):
+            continue
+        foreign_key = re.search(
+            r"FOREIGN\s+KEY\s*\(([^)]*)\)", statement, re.IGNORECASE
+        )
+        if foreign_key and not any(
+            column in identifiers for column in _bracketed_columns(foreign_key.group(1))
+        ):
+            continue
+        pruned_batches.append(statement)
+
+    return "\nGO\n".join(pruned_batches) + "\nGO"
+
+
+def _dependency_relevance(dependency, references):
+    name = (dependency.get("name") or "").lower()
+    schema = (dependency.get("schemaName") or "").lower()
+    full_name = f"{schema}.{name}" if schema else name
+    score = 0
+    if full_name in references["objects"] or name in references["objects"]:
+        score += 100
+    elif name in references["identifiers"]:
+        score += 10
+    script = dependency.get("create_script") or ""
+    score += sum(
+        1 for column in set(_bracketed_columns(script)) if column in references["identifiers"]
+    )
+    return score
+
+
+def _summarize_dependency(dependency, references):
+    """Replace a definition by the list of referenced columns to save tokens"""
+    script = dependency.get("create_script") or ""
+    object_names = {
+        (dependency.get("name") or "").lower(),
+        (dependency.get("schemaName") or "").lower(),
+    }
+    columns = sorted(
+        {
+            c
+            for c in _bracketed_columns(script)
+            if c in references["identifiers"] and c not in object_names
+        }
+    )
+    summary = dict(dependency)
+    summary["create_script"] = (
+        "-- definition omitted to fit the prompt token budget"
+        + (f"; referenced columns: {', '.join(columns)}" if columns else "")
+    )
+    return summary
+
+
+def fit_dependencies_to_budget(dependencies, references, token_budget):
+    """Shrink the least relevant definitions first until the context fits the budget"""
+    if not token_budget or estimate_tokens(dependencies) <= token_budget:
+        return dependencies
+
+    fitted = list(dependencies)
+    by_relevance = sorted(
+        range(len(fitted)),
+        key=lambda i: _dependency_relevance(fitted[i], references),
+    )
+    for index in by_relevance:
+        if estimate_tokens(fitted) <= token_budget:
+            break
+        if fitted[index].get("create_script") or fitted[index].get("view_dependencies"):
+            summary = _summarize_dependency(fitted[index], references)
+            summary.pop("view_dependencies", None)
+            fitted[index] = summary
+
+    if estimate_tokens(fitted) > token_budget:
+        print(
+            f"Warning: Dependency context still exceeds the token budget ({estimate_tokens(fitted)} > {token_budget})"
+        )
+    return fitted
+
+
+def prune_dependencies(dependencies, sql, token_budget=None):
+    """
+    Build the dependency context of a prompt from what the SQL actually references.
+
+    Args:
+        dependencies: Output of get_dependencies
+        sql: SQL in scope (whole procedure, or the snippet of a unit/scenario)
+        token_budget: Approximate token budget (defaults to PROMPT_CONTEXT_TOKEN_BUDGET)
+
+    Returns:
+        list: Dependencies with pruned CREATE scripts and auto-populated columns
+    """
+    if not PROMPT_CONTEXT_PRUNING or not dependencies or not sql:
+        return dependencies
+
+    if token_budget is None:
+        token_budget = PROMPT_CONTEXT_TOKEN_BUDGET
+
+    references = extract_sql_references(sql)
+    pruned = []
+
+    for dependency in dependencies:
+        dependency = dict(dependency)
+        script = dependency.get("create_script")
+
+        if dependency.get("view_dependencies"):
+            # Base tables of a view are needed for the columns the view itself uses
+            dependency["view_dependencies"] = prune_dependencies(
+                dependency["view_dependencies"],
+                f"{sql}\n{script or ''}",
+                token_budget=0,
+            )
+
+        if (
+            dependency.get("type") == "TABLE"
+            and script
+            and not references["uses_wildcards"]
+        ):
+            dependency["create_script"] = prune_table_script(
+                script, references["identifiers"]
+            )
+            # Keep the auto-populated columns still present (e.g. identity keys)
+            kept_columns = set(_bracketed_columns(dependency["create_script"]))
+            dependency["auto_populated_columns"] = [
+                column
+                for column in dependency.get("auto_populated_columns", [])
+                if column.get("name", "").lower() in kept_columns
+            ]
+
+        pruned.append(dependency)
+
+    return fit_dependencies_to_budget(pruned, references, token_budget)
+
+
+def prune_analysis_items(analysis_json, list_key, scope):
+    """
+    Keep only the analysis items (rules, functions, processes...) related to a scope.
+
+    An item is related when its id is mentioned in the scope, or when it mentions
+    one of the ids found in the scope (e.g. a function listing the testable unit).
+
+    Args:
+        analysis_json: Loaded analysis file, e.g. {"businessFunctions": [...]}
+        list_key: Key of the item list, e.g. "businessFunctions"
+        scope: Object or text describing the unit/scenario being generated
+
+    Returns:
+        dict: Copy of analysis_json with the filtered item list (unchanged when
+              nothing in the scope can be matched)
+    """
+    if not PROMPT_CONTEXT_PRUNING or not isinstance(analysis_json, dict):
+        return analysis_json
+
+    items = analysis_json.get(list_key)
+    if not isinstance(items, list):
+        return analysis_json
+
+    scope_text = scope if isinstance(scope, str) else json.dumps(scope, default=str)
+    scope_ids = set(re.findall(ARTIFACT_ID_PATTERN, scope_text))
+    if not scope_ids:
+        return analysis_json
+
+    related = []
+    for item in items:
+        item_id = item.get("id") if isinstance(item, dict) else None
+        item_text = json.dumps(item, default=str)
+        if item_id in scope_ids or any(
+            re.search(rf"\b{re.escape(scope_id)}\b", item_text) for scope_id in scope_ids
+        ):
+            related.append(item)
+
+    if not related:
+        return analysis_json
+
+    pruned = dict(analysis_json)
+    pruned[list_key] = related
+    return pruned
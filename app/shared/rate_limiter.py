@@ -0,0 +1,229 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from dotenv import load_dotenv
+from google.adk.models.lite_llm import LiteLLMClient
+from app.agents.model_configuration import provider_rate_limits
+from app.shared.prompt_context import estimate_tokens
+
+load_dotenv()
+
+# Retries of a request the provider rejected with 429 (0 disables retrying)
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "5"))
+
+# Exponential backoff: base delay doubled per attempt, capped, with full jitter
+LLM_RATE_LIMIT_BACKOFF = float(os.getenv("LLM_RATE_LIMIT_BACKOFF", "2"))
+LLM_RATE_LIMIT_MAX_BACKOFF = float(os.getenv("LLM_RATE_LIMIT_MAX_BACKOFF", "60"))
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Token bucket that refills continuously, holding at most one minute of budget"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """
+        Take tokens for a request, the bucket goes into debt when they are
+        not there yet.
+
+        Returns:
+            float: Seconds to wait before the request may start
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            # A request larger than the whole bucket would otherwise never start
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def adjust(self, amount):
+        """Take (or give back, when negative) tokens after the actual usage is known"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class ProviderRateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets of one provider"""
+
+    def __init__(self, provider, requests_per_minute, tokens_per_minute):
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, estimated_tokens):
+        """Reserve one request and its estimated tokens, returns the seconds to wait"""
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        with self._lock:
+            return max(wait, self.blocked_until - time.monotonic())
+
+    def settle(self, estimated_tokens, usage):
+        """Correct the token bucket with the usage the provider reported"""
+        if not self.tokens or not usage:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        if prompt_tokens or completion_tokens:
+            self.tokens.adjust(prompt_tokens + completion_tokens - estimated_tokens)
+
+    def block(self, seconds):
+        """Hold back every request to the provider, e.g. after a 429"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+def get_rate_limiter(model):
+    """Get the process-wide limiter of a model's provider"""
+    provider = (model or "").split("/")[0]
+    with _limiters_lock:
+        if provider not in _limiters:
+            requests_per_minute, tokens_per_minute = provider_rate_limits.get(
+                provider, (0, 0)
+            )
+            _limiters[provider] = ProviderRateLimiter(
+                provider,
+                float(os.getenv("LLM_RATE_LIMIT_RPM", requests_per_minute)),
+                float(os.getenv("LLM_RATE_LIMIT_TPM", tokens_per_minute)),
+            )
+        return _limiters[provider]
+
+
+def is_rate_limit_error(error):
+    """Check if a LiteLLM error is a 429 from the provider"""
+    import litellm
+
+    if isinstance(error, litellm.RateLimitError):
+        return True
+    return getattr(error, "status_code", None) == 429
+
+
+def get_retry_after(error):
+    """
+    Read the Retry-After of a rate limit error.
+
+    Returns:
+        float: Seconds the provider asked to wait (None when it did not say)
+    """
+    headers = getattr(error, "litellm_response_headers", None)
+    response = getattr(error, "response", None)
+    if not headers and response is not None:
+        headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    headers = {str(key).lower(): value for key, value in dict(headers).items()}
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000.0
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def get_backoff_delay(attempt, retry_after=None):
+    """Jittered exponential backoff for a retry, never shorter than the Retry-After"""
+    delay = random.uniform(
+        0, min(LLM_RATE_LIMIT_MAX_BACKOFF, LLM_RATE_LIMIT_BACKOFF * 2**attempt)
+    )
+    if retry_after is not None:
+        # A little jitter on top, so waiting requests do not all retry at once
+        delay = retry_after + random.uniform(0, LLM_RATE_LIMIT_BACKOFF)
+    return delay
+
+
+def _on_rate_limit(limiter, error, attempt):
+    delay = get_backoff_delay(attempt, get_retry_after(error))
+    limiter.block(delay)
+    print(
+        f"⏳ Rate limited by {limiter.provider or 'the provider'}, retrying in {delay:.1f}s ({attempt + 1}/{LLM_RATE_LIMIT_RETRIES})"
+    )
+
+
+class RateLimitedLiteLLMClient(LiteLLMClient):
+    """
+    LiteLLM client that waits for the provider's request and token budget
+    before every call and retries calls rejected with 429.
+    """
+
+    async def acompletion(self, model, messages, tools, **kwargs):
+        limiter = get_rate_limiter(model)
+        estimated_tokens = estimate_tokens(str(messages) + str(tools or ""))
+        for attempt in range(LLM_RATE_LIMIT_RETRIES + 1):
+            wait = limiter.reserve(estimated_tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                response = await super().acompletion(model, messages, tools, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == LLM_RATE_LIMIT_RETRIES:
+                    raise
+                _on_rate_limit(limiter, e, attempt)
+                continue
+
+            if kwargs.get("stream"):
+                return self._settle_stream(response, limiter, estimated_tokens)
+            limiter.settle(estimated_tokens, getattr(response, "usage", None))
+            return response
+
+    async def _settle_stream(self, stream, limiter, estimated_tokens):
+        usage = None
+        async for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            yield chunk
+        limiter.settle(estimated_tokens, usage)
+
+    def completion(self, model, messages, tools, stream=False, **kwargs):
+        limiter = get_rate_limiter(model)
+        estimated_tokens = estimate_tokens(str(messages) + str(tools or ""))
+        for attempt in range(LLM_RATE_LIMIT_RETRIES + 1):
+            wait = limiter.reserve(estimated_tokens)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                response = super().completion(
+                    model, messages, tools, stream=stream, **kwargs
+                )
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == LLM_RATE_LIMIT_RETRIES:
+                    raise
+                _on_rate_limit(limiter, e, attempt)
+                continue
+
+            if not stream:
+                limiter.settle(estimated_tokens, getattr(response, "usage", None))
+            return response
@@ -0,0 +1,409 @@
+import os
+import re
+import json
+import math
+import threading
+from collections import Counter
+from dotenv import load_dotenv
+from app.shared.prompt_context import ARTIFACT_ID_PATTERN, estimate_tokens
+
+load_dotenv()
+
+# Set RETRIEVAL_INDEX=false to inline the whole analysis and model files again
+RETRIEVAL_INDEX = os.getenv("RETRIEVAL_INDEX", "true").lower() in ("1", "true", "yes")
+
+# Chunks a prompt pulls in per section, and their approximate token budget
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "6"))
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "12000"))
+
+# The index is stored in one shard per procedure analysis folder and per
+# csharp-code/ subfolder, so a changed file only rewrites its own shard
+INDEX_DIR = os.path.join("data", "retrieval_index")
+INDEX_VERSION = 3
+
+# Indexed project folders and file types
+INDEXED_SOURCES = [("analysis", ".json"), ("csharp-code", ".cs")]
+IGNORED_DIRS = {"bin", "obj", ".git", ".checkpoints"}
+
+# Business analysis files of a procedure that prompts retrieve items from
+BUSINESS_ANALYSIS_FILES = [
+    "business_rules.json",
+    "business_functions.json",
+    "business_processes.json",
+    "returnable_objects.json",
+    "process_object_mapping.json",
+]
+
+# Lines per chunk of a C# file
+CODE_CHUNK_LINES = 80
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def tokenize(text):
+    """Lower-cased terms, identifiers are split on camelCase and underscores"""
+    # Artifact ids (BR-001) stay one term instead of matching every rule
+    terms = [match.lower() for match in re.findall(ARTIFACT_ID_PATTERN, text)]
+    for word in re.findall(r"[A-Za-z0-9]+", re.sub(ARTIFACT_ID_PATTERN, " ", text)):
+        for part in re.findall(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+", word):
+            if len(part) > 1:
+                terms.append(part.lower())
+    return terms
+
+
+def chunk_json(data):
+    """
+    Split an analysis file into one chunk per list item (rule, function,
+    process, returnable object, ...) plus one chunk per object with the
+    fields beside those lists (descriptions, flags, ...), so no part of the
+    file is left out.
+
+    Returns:
+        list: (ref, text) tuples, ref like businessRules/BR-001
+    """
+    chunks = []
+
+    def is_item_list(value):
+        return isinstance(value, list) and value and all(type(i) is dict for i in value)
+
+    def walk(value, ref, depth):
+        if is_item_list(value):
+            for index, item in enumerate(value):
+                item_id = item.get("id") or item.get("testId") or item.get("name")
+                chunks.append(
+                    (f"{ref}/{item_id or index}", json.dumps(item, indent=2))
+                )
+            return
+        if not isinstance(value, dict) or depth > 3:
+            chunks.append((ref, json.dumps(value, indent=2)))
+            return
+
+        fields = {}
+        for key, child in value.items():
+            if is_item_list(child) or isinstance(child, dict):
+                walk(child, f"{ref}.{key}" if ref else key, depth + 1)
+            else:
+                fields[key] = child
+        if fields:
+            chunks.append((ref, json.dumps(fields, indent=2)))
+
+    walk(data, "", 0)
+    return chunks
+
+
+def chunk_code(text):
+    """Split source code into blocks of CODE_CHUNK_LINES lines"""
+    lines = text.splitlines()
+    chunks = []
+    for start in range(0, len(lines), CODE_CHUNK_LINES):
+        block = "\n".join(lines[start : start + CODE_CHUNK_LINES]).strip()
+        if block:
+            end = min(start + CODE_CHUNK_LINES, len(lines))
+            chunks.append((f"L{start + 1}-{end}", block))
+    return chunks
+
+
+def chunk_file(full_path, relative_path):
+    """Chunk one project file, with the term frequencies of every chunk"""
+    try:
+        with open(full_path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    except OSError:
+        return []
+
+    if relative_path.endswith(".json"):
+        try:
+            chunks = chunk_json(json.loads(text))
+        except json.JSONDecodeError:
+            chunks = [("", text)]
+    else:
+        chunks = chunk_code(text)
+
+    result = []
+    for ref, chunk_text in chunks:
+        terms = tokenize(chunk_text)
+        result.append(
+            {
+                "ref": ref,
+                "text": chunk_text,
+                "terms": dict(Counter(terms)),
+                "length": len(terms),
+            }
+        )
+    return result
+
+
+def _list_sources(project_path, root_dir=None):
+    for folder, extension in INDEXED_SOURCES:
+        folder_dir = os.path.join(project_path, folder)
+        if root_dir is None:
+            walk_dir = folder_dir
+        elif os.path.commonpath([folder_dir, root_dir]) == folder_dir:
+            walk_dir = root_dir
+        else:
+            continue
+        if not os.path.isdir(walk_dir):
+            continue
+        for root, dirs, files in os.walk(walk_dir):
+            dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
+            for file in files:
+                if file.endswith(extension):
+                    full_path = os.path.join(root, file)
+                    relative_path = os.path.relpath(full_path, project_path)
+                    yield full_path, relative_path.replace(os.sep, "/")
+
+
+def _is_indexed(relative_path):
+    return any(
+        relative_path.startswith(f"{folder}/") and relative_path.endswith(extension)
+        for folder, extension in INDEXED_SOURCES
+    )
+
+
+def get_shard_key(relative_path):
+    """Shard of an indexed file: its first two folders (analysis/<procedure>)"""
+    parts = relative_path.split("/")
+    return "/".join(parts[:2]) if len(parts) > 2 else parts[0]
+
+
+def _get_shard_path(project_path, shard_key):
+    file_name = re.sub(r"[^A-Za-z0-9._-]", "_", shard_key.replace("/", "__"))
+    return os.path.join(project_path, INDEX_DIR, f"{file_name}.json")
+
+
+def _get_index(project_path):
+    index = _indexes.get(project_path)
+    if index is None:
+        index = _indexes[project_path] = {"files": {}, "shards": set()}
+    return index
+
+
+def _load_shard(project_path, index, shard_key):
+    """Read a shard from disk the first time one of its files is needed"""
+    if shard_key in index["shards"]:
+        return
+    index["shards"].add(shard_key)
+    try:
+        with open(_get_shard_path(project_path, shard_key), "r") as f:
+            shard = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return
+    if shard.get("version") == INDEX_VERSION and shard.get("key") == shard_key:
+        for relative_path, entry in shard["files"].items():
+            index["files"].setdefault(relative_path, entry)
+
+
+def _save_shards(project_path, index, shard_keys):
+    for shard_key in shard_keys:
+        shard = {
+            "version": INDEX_VERSION,
+            "key": shard_key,
+            "files": {
+                relative_path: entry
+                for relative_path, entry in index["files"].items()
+                if get_shard_key(relative_path) == shard_key
+            },
+        }
+        shard_path = _get_shard_path(project_path, shard_key)
+        try:
+            if not shard["files"]:
+                if os.path.exists(shard_path):
+                    os.remove(shard_path)
+                continue
+            os.makedirs(os.path.dirname(shard_path), exist_ok=True)
+            temp_path = f"{shard_path}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(shard, f)
+            os.replace(temp_path, shard_path)
+        except OSError as e:
+            print(f"Warning: Could not save the retrieval index: {str(e)}")
+
+
+def _refresh_file(project_path, index, full_path, relative_path):
+    """Chunk a file again when it changed, returns True when the index changed"""
+    files = index["files"]
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        return files.pop(relative_path, None) is not None
+    entry = files.get(relative_path)
+    if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+        return False
+    files[relative_path] = {
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "chunks": chunk_file(full_path, relative_path),
+    }
+    return True
+
+
+def update_index(project_path, paths=None):
+    """
+    Bring the index up to date for the given path prefixes (the whole project
+    when there are none), only new and changed files are chunked again and
+    only the shards of changed files are saved.
+
+    Returns:
+        dict: The index ({"files": {path: {"mtime", "size", "chunks"}}, "shards"})
+    """
+    with _lock:
+        index = _get_index(project_path)
+        files = index["files"]
+        changed = set()
+
+        if paths is None:
+            index_dir = os.path.join(project_path, INDEX_DIR)
+            if os.path.isdir(index_dir):
+                for file_name in os.listdir(index_dir):
+                    try:
+                        with open(os.path.join(index_dir, file_name), "r") as f:
+                            shard_key = json.load(f).get("key")
+                    except (OSError, json.JSONDecodeError):
+                        continue
+                    if shard_key:
+                        _load_shard(project_path, index, shard_key)
+            prefixes = [""]
+        else:
+            prefixes = [path.strip("/") for path in paths]
+
+        for prefix in prefixes:
+            full_prefix = os.path.join(project_path, prefix)
+            seen = set()
+            if os.path.isfile(full_prefix):
+                sources = [(full_prefix, prefix)] if _is_indexed(prefix) else []
+            else:
+                sources = _list_sources(
+                    project_path, full_prefix if prefix else None
+                )
+            for full_path, relative_path in sources:
+                seen.add(relative_path)
+                _load_shard(project_path, index, get_shard_key(relative_path))
+                if _refresh_file(project_path, index, full_path, relative_path):
+                    changed.add(get_shard_key(relative_path))
+
+            # Files of the searched prefix that were deleted since
+            if prefix:
+                _load_shard(project_path, index, get_shard_key(prefix))
+            for relative_path in list(files):
+                if relative_path.startswith(prefix) and relative_path not in seen:
+                    del files[relative_path]
+                    changed.add(get_shard_key(relative_path))
+
+        if changed:
+            _save_shards(project_path, index, changed)
+        return index
+
+
+def search(
+    project_path,
+    query,
+    paths=None,
+    top_k=RETRIEVAL_TOP_K,
+    token_budget=RETRIEVAL_TOKEN_BUDGET,
+    exclude_refs=None,
+    matches_only=True,
+):
+    """
+    Rank the indexed chunks against a query with BM25.
+
+    Args:
+        project_path: Project path
+        query: Text describing what is being generated
+        paths: Optional path prefixes (relative to the project) to search in
+        top_k: Maximum number of chunks (None for no limit)
+        token_budget: Approximate token limit of the returned chunks
+        exclude_refs: Chunk refs ending with one of these are skipped
+        matches_only: Skip chunks that share no term with the query
+
+    Returns:
+        list: {"path", "ref", "text", "score"} dicts, best first
+    """
+    index = update_index(project_path, paths)
+    candidates = [
+        (path, chunk)
+        for path, entry in index["files"].items()
+        if not paths or any(path.startswith(prefix) for prefix in paths)
+        for chunk in entry["chunks"]
+        if not exclude_refs
+        or not any(chunk["ref"].endswith(ref) for ref in exclude_refs)
+    ]
+    if not candidates:
+        return []
+
+    # Statistics over the searched chunks, so terms common to them weigh little
+    query_terms = set(tokenize(query))
+    document_count = len(candidates)
+    average_length = sum(chunk["length"] for _, chunk in candidates) / document_count
+    document_frequency = Counter(
+        term
+        for _, chunk in candidates
+        for term in query_terms
+        if term in chunk["terms"]
+    )
+
+    scored = []
+    for path, chunk in candidates:
+        score = 0.0
+        length_norm = BM25_K1 * (
+            1 - BM25_B + BM25_B * chunk["length"] / (average_length or 1)
+        )
+        for term in query_terms:
+            frequency = chunk["terms"].get(term)
+            if not frequency:
+                continue
+            df = document_frequency[term]
+            idf = math.log(1 + (document_count - df + 0.5) / (df + 0.5))
+            score += idf * frequency * (BM25_K1 + 1) / (frequency + length_norm)
+        if score > 0 or not matches_only:
+            scored.append((score, path, chunk))
+
+    scored.sort(key=lambda item: (-item[0], item[1], item[2]["ref"]))
+
+    results = []
+    dropped = []
+    used_tokens = 0
+    for score, path, chunk in scored:
+        if top_k is not None and len(results) >= top_k:
+            break
+        tokens = estimate_tokens(chunk["text"])
+        if results and token_budget and used_tokens + tokens > token_budget:
+            dropped.append(f"{path} {chunk['ref']}".strip())
+            continue
+        used_tokens += tokens
+        results.append(
+            {
+                "path": path,
+                "ref": chunk["ref"],
+                "text": chunk["text"],
+                "score": round(score, 3),
+            }
+        )
+
+    # Without top_k the caller wants every item, say which ones did not fit
+    if dropped and top_k is None:
+        print(
+            f"⚠️ Retrieval budget of {token_budget} tokens left out {len(dropped)} of "
+            f"{len(scored)} items: {', '.join(dropped[:10])}"
+            + (", ..." if len(dropped) > 10 else "")
+            + " (raise RETRIEVAL_TOKEN_BUDGET to include them)"
+        )
+    return results
+
+
+def get_analysis_paths(procedure_name):
+    """Search paths of a procedure's business analysis files"""
+    return [f"analysis/{procedure_name}/{name}" for name in BUSINESS_ANALYSIS_FILES]
+
+
+def format_chunks(chunks):
+    """Render retrieved chunks for a prompt, each labelled with its file and item"""
+    blocks = []
+    for chunk in chunks:
+        label = f"{chunk['path']} {chunk['ref']}" if chunk["ref"] else chunk["path"]
+        blocks.append(f"[{label}]\n{chunk['text']}")
+    return "\n\n".join(blocks)
@@ -90,15 +90,11 @@ class EntityFrameworkAnalyzer:
         self.tables = tables
 
     def analyze(self):
-        """Run the entity framework analysis"""
-        # Check if analysis file already exists
-        output_file = self.output_dir / f"ef_analysis.json"
-        if output_file.exists():
-            print(
-                f"Analysis file already exists for {self.procedure_name}, skipping..."
-            )
-            return None
-
+        """
+        Run the entity framework analysis. The report is always rebuilt, bulk
+        runs skip the procedures whose inputs did not change through the
+        artifact manifest.
+        """
         # Extract tables from SQL file if none provided
         if not self.tables:
             self.tables = self.extract_tables_from_sql()
@@ -474,13 +470,23 @@ def run_csharp_dependency_analysis(project_path):
             return
 
         elif choice == len(procedures) + 1:
-            # Analyze all procedures
+            # Analyze all procedures that are not up to date
+            from app.shared.stage_journal import get_pending_procedures, run_journaled
+
             completed = 0
-            total = len(procedures)
+            pending = get_pending_procedures(
+                project_path, "csharp-dependency-analysis", procedures
+            )
+            total = len(pending)
 
-            for procedure in procedures:
+            for procedure in pending:
                 print(f"\nProcessing {procedure} ({completed+1}/{total})...")
-                analyze_csharp_dependencies(procedure, project_path)
+                run_journaled(
+                    "csharp-dependency-analysis",
+                    procedure,
+                    project_path,
+                    analyze_csharp_dependencies,
+                )
                 completed += 1
 
             print(f"\nC# dependency analysis completed for all {completed} procedures.")
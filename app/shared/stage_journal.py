@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from datetime import datetime
+from app.shared import artifact_manifest
+from app.shared.procedure_fingerprint import load_cluster_siblings
+
+JOURNAL_DIR = "metrics"
+JOURNAL_FILE = "stage_journal.jsonl"
+
+_lock = threading.Lock()
+
+# Files the save functions wrote during the running journaled stage, as
+# (absolute path, procedure) pairs
+_written_files = contextvars.ContextVar("written_files", default=None)
+
+
+def get_journal_path(project_path):
+    """Get the path of the project's append-only stage journal"""
+    return os.path.join(project_path, JOURNAL_DIR, JOURNAL_FILE)
+
+
+def get_stage_inputs(stage_name, procedure, project_path):
+    """
+    List the files a procedure stage reads: the procedure SQL, the outputs
+    of the stages it requires, the stage's own inputs (glob patterns) and,
+    for a cluster sibling, the template's files it is shown.
+    """
+    from app.shared.pipeline import get_stage
+
+    stage = get_stage(stage_name)
+    inputs = [os.path.join("sql_raw", procedure, f"{procedure}.sql")]
+    for required_name in stage["requires"]:
+        for output in get_stage(required_name).get("outputs", []):
+            inputs.append(output.format(procedure=procedure))
+    for pattern in stage.get("inputs", []):
+        inputs.append(pattern.format(procedure=procedure))
+    if stage.get("template_inputs"):
+        template = load_cluster_siblings(project_path).get(procedure)
+        if template:
+            for pattern in stage["template_inputs"]:
+                inputs.append(pattern.format(procedure=template))
+    return list(dict.fromkeys(inputs))
+
+
+def record_written(path, procedure=None):
+    """
+    Note a file a stage wrote, so the journal and the artifact manifest list
+    it as an artifact of the running stage (outside run_journaled this does
+    nothing).
+
+    Args:
+        path: Path of the written file
+        procedure: Procedure the file belongs to (needed in a batch run)
+    """
+    written = _written_files.get()
+    if written is not None:
+        written.append((os.path.abspath(path), procedure))
+
+
+def get_artifacts(written, procedure, project_path, batch=False):
+    """
+    List the written files of a procedure, relative to the project. In a
+    batch, a file noted without a procedure belongs to the procedures in
+    its path.
+    """
+    project_dir = os.path.abspath(project_path)
+    artifacts = set()
+    for path, owner in written:
+        relative_path = os.path.relpath(path, project_dir).replace(os.sep, "/")
+        if relative_path.startswith("../"):
+            continue
+        if owner is None and batch:
+            if procedure not in relative_path.split("/"):
+                continue
+        elif owner is not None and owner != procedure:
+            continue
+        artifacts.add(relative_path)
+    return sorted(artifacts)
+
+
+def record(
+    project_path,
+    stage_name,
+    procedure,
+    status,
+    input_hash=None,
+    artifacts=None,
+    duration=None,
+):
+    """Append one stage result to the journal (flushed to disk straight away)"""
+    entry = {
+        "timestamp": datetime.now().isoformat(),
+        "stage": stage_name,
+        "procedure": procedure,
+        "input_hash": input_hash,
+        "status": status,
+        "artifacts": artifacts or [],
+        "duration": duration,
+    }
+    journal_path = get_journal_path(project_path)
+    try:
+        with _lock:
+            os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+            with open(journal_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+    except Exception as e:
+        print(f"Warning: Could not write stage journal: {str(e)}")
+    return entry
+
+
+def load_journal(project_path):
+    """Read all journal entries (a line cut off by a crash is ignored)"""
+    journal_path = get_journal_path(project_path)
+    if not os.path.exists(journal_path):
+        return []
+
+    entries = []
+    with open(journal_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+def get_latest_entries(project_path, stage_name):
+    """Get the latest journal entry of every procedure for a stage"""
+    latest = {}
+    for entry in load_journal(project_path):
+        if entry.get("stage") == stage_name:
+            latest[entry.get("procedure")] = entry
+    return latest
+
+
+def get_pending_procedures(project_path, stage_name, procedures):
+    """
+    Drop the procedures the artifact manifest has up to date for a stage, so
+    a bulk run resumes where an earlier run stopped and only reruns the
+    procedures whose inputs changed since.
+
+    Returns:
+        list: Procedures that still need to run, in the original order
+    """
+    manifest = artifact_manifest.load_manifest(project_path)
+    pending = [
+        procedure
+        for procedure in procedures
+        if not artifact_manifest.is_up_to_date(
+            project_path, stage_name, procedure, manifest
+        )
+    ]
+
+    skipped = len(procedures) - len(pending)
+    if skipped:
+        print(
+            f"⏭️  Skipping {skipped} of {len(procedures)} procedures up to date for {stage_name} (see {artifact_manifest.get_manifest_path(project_path)}, --force reruns them)"
+        )
+    return pending
+
+
+def _record_outcome(
+    stage, procedure, project_path, inputs, result, artifacts, started, duration
+):
+    """Record a finished run in the journal and the artifact manifest"""
+    from app.shared.pipeline import stage_succeeded
+
+    # A run that failed never records its inputs against older outputs
+    succeeded = stage_succeeded(stage, procedure, project_path, result, started)
+    outputs = [
+        output.format(procedure=procedure) for output in stage.get("outputs", [])
+    ]
+    artifacts = [
+        output
+        for output in dict.fromkeys(outputs + artifacts)
+        if os.path.exists(os.path.join(project_path, output))
+    ]
+    record(
+        project_path,
+        stage["name"],
+        procedure,
+        "done" if succeeded else "failed",
+        artifact_manifest.combine_hashes(stage["name"], inputs),
+        artifacts,
+        duration,
+    )
+    if not succeeded:
+        artifact_manifest.forget_stage(project_path, stage["name"], procedure)
+        return
+    artifact_manifest.record_stage(
+        project_path, stage["name"], procedure, inputs, artifacts
+    )
+
+
+def run_journaled(stage_name, procedure, project_path, function):
+    """
+    Run function(procedure, project_path) and record the outcome in the
+    journal and the artifact manifest. The artifacts are the stage's declared
+    outputs and the files its save functions noted with record_written.
+
+    Returns:
+        The function result
+    """
+    from app.shared.pipeline import get_stage
+
+    inputs = artifact_manifest.hash_stage_inputs(stage_name, procedure, project_path)
+    written = []
+    token = _written_files.set(written)
+    started = time.time()
+    try:
+        result = function(procedure, project_path)
+    except BaseException:
+        record(
+            project_path,
+            stage_name,
+            procedure,
+            "failed",
+            artifact_manifest.combine_hashes(stage_name, inputs),
+            duration=round(time.time() - started, 1),
+        )
+        artifact_manifest.forget_stage(project_path, stage_name, procedure)
+        raise
+    finally:
+        _written_files.reset(token)
+
+    _record_outcome(
+        get_stage(stage_name),
+        procedure,
+        project_path,
+        inputs,
+        result,
+        get_artifacts(written, procedure, project_path),
+        started,
+        round(time.time() - started, 1),
+    )
+    return result
+
+
+def run_journaled_batch(stage_name, procedures, project_path, function):
+    """
+    Run function(procedures, project_path) for a batch of procedures that
+    share one agent request and record every procedure in the journal and
+    the artifact manifest.
+
+    Returns:
+        dict: Procedure name to its function result
+    """
+    from app.shared.pipeline import get_stage
+
+    inputs = {
+        procedure: artifact_manifest.hash_stage_inputs(
+            stage_name, procedure, project_path
+        )
+        for procedure in procedures
+    }
+    written = []
+    token = _written_files.set(written)
+    started = time.time()
+    try:
+        results = function(procedures, project_path)
+    except BaseException:
+        duration = round(time.time() - started, 1)
+        for procedure in procedures:
+            record(
+                project_path,
+                stage_name,
+                procedure,
+                "failed",
+                artifact_manifest.combine_hashes(stage_name, inputs[procedure]),
+                duration=duration,
+            )
+            artifact_manifest.forget_stage(project_path, stage_name, procedure)
+        raise
+    finally:
+        _written_files.reset(token)
+
+    duration = round(time.time() - started, 1)
+    stage = get_stage(stage_name)
+    for procedure in procedures:
+        _record_outcome(
+            stage,
+            procedure,
+            project_path,
+            inputs[procedure],
+            results.get(procedure, False),
+            get_artifacts(written, procedure, project_path, batch=True),
+            started,
+            duration,
+        )
+    return results
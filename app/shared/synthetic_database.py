@@ -0,0 +1,442 @@
+import os
+import re
+import json
+import random
+import pyodbc
+from app.shared.run_sql_tests import naive_linechunk
+from app.shared.mock_llm_server import CANNED_FILES
+
+SCHEMA_NAME = "bench"
+
+# tSQLt install scripts of the docker stand-in, run against the benchmark database
+TSQLT_SCRIPTS = [
+    "01_tsqlt_prepare.sql",
+    "02_tsqlt_install.sql",
+    "03_tsqlt_setup.sql",
+]
+TSQLT_SCRIPT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "docker",
+    "mssql-docker",
+    "init-db",
+)
+
+# Procedure shapes, cycled so every size gets the same mix
+PROCEDURE_KINDS = ["lookup", "upsert", "batch", "report", "cursor", "dynamic"]
+
+# Analysis files the report generation reads
+ANALYSIS_FILES = [
+    "business_rules.json",
+    "business_functions.json",
+    "business_processes.json",
+    "returnable_objects.json",
+    "process_object_mapping.json",
+    "testable_units.json",
+]
+
+
+def set_database(connection_string, database):
+    """Point a connection string at another database"""
+    pattern = r"(?i)\b(Database|Initial Catalog)\s*=\s*[^;]*"
+    if re.search(pattern, connection_string):
+        return re.sub(pattern, f"Database={database}", connection_string, count=1)
+    return connection_string.rstrip(";") + f";Database={database};"
+
+
+def _table(index):
+    return f"{SCHEMA_NAME}.Table{index:04d}"
+
+
+def _table_ddl(index):
+    parent = (
+        f"\n    ParentId INT NULL REFERENCES {_table(index - 1)}(Id),"
+        if index > 1
+        else "\n    ParentId INT NULL,"
+    )
+    return f"""CREATE TABLE {_table(index)} (
+    Id INT IDENTITY(1,1) PRIMARY KEY,{parent}
+    Code NVARCHAR(20) NOT NULL,
+    Name NVARCHAR(100) NULL,
+    Amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    Status TINYINT NOT NULL DEFAULT 1,
+    CreatedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+);"""
+
+
+def _join_chain(first, length):
+    """FROM ... JOIN clause over consecutive tables linked by ParentId"""
+    lines = [f"FROM {_table(first)} t0"]
+    for offset in range(1, length):
+        lines.append(
+            f"    JOIN {_table(first - offset)} t{offset} ON t{offset - 1}.ParentId = t{offset}.Id"
+        )
+    return "\n".join(lines)
+
+
+def _procedure(kind, name, rng, table_count, objects):
+    """
+    Definition of one synthetic procedure.
+
+    Returns:
+        tuple: (definition, tables it touches, EXEC call used by its tests)
+    """
+    first = rng.randint(1, table_count)
+    chain = min(first, rng.randint(1, 4))
+    tables = [_table(first - offset) for offset in range(chain)]
+    table = tables[0]
+
+    if kind == "lookup":
+        view = rng.choice(objects["views"]) if objects["views"] else None
+        function = (
+            rng.choice(objects["scalar_functions"])
+            if objects["scalar_functions"]
+            else None
+        )
+        select_function = (
+            f",\n        {function}(t0.Id) AS ChildAmount" if function else ""
+        )
+        view_filter = (
+            f"\n      AND EXISTS (SELECT 1 FROM {view} v WHERE v.Id = t0.Id)"
+            if view
+            else ""
+        )
+        definition = f"""CREATE PROCEDURE {name}
+    @ParentId INT,
+    @Status TINYINT = 1
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    SELECT t0.Id, t0.Code, t0.Name, t0.Amount{select_function}
+    {_join_chain(first, chain)}
+    WHERE t0.ParentId = @ParentId
+      AND t0.Status = @Status{view_filter}
+    ORDER BY t0.Code;
+END"""
+        return definition, tables, f"EXEC {name} @ParentId = 1"
+
+    if kind == "upsert":
+        definition = f"""CREATE PROCEDURE {name}
+    @Id INT,
+    @Code NVARCHAR(20),
+    @Amount DECIMAL(18,2)
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    IF @Amount < 0
+    BEGIN
+        RAISERROR('Amount must not be negative', 16, 1);
+        RETURN -1;
+    END
+
+    BEGIN TRY
+        BEGIN TRANSACTION;
+
+        IF EXISTS (SELECT 1 FROM {table} WHERE Id = @Id)
+            UPDATE {table} SET Code = @Code, Amount = @Amount WHERE Id = @Id;
+        ELSE
+            INSERT INTO {table} (Code, Amount) VALUES (@Code, @Amount);
+
+        INSERT INTO {SCHEMA_NAME}.AuditLog (TableName, RowId, Action)
+        VALUES ('{table}', @Id, 'UPSERT');
+
+        COMMIT TRANSACTION;
+    END TRY
+    BEGIN CATCH
+        IF @@TRANCOUNT > 0 ROLLBACK TRANSACTION;
+        THROW;
+    END CATCH
+END"""
+        objects["upserts"].append(name)
+        return (
+            definition,
+            [table, f"{SCHEMA_NAME}.AuditLog"],
+            f"EXEC {name} @Id = 1, @Code = N'A1', @Amount = 10",
+        )
+
+    if kind == "batch":
+        definition = f"""CREATE PROCEDURE {name}
+    @Status TINYINT
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    CREATE TABLE #Work (Id INT PRIMARY KEY, Amount DECIMAL(18,2), Processed BIT DEFAULT 0);
+
+    INSERT INTO #Work (Id, Amount)
+    SELECT t0.Id, t0.Amount
+    {_join_chain(first, chain)}
+    WHERE t0.Status = @Status;
+
+    DECLARE @Id INT;
+    WHILE EXISTS (SELECT 1 FROM #Work WHERE Processed = 0)
+    BEGIN
+        SELECT TOP 1 @Id = Id FROM #Work WHERE Processed = 0 ORDER BY Id;
+
+        UPDATE {table} SET Amount = Amount * 1.1 WHERE Id = @Id;
+        UPDATE #Work SET Processed = 1 WHERE Id = @Id;
+    END
+
+    SELECT COUNT(*) AS ProcessedRows FROM #Work;
+END"""
+        return definition, tables, f"EXEC {name} @Status = 1"
+
+    if kind == "report":
+        function = (
+            rng.choice(objects["table_functions"])
+            if objects["table_functions"]
+            else None
+        )
+        source = f"{function}(@Status)" if function else f"{table}"
+        definition = f"""CREATE PROCEDURE {name}
+    @Status TINYINT
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    WITH Totals AS (
+        SELECT r.ParentId, SUM(r.Amount) AS TotalAmount, COUNT(*) AS RowsCount
+        FROM {source} r
+        GROUP BY r.ParentId
+    )
+    SELECT t0.Code, ISNULL(Totals.TotalAmount, 0) AS TotalAmount, ISNULL(Totals.RowsCount, 0) AS RowsCount
+    {_join_chain(first, chain)}
+        LEFT JOIN Totals ON Totals.ParentId = t0.Id
+    ORDER BY TotalAmount DESC;
+END"""
+        return definition, tables, f"EXEC {name} @Status = 1"
+
+    if kind == "cursor":
+        upsert = rng.choice(objects["upserts"]) if objects["upserts"] else None
+        body = (
+            f"EXEC {upsert} @Id = @Id, @Code = @Code, @Amount = @Amount;"
+            if upsert
+            else f"UPDATE {table} SET Amount = @Amount WHERE Id = @Id;"
+        )
+        definition = f"""CREATE PROCEDURE {name}
+    @Status TINYINT
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    DECLARE @Id INT, @Code NVARCHAR(20), @Amount DECIMAL(18,2);
+
+    DECLARE row_cursor CURSOR LOCAL FAST_FORWARD FOR
+        SELECT Id, Code, Amount FROM {table} WHERE Status = @Status;
+
+    OPEN row_cursor;
+    FETCH NEXT FROM row_cursor INTO @Id, @Code, @Amount;
+    WHILE @@FETCH_STATUS = 0
+    BEGIN
+        {body}
+        FETCH NEXT FROM row_cursor INTO @Id, @Code, @Amount;
+    END
+    CLOSE row_cursor;
+    DEALLOCATE row_cursor;
+END"""
+        return definition, [table], f"EXEC {name} @Status = 1"
+
+    definition = f"""CREATE PROCEDURE {name}
+    @Column SYSNAME,
+    @Value NVARCHAR(100)
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    IF @Column NOT IN ('Code', 'Name')
+    BEGIN
+        RAISERROR('Unsupported column', 16, 1);
+        RETURN -1;
+    END
+
+    DECLARE @Sql NVARCHAR(MAX) =
+        N'SELECT Id, Code, Name, Amount FROM {table} WHERE ' + QUOTENAME(@Column) + N' = @Value';
+    EXEC sp_executesql @Sql, N'@Value NVARCHAR(100)', @Value = @Value;
+END"""
+    return definition, [table], f"EXEC {name} @Column = 'Code', @Value = N'A1'"
+
+
+def generate_schema(
+    tables=20, procedures=50, views=5, functions=5, triggers=5, seed=42
+):
+    """
+    Build a synthetic schema with realistic joins (every table references the
+    previous one through ParentId). The same arguments always give the same schema.
+
+    Returns:
+        dict: "batches" (SQL batches in creation order) and "procedures"
+              (name, kind, tables and the EXEC call of every procedure)
+    """
+    rng = random.Random(seed)
+    tables = max(1, tables)
+    batches = [f"CREATE SCHEMA {SCHEMA_NAME};"]
+    batches += [_table_ddl(index) for index in range(1, tables + 1)]
+    batches.append(
+        f"""CREATE TABLE {SCHEMA_NAME}.AuditLog (
+    Id INT IDENTITY(1,1) PRIMARY KEY,
+    TableName SYSNAME NOT NULL,
+    RowId INT NULL,
+    Action NVARCHAR(20) NOT NULL,
+    LoggedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+);"""
+    )
+
+    objects = {
+        "views": [],
+        "scalar_functions": [],
+        "table_functions": [],
+        "upserts": [],
+    }
+
+    for index in range(1, views + 1):
+        first = rng.randint(1, tables)
+        chain = min(first, rng.randint(2, 3))
+        name = f"{SCHEMA_NAME}.vw_View{index:04d}"
+        batches.append(
+            f"""CREATE VIEW {name}
+AS
+SELECT t0.Id, t0.Code, t0.Amount, t{chain - 1}.Code AS RootCode
+{_join_chain(first, chain)}
+WHERE t0.Status = 1;"""
+        )
+        objects["views"].append(name)
+
+    for index in range(1, functions + 1):
+        table = _table(rng.randint(1, tables))
+        if index % 2:
+            name = f"{SCHEMA_NAME}.fn_TotalAmount{index:04d}"
+            batches.append(
+                f"""CREATE FUNCTION {name} (@ParentId INT)
+RETURNS DECIMAL(18,2)
+AS
+BEGIN
+    RETURN (SELECT ISNULL(SUM(Amount), 0) FROM {table} WHERE ParentId = @ParentId);
+END"""
+            )
+            objects["scalar_functions"].append(name)
+        else:
+            name = f"{SCHEMA_NAME}.fn_RowsByStatus{index:04d}"
+            batches.append(
+                f"""CREATE FUNCTION {name} (@Status TINYINT)
+RETURNS TABLE
+AS
+RETURN (
+    SELECT Id, ParentId, Code, Amount FROM {table} WHERE Status = @Status
+);"""
+            )
+            objects["table_functions"].append(name)
+
+    for index in range(1, min(triggers, tables) + 1):
+        table = _table(index)
+        batches.append(
+            f"""CREATE TRIGGER {SCHEMA_NAME}.tr_Audit{index:04d} ON {table}
+AFTER INSERT, UPDATE
+AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO {SCHEMA_NAME}.AuditLog (TableName, RowId, Action)
+    SELECT '{table}', Id, 'WRITE' FROM inserted;
+END"""
+        )
+
+    procedure_list = []
+    for index in range(1, procedures + 1):
+        kind = PROCEDURE_KINDS[(index - 1) % len(PROCEDURE_KINDS)]
+        name = f"{SCHEMA_NAME}.usp_{kind.capitalize()}{index:04d}"
+        definition, used_tables, call = _procedure(kind, name, rng, tables, objects)
+        batches.append(definition)
+        procedure_list.append(
+            {"name": name, "kind": kind, "tables": used_tables, "call": call}
+        )
+
+    return {"batches": batches, "procedures": procedure_list}
+
+
+def _execute_script(cursor, script):
+    for batch in naive_linechunk(script):
+        cursor.execute(batch)
+
+
+def create_synthetic_database(connection_string, database, schema, install_tsqlt=True):
+    """
+    (Re)create the benchmark database on the server of the connection string
+    and load the synthetic schema into it.
+
+    Returns:
+        str: Connection string of the benchmark database
+    """
+    server_connection = pyodbc.connect(
+        set_database(connection_string, "master"), autocommit=True
+    )
+    cursor = server_connection.cursor()
+    cursor.execute(
+        f"""IF DB_ID(N'{database}') IS NOT NULL
+BEGIN
+    ALTER DATABASE [{database}] SET SINGLE_USER WITH ROLLBACK IMMEDIATE;
+    DROP DATABASE [{database}];
+END"""
+    )
+    cursor.execute(f"CREATE DATABASE [{database}]")
+    server_connection.close()
+
+    database_connection_string = set_database(connection_string, database)
+    connection = pyodbc.connect(database_connection_string, autocommit=True)
+    cursor = connection.cursor()
+
+    if install_tsqlt:
+        for script in TSQLT_SCRIPTS:
+            with open(os.path.join(TSQLT_SCRIPT_DIR, script), "r") as f:
+                _execute_script(cursor, f.read())
+        print("✅ tSQLt installed")
+
+    for batch in schema["batches"]:
+        cursor.execute(batch)
+    connection.close()
+
+    print(
+        f"✅ Created {database} with {len(schema['procedures'])} procedures "
+        f"({len(schema['batches'])} objects)"
+    )
+    return database_connection_string
+
+
+def write_project_fixtures(project_path, schema, tests_per_procedure=2):
+    """
+    Write the files the LLM stages would produce (analysis JSON and tSQLt
+    tests) so the non-LLM stages can be timed without calling a provider.
+    """
+    for procedure in schema["procedures"]:
+        name = procedure["name"]
+
+        analysis_dir = os.path.join(project_path, "analysis", name)
+        os.makedirs(analysis_dir, exist_ok=True)
+        for filename in ANALYSIS_FILES:
+            with open(os.path.join(analysis_dir, filename), "w") as f:
+                json.dump(CANNED_FILES[filename], f, indent=2)
+
+        tests = [
+            f"-- Auto-generated tSQLt test class for {name}\n"
+            f"EXEC tSQLt.NewTestClass 'test_{name}';\nGO"
+        ]
+        fakes = "\n".join(
+            f"    EXEC tSQLt.FakeTable '{table}';" for table in procedure["tables"]
+        )
+        for number in range(1, tests_per_procedure + 1):
+            tests.append(
+                f"""CREATE PROCEDURE [test_{name}].[test_{name}_TS-{number:03d}]
+AS
+BEGIN
+{fakes}
+
+    {procedure["call"]};
+
+    EXEC tSQLt.AssertEquals @Expected = 1, @Actual = 1;
+END;
+GO"""
+            )
+
+        test_dir = os.path.join(project_path, "sql_tests", name)
+        os.makedirs(test_dir, exist_ok=True)
+        with open(os.path.join(test_dir, f"{name}_test.sql"), "w") as f:
+            f.write("\n\n".join(tests) + "\n")